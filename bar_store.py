@@ -0,0 +1,160 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка только внутри процесса
+    fcntl = None
+
+
+class BarStore:
+    """
+    Локальное хранилище OHLCV баров
+    Колонки лежат в отдельных бинарных файлах и читаются через memmap
+    """
+
+    COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+    def __init__(self, root):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _dir(self, symbol, interval):
+        safe_symbol = symbol.replace('/', '_').replace(os.sep, '_')
+        return os.path.join(self.root, interval, safe_symbol)
+
+    def _lock(self, symbol, interval):
+        with self._locks_guard:
+            return self._locks.setdefault((symbol, interval), threading.Lock())
+
+    @contextmanager
+    def _locked(self, symbol, interval, path):
+        """Запись символа: поток процесса + flock на файл — воркеры делят один BAR_STORE_DIR"""
+        with self._lock(symbol, interval):
+            os.makedirs(path, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(path, '.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self, path):
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self, path, meta):
+        # Атомарная замена: meta.json — источник истины о числе строк
+        # Временный файл уникален, чтобы чужой процесс не дописал в него свое
+        fd, tmp_path = tempfile.mkstemp(prefix='meta.', suffix='.tmp', dir=path)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, os.path.join(path, 'meta.json'))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _column(self, path, name, dtype, rows):
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(path, name), dtype=dtype, mode='r', shape=(rows,))
+
+    def _timestamps(self, path, rows):
+        return self._column(path, 'ts.i8', np.int64, rows)
+
+    def last_timestamp(self, symbol, interval):
+        """Время последнего сохраненного бара (или None)"""
+        path = self._dir(symbol, interval)
+        meta = self._read_meta(path)
+        if not meta or meta['rows'] == 0:
+            return None
+        ts = self._timestamps(path, meta['rows'])
+        return pd.Timestamp(int(ts[-1]), tz='UTC').tz_convert(meta['tz'])
+
+    def merge(self, symbol, interval, data):
+        """Дописать новые бары; пересекающийся хвост (формирующийся бар) перезаписывается"""
+        if data is None or data.empty:
+            return
+
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        index = data.index
+        if index.tz is None:
+            index = index.tz_localize('UTC')
+        new_ts = index.tz_convert('UTC').as_unit('ns').asi8
+
+        path = self._dir(symbol, interval)
+        with self._locked(symbol, interval, path):
+            meta = self._read_meta(path) or {'rows': 0, 'tz': str(index.tz), 'index_name': data.index.name}
+
+            stored_ts = self._timestamps(path, meta['rows'])
+            keep = int(np.searchsorted(stored_ts, new_ts[0], side='left'))
+
+            # Файлы не усекаются: открытые memmap у читателей остаются валидными
+            columns = [('ts.i8', new_ts.astype(np.int64))]
+            for col in self.COLUMNS:
+                columns.append((f'{col}.f8', data[col].to_numpy(dtype=np.float64)))
+
+            for name, values in columns:
+                file_path = os.path.join(path, name)
+                mode = 'r+b' if os.path.exists(file_path) else 'wb'
+                with open(file_path, mode) as f:
+                    f.seek(keep * values.itemsize)
+                    f.write(values.tobytes())
+
+            meta['rows'] = keep + len(new_ts)
+            self._write_meta(path, meta)
+
+    def load(self, symbol, interval, since=None):
+        """Загрузка баров без копирования (колонки — memmap)"""
+        path = self._dir(symbol, interval)
+        meta = self._read_meta(path)
+        if not meta or meta['rows'] == 0:
+            return None
+
+        rows = meta['rows']
+        ts = self._timestamps(path, rows)
+        start = 0
+        if since is not None:
+            start = int(np.searchsorted(ts, pd.Timestamp(since).tz_convert('UTC').value, side='left'))
+
+        index = pd.DatetimeIndex(np.asarray(ts[start:]).view('M8[ns]')).tz_localize('UTC').tz_convert(meta['tz'])
+        index.name = meta.get('index_name')
+        columns = {
+            col: self._column(path, f'{col}.f8', np.float64, rows)[start:]
+            for col in self.COLUMNS
+        }
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def iter_chunks(self, symbol, interval, chunk_rows=50000, since=None):
+        """Вся история по частям: в памяти не больше одного куска (memmap-срезы)"""
+        path = self._dir(symbol, interval)
+        meta = self._read_meta(path)
+        if not meta or meta['rows'] == 0:
+            return
+
+        rows = meta['rows']
+        ts = self._timestamps(path, rows)
+        start = 0
+        if since is not None:
+            start = int(np.searchsorted(ts, pd.Timestamp(since).tz_convert('UTC').value, side='left'))
+        columns = {col: self._column(path, f'{col}.f8', np.float64, rows) for col in self.COLUMNS}
+
+        for lo in range(start, rows, chunk_rows):
+            hi = min(lo + chunk_rows, rows)
+            index = pd.DatetimeIndex(np.asarray(ts[lo:hi]).view('M8[ns]')).tz_localize('UTC').tz_convert(meta['tz'])
+            index.name = meta.get('index_name')
+            yield pd.DataFrame({col: values[lo:hi] for col, values in columns.items()}, index=index, copy=False)
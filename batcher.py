@@ -0,0 +1,239 @@
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from metrics import METRICS
+
+
+ANALYSIS_RULES = """Format as Reddit markdown. Requirements:
+1. Start with ## 📊 {symbol} Analysis
+2. Clear signal headline (BUY/SELL/WAIT with confidence)
+3. Brief performance summary (1-2 sentences); if the confidence interval is wide, say the sample is small
+4. Current setup with SL/TP if applicable
+5. 1-2 sentence market context
+6. End with: "---\\n*Not financial advice | Multi-Asset Adaptive Strategy*"
+
+Keep under 250 words. Professional but friendly tone.
+"""
+
+SINGLE_PROMPT = """Create a concise Reddit trading analysis for {symbol}:
+
+{details}
+
+{rules}"""
+
+BATCH_PROMPT = """Create a concise Reddit trading analysis for each of the {count} symbols below.
+
+{blocks}
+
+For every symbol:
+{rules}
+Write exactly {count} analyses in the same order. Put each symbol's marker line (e.g. "{example}") alone on the line before its analysis and write nothing outside the analyses.
+"""
+
+MARKER = "=== {index}. {symbol} ==="
+MARKER_RE = re.compile(r'^=== (\d+)\. .*? ===[ \t]*$', re.MULTILINE)
+
+
+class BudgetExhausted(Exception):
+    """Бюджет токенов на окно исчерпан — отвечаем шаблоном"""
+
+
+class MissingSection(Exception):
+    """В пакетном ответе нет раздела для символа"""
+
+
+class TokenBudget:
+    """
+    Токены Claude за скользящее окно period секунд (как SlidingWindowRateLimiter, но с весами)
+    До запроса резервируется оценка, после ответа она заменяется фактическим расходом
+    """
+
+    def __init__(self, max_tokens, period=3600):
+        self.max_tokens = max_tokens
+        self.period = period
+        self._events = deque()  # [время, токены]
+        self._lock = threading.Lock()
+
+    def _used(self, now):
+        while self._events and now - self._events[0][0] >= self.period:
+            self._events.popleft()
+        return sum(tokens for _, tokens in self._events)
+
+    def remaining(self):
+        with self._lock:
+            return max(self.max_tokens - self._used(time.monotonic()), 0)
+
+    def reserve(self, tokens):
+        """Зарезервировать tokens; None — бюджет окна исчерпан"""
+        with self._lock:
+            now = time.monotonic()
+            if self._used(now) + tokens > self.max_tokens:
+                return None
+            event = [now, tokens]
+            self._events.append(event)
+            return event
+
+    def settle(self, event, tokens):
+        """Заменить резерв фактическим расходом"""
+        with self._lock:
+            event[1] = tokens
+            METRICS.set_gauge('claude_token_budget_remaining', max(self.max_tokens - self._used(time.monotonic()), 0))
+
+
+class _Item:
+    __slots__ = ('symbol', 'details', 'future', 'ticket')
+
+    def __init__(self, symbol, details, ticket):
+        self.symbol = symbol
+        self.details = details
+        self.future = Future()
+        self.ticket = ticket
+
+
+def estimate_tokens(text):
+    """Грубая оценка: ~4 символа на токен"""
+    return len(text) // 4 + 1
+
+
+class ClaudeBatcher:
+    """
+    Пока запрос к Claude в пути, новые анализы копятся до window секунд и уходят одним промптом:
+    общие требования один раз, данные символов — блоками с маркерами; ответ режется по маркерам
+    Свободный Claude получает запрос сразу, обычным промптом — одиночный ответ не ждет окна
+    """
+
+    def __init__(self, claude, model, executor, window=0.3, max_batch=5, max_tokens=500, budget=None):
+        self.claude = claude
+        self.model = model
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self.max_tokens = max_tokens  # на один ответ
+        self.budget = budget
+        self._pending = []
+        self._timer = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def submit(self, symbol, details):
+        """Future с текстом анализа; BudgetExhausted — если токенов на ответ не осталось"""
+        ticket = None
+        if self.budget:
+            estimate = estimate_tokens(details) + estimate_tokens(ANALYSIS_RULES) + self.max_tokens
+            ticket = self.budget.reserve(estimate)
+            if ticket is None:
+                raise BudgetExhausted(f"{self.budget.max_tokens} tokens per {self.budget.period}s used up")
+
+        item = _Item(symbol, details, ticket)
+        batch = None
+        with self._lock:
+            self._pending.append(item)
+            if self._in_flight == 0 or len(self._pending) >= self.max_batch or self.window <= 0:
+                batch = self._take()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if batch:
+            self.executor.submit(self._send, batch)
+        return item.future
+
+    def flush(self):
+        """Отправить накопленное, не дожидаясь конца окна"""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self.executor.submit(self._send, batch)
+
+    def _take(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self._in_flight += 1
+        return batch
+
+    def build_prompt(self, batch):
+        if len(batch) == 1:
+            item = batch[0]
+            return SINGLE_PROMPT.format(
+                symbol=item.symbol, details=item.details, rules=ANALYSIS_RULES.format(symbol=item.symbol)
+            )
+        blocks = '\n\n'.join(
+            f"{MARKER.format(index=i, symbol=item.symbol)}\n{item.details.strip()}" for i, item in enumerate(batch, 1)
+        )
+        return BATCH_PROMPT.format(
+            count=len(batch), blocks=blocks, rules=ANALYSIS_RULES.format(symbol='<symbol>'),
+            example=MARKER.format(index=1, symbol=batch[0].symbol)
+        )
+
+    @staticmethod
+    def split(text, count):
+        """Пакетный ответ -> {номер: текст} по строкам-маркерам"""
+        parts = MARKER_RE.split(text)
+        sections = {}
+        for number, body in zip(parts[1::2], parts[2::2]):
+            index = int(number)
+            if 1 <= index <= count and body.strip():
+                sections.setdefault(index, body.strip())
+        return sections
+
+    def _send(self, batch):
+        try:
+            self._request(batch)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            # Накопленное за время запроса уходит сразу, не дожидаясь конца окна
+            self.flush()
+
+    def _request(self, batch):
+        prompt = self.build_prompt(batch)
+        METRICS.inc('claude_batches_total')
+        METRICS.inc('claude_batched_replies_total', len(batch))
+        try:
+            with METRICS.span('claude'):
+                message = self.claude.messages.create(
+                    model=self.model,
+                    max_tokens=self.max_tokens * len(batch),
+                    messages=[{"role": "user", "content": prompt}]
+                )
+            text = message.content[0].text
+        except Exception as e:
+            for item in batch:
+                self._settle(item, 0)
+                item.future.set_exception(e)
+            return
+
+        usage = getattr(message, 'usage', None)
+        input_tokens = getattr(usage, 'input_tokens', estimate_tokens(prompt))
+        output_tokens = getattr(usage, 'output_tokens', estimate_tokens(text))
+        METRICS.inc('claude_tokens_total', input_tokens, kind='input')
+        METRICS.inc('claude_tokens_total', output_tokens, kind='output')
+
+        sections = {1: text} if len(batch) == 1 else self.split(text, len(batch))
+        details_total = sum(len(item.details) for item in batch) or 1
+        output_total = sum(len(s) for s in sections.values()) or 1
+
+        # Расход на ответ: вход делится по размеру блоков данных, выход — по длине разделов
+        for index, item in enumerate(batch, 1):
+            section = sections.get(index)
+            tokens = input_tokens * len(item.details) / details_total
+            if section:
+                tokens += output_tokens * len(section) / output_total
+            self._settle(item, round(tokens))
+
+            if section:
+                item.future.set_result(section)
+            else:
+                METRICS.inc('claude_missing_sections_total')
+                item.future.set_exception(MissingSection(f"no section for {item.symbol} in a batch of {len(batch)}"))
+
+    def _settle(self, item, tokens):
+        if item.ticket is not None:
+            self.budget.settle(item.ticket, tokens)
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарки горячих путей бота на синтетических данных
+
+    python benchmark.py --sizes 3mo:15m 1y:15m 2y:1m --repeat 5 --out bench_results.json
+
+Сеть не используется: praw / yfinance / Anthropic заменены заглушками из fakes.py
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import main
+import scanner as scanner_module
+import strategy as strategy_module
+from fakes import (
+    FakeAnthropic, FakeAnthropicServer, FakeComment, FakeQuoteFeed, FakeReddit, FakeYahooServer, FakeYFinance,
+    synthetic_ohlcv
+)
+from indicators import IncrementalIndicators
+from quotes import Quote
+from strategy import MultiAssetStrategy
+
+
+PERIOD_DAYS = {'d': 1, 'wk': 7, 'mo': 30, 'y': 365}
+INTERVAL_MINUTES = {'m': 1, 'h': 60, 'd': 1440}
+
+SAMPLE_COMMENTS = [
+    "!analyze BTC",
+    "what do you think about gold, is it going up?",
+    "!check XAUUSD please",
+    "lol this sub is wild today",
+    "!signal SPY, thanks",
+    "I bought NVDA at the top again",
+]
+
+
+def bars_for(size):
+    """'3mo:15m' -> число баров (24/7 торговля)"""
+    period, interval = size.split(':')
+    for suffix, days in PERIOD_DAYS.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            total_minutes = int(period[:-len(suffix)]) * days * 1440
+            break
+    else:
+        raise ValueError(f"Bad period in size: {size}")
+    for suffix, minutes in INTERVAL_MINUTES.items():
+        if interval.endswith(suffix):
+            return total_minutes // (int(interval[:-len(suffix)]) * minutes), interval
+    raise ValueError(f"Bad interval in size: {size}")
+
+
+def measure(fn, repeat, setup=None):
+    """Время fn() в мс по repeat прогонам; setup() вызывается вне замера"""
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        started = time.perf_counter()
+        fn(arg) if setup else fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+    }
+
+
+def bench_strategy(data, repeat, interval='15m'):
+    results = {}
+
+    def fresh():
+        s = MultiAssetStrategy('BENCH', 'Bitcoin')
+        s.data = data
+        return s
+
+    def with_signals():
+        s = fresh()
+        s.generate_signals()
+        return s
+
+    results['calculate_indicators'] = measure(lambda s: s.calculate_indicators(), repeat, fresh)
+    results['generate_signals'] = measure(lambda s: s.generate_signals(), repeat, fresh)
+    results['backtest[vectorized,100]'] = measure(lambda s: s.backtest(100), repeat, fresh)
+    results['backtest[legacy,100]'] = measure(lambda s: s.backtest(100, engine='legacy'), repeat, fresh)
+    results['backtest[vectorized,full]'] = measure(lambda s: s.backtest(len(data) - 1), repeat, fresh)
+    results['get_current_signal'] = measure(lambda s: s.get_current_signal(), repeat, with_signals)
+    # Ленивый граф: только последний бар, без предварительного generate_signals
+    results['get_current_signal[lazy]'] = measure(lambda s: s.get_current_signal(), repeat, fresh)
+    results['get_current_signal[lazy,breakout]'] = measure(
+        lambda s: s.get_current_signal(families=['breakout']), repeat, fresh
+    )
+
+    # Потоковые индикаторы: теплый символ + один новый бар
+    engine = IncrementalIndicators()
+    warm = MultiAssetStrategy('BENCH', 'Bitcoin', indicators=engine)
+    warm.data = data.iloc[:-1]
+    warm.calculate_indicators()
+
+    def next_bar():
+        warm.data = data
+        return warm
+
+    results['calculate_indicators[incremental,+1 bar]'] = measure(
+        lambda s: s.calculate_indicators(), repeat, next_bar
+    )
+
+    # Живая котировка: формирующийся бар по состоянию закрытых баров, без загрузки истории
+    warm.data, warm.interval = data, interval
+    warm.calculate_indicators()
+    quote = Quote('BENCH', float(data['Close'].iloc[-1]) * 1.001, data.index[-1].timestamp() + 1)
+
+    def live_quote():
+        warm.apply_quote(quote)
+        return warm.get_current_signal()
+
+    results['get_current_signal[live quote]'] = measure(live_quote, repeat)
+    return results
+
+
+def bench_market_data(repeat, latency):
+    """MarketDataClient против локального chart API: один символ, пакет, отказ при открытой цепи"""
+    results = {}
+    server = FakeYahooServer(FakeYFinance(), latency=latency)
+    client = strategy_module.MarketDataClient(server.url, retries=0, max_per_host=4)
+    symbols = [f"SYM{i}" for i in range(8)]
+    client.history_many(symbols)  # прогрев: кадры и соединения
+
+    results['market_data.history'] = measure(lambda: client.history('SYM0'), repeat)
+    results[f'market_data.history_many[x{len(symbols)}]'] = measure(lambda: client.history_many(symbols), repeat)
+
+    client.breaker.failure()
+    client.breaker.threshold = 1
+    client.breaker.failure()
+
+    def rejected():
+        try:
+            client.history('SYM0')
+        except strategy_module.CircuitOpenError:
+            pass
+
+    results['market_data.history[circuit open]'] = measure(rejected, repeat)
+    server.close()
+    return results
+
+
+def make_bot(yf_latency, llm_latency, llm_server=False, yf_server=False, live_quotes=False):
+    main.BAR_STORE_DIR = ''
+    main.PROCESSED_COMMENTS_FILE = ''
+    main.WATCHLIST_SCANNER = False
+    main.METRICS_PORT = 0
+    if yf_server:
+        # Настоящий MarketDataClient против локального chart API
+        source = FakeYFinance()
+        main.MARKET_DATA_URL = FakeYahooServer(source, latency=yf_latency).url
+        strategy_module.yf = scanner_module.yf = source
+    else:
+        main.MARKET_DATA_URL = ''
+        strategy_module.yf = scanner_module.yf = FakeYFinance(latency=yf_latency)
+    if llm_server:
+        # Настоящий клиент Anthropic против локального HTTP-сервера
+        from anthropic import Anthropic
+        server = FakeAnthropicServer(delay=llm_latency)
+        claude = Anthropic(api_key='bench', base_url=server.url, max_retries=0)
+    else:
+        claude = FakeAnthropic(latency=llm_latency)
+    feed = FakeQuoteFeed(strategy_module.yf, tick=0.5).start() if live_quotes else None
+    return main.TradingRedditBot(reddit=FakeReddit(), claude=claude, quote_feed=feed)
+
+
+def bench_bot(bot, repeat):
+    results = {}
+    comments = [FakeComment(body) for body in SAMPLE_COMMENTS]
+    texts = [c.body.lower() for c in comments]
+
+    def parse_all():
+        for text in texts:
+            bot.parse_symbol(text)
+
+    def parse_requests():
+        for comment in comments:
+            bot.parse_request(comment)
+
+    results[f'parse_symbol[x{len(texts)}]'] = measure(parse_all, repeat)
+    results[f'parse_request[x{len(comments)}]'] = measure(parse_requests, repeat)
+
+    def uncached():
+        bot.analysis_cache = main.AnalysisCache()
+        return 'BTC'
+
+    results['analyze_symbol[uncached]'] = measure(bot.analyze_symbol, repeat, uncached)
+    results['analyze_symbol[cached]'] = measure(lambda: bot.analyze_symbol('BTC'), repeat)
+
+    def uncached_batch():
+        bot.analysis_cache = main.AnalysisCache()
+        return ['BTC', 'ETH', 'GOLD']
+
+    results['analyze_batch[uncached,x3]'] = measure(bot.analyze_batch, repeat, uncached_batch)
+    return results
+
+
+def bench_claude_batcher(bot, repeat, symbols=('BTC', 'ETH', 'GOLD', 'SPY', 'QQQ')):
+    """Одновременные анализы: по запросу на символ (window=0) и одним пакетным запросом"""
+    results = {}
+    batcher = bot.claude_batcher
+    details = "**Current Signal:** WAIT\n**Price:** 100.0\n**RSI:** 50.0 | **ADX:** 20.0"
+    window = batcher.window
+
+    def concurrent():
+        futures = [batcher.submit(symbol, details) for symbol in symbols]
+        for future in futures:
+            future.result()
+
+    for label, batcher.window in (('window=0', 0), (f'window={window:g}', window)):
+        calls = bot.claude.calls if hasattr(bot.claude, 'calls') else None
+        results[f'claude_batcher[x{len(symbols)},{label}]'] = measure(concurrent, repeat)
+        if calls is not None:
+            print(f"   {label}: {(bot.claude.calls - calls) / repeat:g} Claude calls per {len(symbols)} analyses")
+    batcher.window = window
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Trading bot benchmarks")
+    parser.add_argument('--sizes', nargs='+', default=['3mo:15m', '1y:15m'],
+                        help="period:interval, e.g. 3mo:15m 1y:1h 2y:1m")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--yf-latency', type=float, default=0.0, help="fake Yahoo latency, seconds")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="fake Claude latency, seconds")
+    parser.add_argument('--llm-server', action='store_true', help="serve fake Claude over local HTTP")
+    parser.add_argument('--yf-server', action='store_true', help="serve fake Yahoo chart API over local HTTP")
+    parser.add_argument('--live-quotes', action='store_true', help="stream fake live quotes to the bot")
+    parser.add_argument('--out', default='bench_results.json')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': [],
+    }
+
+    for size in args.sizes:
+        bars, interval = bars_for(size)
+        print(f"\n📐 {size}: {bars} bars")
+        data = synthetic_ohlcv(bars, interval, seed=args.seed, start_price=40000.0)
+        for name, stats in bench_strategy(data, args.repeat, interval).items():
+            report['results'].append({'name': name, 'size': size, 'bars': bars, **stats})
+            print(f"   {name:<42} {stats['median_ms']:>10.3f} ms")
+
+    print(f"\n🌐 Market data client (server latency {args.yf_latency}s)")
+    for name, stats in bench_market_data(args.repeat, args.yf_latency).items():
+        report['results'].append({'name': name, 'size': 'market_data', 'bars': 6000, **stats})
+        print(f"   {name:<42} {stats['median_ms']:>10.3f} ms")
+
+    print(f"\n🤖 Bot (yf latency {args.yf_latency}s, llm latency {args.llm_latency}s)")
+    bot = make_bot(args.yf_latency, args.llm_latency, args.llm_server, args.yf_server, args.live_quotes)
+    for name, stats in bench_bot(bot, args.repeat).items():
+        report['results'].append({'name': name, 'size': 'bot', 'bars': strategy_module.yf.bars, **stats})
+        print(f"   {name:<42} {stats['median_ms']:>10.3f} ms")
+    for name, stats in bench_claude_batcher(bot, args.repeat).items():
+        report['results'].append({'name': name, 'size': 'claude', 'bars': 0, **stats})
+        print(f"   {name:<42} {stats['median_ms']:>10.3f} ms")
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main_cli()
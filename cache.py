@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def interval_seconds(interval):
+    """Интервал Yahoo ('15m', '1h', '1d') -> секунды"""
+    units = {'m': 60, 'h': 3600, 'd': 86400, 'wk': 604800}
+    for suffix, seconds in units.items():
+        if interval.endswith(suffix) and interval[:-len(suffix)].isdigit():
+            return int(interval[:-len(suffix)]) * seconds
+    raise ValueError(f"Unsupported interval: {interval}")
+
+
+def current_bar_start(interval, now=None):
+    """Начало текущего бара (epoch-секунды, выравнивание по UTC)"""
+    step = interval_seconds(interval)
+    now = time.time() if now is None else now
+    return int(now // step * step)
+
+
+class AnalysisCache:
+    """
+    LRU-кэш готовых ответов с TTL
+    Ключ: (символ Yahoo, время последнего бара)
+    """
+
+    def __init__(self, maxsize=256, ttl=900):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, record=True):
+        """Значение по ключу; record=False — не учитывать промах в счетчиках"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                expires, value = item
+                if expires > time.monotonic():
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._items[key]
+            if record:
+                self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._items),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total * 100, 1) if total else 0.0,
+            }
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Схлопывание одновременных запросов с одинаковым ключом
+    Первый вызов выполняет работу, остальные ждут его результат
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -0,0 +1,53 @@
+import re
+
+
+class CommandScanner:
+    """
+    Поиск триггеров и символов за один проход по тексту
+    Все триггеры и тикеры собраны в одно скомпилированное регулярное выражение
+    """
+
+    def __init__(self, triggers, symbols, timeframes=(), max_symbols=5):
+        self.triggers = {t.lower() for t in triggers}
+        self.symbols = {s.upper() for s in symbols}
+        self.timeframes = {t.lower() for t in timeframes}
+        self.max_symbols = max_symbols
+        # Длинные варианты раньше коротких: XAUUSD не должен распасться на XAU
+        alternatives = sorted(self.triggers | self.symbols | self.timeframes, key=len, reverse=True)
+        self._pattern = re.compile(
+            r'(?<![\w-])(' + '|'.join(re.escape(a) for a in alternatives) + r')(?![\w-])',
+            re.IGNORECASE
+        )
+        self._marker = '!' if all(t.startswith('!') for t in self.triggers) else None
+
+    def find_symbols(self, text):
+        """Все известные символы в порядке появления, без повторов"""
+        found = []
+        for match in self._pattern.finditer(text):
+            token = match.group(1).upper()
+            if token in self.symbols and token not in found:
+                found.append(token)
+        return found
+
+    def scan(self, text):
+        """(символы, таймфрейм или None) из команды; None, если триггера нет"""
+        # Большинство комментариев без '!' отсеиваются без регулярки
+        if self._marker and self._marker not in text:
+            return None
+
+        triggered = False
+        timeframe = None
+        found = []
+        for match in self._pattern.finditer(text):
+            token = match.group(1)
+            lowered = token.lower()
+            if lowered in self.triggers:
+                triggered = True
+            elif lowered in self.timeframes:
+                timeframe = timeframe or lowered
+            elif token.upper() not in found:
+                found.append(token.upper())
+
+        if not triggered:
+            return None
+        return found[:self.max_symbols], timeframe
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+
+class CompactFrame:
+    """
+    Компактное хранение баров, индикаторов и сигналов символа
+    Числа — непрерывный блок float32 (колонка x бар), флаги — упакованные биты,
+    время — int64 (нс UTC). DataFrame собирается только для отладки
+    Цены и индикаторы, попадающие в ответ (PRECISE), остаются float64: сканер и расчет
+    по запросу должны отдавать одинаковые цену, SL/TP и сделки бэктеста
+    """
+
+    PRECISE = ('Open', 'High', 'Low', 'Close', 'ATR', 'RSI', 'ADX')
+
+    def __init__(self, ts, tz, names, values, flags, rows, precise=None, wide=None):
+        self.ts = ts
+        self.tz = tz
+        self.names = names  # {колонка: строка в values}
+        self.values = values
+        self.flags = flags  # {колонка: np.packbits(...)}
+        self.rows = rows
+        self.precise = precise or {}  # {колонка: строка в wide}
+        self.wide = wide if wide is not None else np.empty((0, rows), dtype=np.float64)
+
+    @classmethod
+    def from_frame(cls, df, columns=None):
+        """DataFrame -> CompactFrame; bool-колонки упаковываются в биты"""
+        columns = list(columns or df.columns)
+        index = df.index if df.index.tz is not None else df.index.tz_localize('UTC')
+        ts = index.tz_convert('UTC').as_unit('ns').asi8.copy()
+
+        precise = [c for c in columns if c in cls.PRECISE and df[c].dtype != bool]
+        numeric = [c for c in columns if df[c].dtype != bool and c not in precise]
+        values = np.empty((len(numeric), len(df)), dtype=np.float32)
+        for i, col in enumerate(numeric):
+            values[i] = df[col].to_numpy(dtype=np.float32, na_value=np.nan)
+        wide = np.empty((len(precise), len(df)), dtype=np.float64)
+        for i, col in enumerate(precise):
+            wide[i] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        flags = {c: np.packbits(df[c].to_numpy(dtype=bool)) for c in columns if df[c].dtype == bool}
+        return cls(ts, str(index.tz), {c: i for i, c in enumerate(numeric)}, values, flags, len(df),
+                   {c: i for i, c in enumerate(precise)}, wide)
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def empty(self):
+        return self.rows == 0
+
+    @property
+    def columns(self):
+        return list(self.precise) + list(self.names) + list(self.flags)
+
+    def __contains__(self, name):
+        return name in self.precise or name in self.names or name in self.flags
+
+    def __getitem__(self, name):
+        """Колонка как массив NumPy: float64/float32 view или распакованные флаги"""
+        if name in self.precise:
+            return self.wide[self.precise[name]]
+        if name in self.names:
+            return self.values[self.names[name]]
+        if name in self.flags:
+            return np.unpackbits(self.flags[name], count=self.rows).astype(bool)
+        raise KeyError(name)
+
+    def flag_at(self, name, i):
+        """Один флаг без распаковки всей колонки"""
+        i = i % self.rows
+        return bool(self.flags[name][i >> 3] & (0x80 >> (i & 7)))
+
+    @property
+    def index(self):
+        return pd.DatetimeIndex(self.ts.view('M8[ns]')).tz_localize('UTC').tz_convert(self.tz)
+
+    def timestamp_at(self, i):
+        return pd.Timestamp(int(self.ts[i]), tz='UTC').tz_convert(self.tz)
+
+    def row(self, i):
+        """Строка бара как Series (имя — время бара)"""
+        data = {name: float(self.wide[j, i]) for name, j in self.precise.items()}
+        data.update({name: float(self.values[j, i]) for name, j in self.names.items()})
+        data.update({name: self.flag_at(name, i) for name in self.flags})
+        return pd.Series(data, name=self.timestamp_at(i), dtype=object)
+
+    def to_frame(self):
+        """Обратно в DataFrame (для отладки)"""
+        data = {name: self.wide[j] for name, j in self.precise.items()}
+        data.update({name: self.values[j] for name, j in self.names.items()})
+        data.update({name: self[name] for name in self.flags})
+        return pd.DataFrame(data, index=self.index.rename('Datetime'))
+
+    @property
+    def nbytes(self):
+        return self.ts.nbytes + self.values.nbytes + self.wide.nbytes + sum(bits.nbytes for bits in self.flags.values())
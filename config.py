@@ -14,11 +14,87 @@ REDDIT_CONFIG = {
 
 # Claude API
 CLAUDE_API_KEY = os.getenv('ANTHROPIC_API_KEY', 'YOUR_ANTHROPIC_KEY')
+ANTHROPIC_BASE_URL = os.getenv('ANTHROPIC_BASE_URL') or None  # e.g. a local fake server
+CLAUDE_TIMEOUT = 60  # hard HTTP timeout per request, seconds
+CLAUDE_MODEL = 'claude-sonnet-4-20250514'
+
+# Reply budget: if Claude is not done REPLY_DEADLINE seconds after the request
+# started, the template reply is posted and Claude's late text only fills the cache
+REPLY_DEADLINE = float(os.getenv('REPLY_DEADLINE', '15'))
+CLAUDE_THREADS = 4
+
+# While a Claude request is in flight, new analyses wait up to CLAUDE_BATCH_WINDOW seconds
+# and share the next request (0 = one request per reply); an idle bot sends right away.
+# Each reply may use up to CLAUDE_MAX_TOKENS output tokens
+CLAUDE_BATCH_WINDOW = float(os.getenv('CLAUDE_BATCH_WINDOW', '0.3'))
+CLAUDE_BATCH_SIZE = 5
+CLAUDE_MAX_TOKENS = 500
+# Claude tokens (input + output) per hour; when spent, replies use the template (0 = unlimited)
+CLAUDE_TOKEN_BUDGET = int(os.getenv('CLAUDE_TOKEN_BUDGET', '300000'))
 
 # Bot Settings
 SUBREDDIT_NAME = os.getenv('SUBREDDIT', 'test')  
+# Comma-separated list; in worker mode each process takes its own shard of it
+SUBREDDITS = [s.strip() for s in os.getenv('SUBREDDITS', SUBREDDIT_NAME).split(',') if s.strip()]
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', '1'))
+# Shared dedupe / reply quota / analysis cache for worker processes (empty = per-process state)
+COORDINATION_DB = os.getenv('COORDINATION_DB', '')
 CHECK_INTERVAL = 30  
 MAX_REPLIES_PER_HOUR = 20  
+REPLY_MIN_INTERVAL = 2  # seconds between replies
+WORKER_THREADS = int(os.getenv('WORKER_THREADS', '4'))
+WORK_QUEUE_SIZE = 100
+
+# Processed comment IDs survive restarts (empty string keeps them in memory only)
+PROCESSED_COMMENTS_FILE = os.getenv('PROCESSED_COMMENTS_FILE', 'data/processed_comments.log')
+PROCESSED_COMMENTS_CAPACITY = 1000
+
+# Backtest engine: 'vectorized' (NumPy) or 'legacy' (per-bar loop)
+BACKTEST_ENGINE = os.getenv('BACKTEST_ENGINE', 'vectorized')
+
+# Market data client: Yahoo chart API over one pooled keep-alive session with
+# per-host concurrency cap, jittered retries and a circuit breaker.
+# Empty MARKET_DATA_URL falls back to plain yfinance calls.
+MARKET_DATA_URL = os.getenv('MARKET_DATA_URL', 'https://query2.finance.yahoo.com')
+MARKET_DATA_TIMEOUT = 5  # per HTTP attempt, seconds
+MARKET_DATA_DEADLINE = 12  # per call including retries, seconds
+MARKET_DATA_RETRIES = 3
+MARKET_DATA_MAX_PER_HOST = 4  # in-flight requests per host
+BREAKER_FAILURES = 5  # failed calls in a row that open the circuit
+BREAKER_RESET = 30  # seconds before a probe request is let through
+
+# Live intrabar quotes: replies re-evaluate the signal, SL and TP on the forming bar
+# from cached indicator state instead of refetching history
+LIVE_QUOTES = os.getenv('LIVE_QUOTES', '0') == '1'
+QUOTE_POLL_INTERVAL = 5  # seconds between quote polls
+QUOTE_MAX_AGE = 30  # quotes received longer ago are ignored, seconds
+
+# Local OHLCV store (empty string disables it)
+BAR_STORE_DIR = os.getenv('BAR_STORE_DIR', 'data/bars')
+
+# Keep per-symbol indicator state and update only new bars
+INCREMENTAL_INDICATORS = os.getenv('INCREMENTAL_INDICATORS', '1') == '1'
+
+# Finished analyses are reused until the next bar closes
+ANALYSIS_CACHE_SIZE = 256
+ANALYSIS_CACHE_TTL = 900  # seconds
+
+# Bootstrap confidence intervals for backtest stats; the signal confidence
+# label is taken from the lower bound of the win rate interval
+BOOTSTRAP_RESAMPLES = 10000
+CONFIDENCE_LEVEL = 0.9
+
+# Prometheus metrics on http://127.0.0.1:METRICS_PORT/metrics (0, the default, disables the endpoint)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+
+# cProfile dump for requests slower than SLOW_REQUEST_SECONDS
+PROFILE_SLOW_REQUESTS = os.getenv('PROFILE_SLOW_REQUESTS', '0') == '1'
+SLOW_REQUEST_SECONDS = 10
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+
+# Background scanner: recompute every SYMBOL_MAP ticker at each 15m bar close
+WATCHLIST_SCANNER = os.getenv('WATCHLIST_SCANNER', '0') == '1'
+SCANNER_DELAY = 20  # seconds after bar close before downloading
 
 # Symbol Mapping (Reddit -> Yahoo Finance)
 SYMBOL_MAP = {
@@ -41,6 +117,18 @@ SYMBOL_MAP = {
     'NVDA': 'NVDA',
 }
 
+# Popular tickers without an alias (used as-is on Yahoo Finance)
+EXTRA_TICKERS = ['MSFT', 'GOOGL', 'AMZN']
+
+# Timeframes users can request (e.g. "!analyze BTC 4h").
+# Only BASE_INTERVAL is downloaded; the rest are resampled from it locally.
+BASE_INTERVAL = '15m'
+TIMEFRAMES = ['15m', '30m', '1h', '4h', '1d']
+
+# Command triggers; one comment may request up to MAX_SYMBOLS_PER_COMMAND symbols
+TRIGGERS = ['!analyze', '!check', '!signal']
+MAX_SYMBOLS_PER_COMMAND = 5
+
 # Asset Type Detection
 ASSET_TYPES = {
     'BTC': 'Bitcoin',
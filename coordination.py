@@ -0,0 +1,198 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from cache import AnalysisCache
+
+
+def reply_wait(count, oldest, newest, now, max_events, period, min_interval=0.0):
+    """Секунды до следующего слота ответа по окну (число, самый старый, самый новый ответ)"""
+    wait = 0.0
+    if count >= max_events:
+        wait = oldest + period - now
+    if newest is not None and min_interval:
+        wait = max(wait, newest + min_interval - now)
+    return max(wait, 0.0)
+
+
+class CoordinationStore(ABC):
+    """
+    Общее состояние воркеров бота: дедупликация комментариев,
+    глобальный лимит ответов и кэш анализов
+    Сетевой бэкенд (Redis, Postgres) должен реализовать эти методы атомарно;
+    бэкенд без какого-то из них не создается (TypeError при создании)
+    """
+
+    @abstractmethod
+    def claim_comment(self, comment_id, worker, created_utc=0.0):
+        """Занять комментарий; False — его уже взял другой воркер"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def reserve_reply(self, max_events, period, min_interval=0.0):
+        """Занять слот ответа: 0 — слот занят нами, иначе сколько секунд ждать"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def reply_window(self, period):
+        """Ответы за последние period секунд: (число, время самого старого, время самого нового)"""
+        raise NotImplementedError
+
+    def replies_in_window(self, period):
+        return self.reply_window(period)[0]
+
+    @abstractmethod
+    def cache_get(self, key):
+        raise NotImplementedError
+
+    @abstractmethod
+    def cache_put(self, key, value, ttl):
+        raise NotImplementedError
+
+
+class SQLiteCoordinationStore(CoordinationStore):
+    """
+    Реализация на SQLite для воркеров на одной машине
+    Блокировка файла базы (BEGIN IMMEDIATE) делает проверку и запись атомарными
+    """
+
+    CLAIM_RETENTION = 7 * 86400  # seconds
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        db = self._db()
+        db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS claims (
+                comment_id TEXT PRIMARY KEY, worker TEXT, created REAL, claimed_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS replies (ts REAL);
+            CREATE INDEX IF NOT EXISTS replies_ts ON replies (ts);
+            CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL);
+        """)
+
+    def _db(self):
+        # sqlite3-соединение нельзя делить между потоками — свое на каждый поток
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.db = db
+        return db
+
+    def claim_comment(self, comment_id, worker, created_utc=0.0):
+        db = self._db()
+        now = time.time()
+        cursor = db.execute(
+            "INSERT OR IGNORE INTO claims (comment_id, worker, created, claimed_at) VALUES (?, ?, ?, ?)",
+            (comment_id, str(worker), created_utc or 0.0, now)
+        )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            db.execute("DELETE FROM claims WHERE claimed_at < ?", (now - self.CLAIM_RETENTION,))
+        return cursor.rowcount == 1
+
+    def reserve_reply(self, max_events, period, min_interval=0.0):
+        db = self._db()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("DELETE FROM replies WHERE ts <= ?", (now - period,))
+            count, oldest, newest = db.execute("SELECT COUNT(*), MIN(ts), MAX(ts) FROM replies").fetchone()
+
+            wait = reply_wait(count, oldest, newest, now, max_events, period, min_interval)
+            if wait <= 0:
+                db.execute("INSERT INTO replies (ts) VALUES (?)", (now,))
+            db.execute("COMMIT")
+            return wait
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def reply_window(self, period):
+        return self._db().execute(
+            "SELECT COUNT(*), MIN(ts), MAX(ts) FROM replies WHERE ts > ?", (time.time() - period,)
+        ).fetchone()
+
+    def cache_get(self, key):
+        row = self._db().execute(
+            "SELECT value, expires FROM cache WHERE key = ?", (repr(key),)
+        ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return pickle.loads(row[0])
+
+    def cache_put(self, key, value, ttl):
+        db = self._db()
+        now = time.time()
+        db.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (repr(key), pickle.dumps(value), now + ttl)
+        )
+        self._writes += 1
+        if self._writes % 100 == 0:
+            db.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+
+
+class SharedRateLimiter:
+    """Глобальный лимит ответов на всех воркеров (интерфейс как у SlidingWindowRateLimiter)"""
+
+    def __init__(self, store, max_events, period=3600, min_interval=0.0):
+        self.store = store
+        self.max_events = max_events
+        self.period = period
+        self.min_interval = min_interval
+
+    def wait_time(self):
+        """Сколько секунд придется ждать следующий слот (без резервирования)"""
+        count, oldest, newest = self.store.reply_window(self.period)
+        return reply_wait(count, oldest, newest, time.time(), self.max_events, self.period, self.min_interval)
+
+    def in_window(self):
+        return self.store.replies_in_window(self.period)
+
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.store.reserve_reply(self.max_events, self.period, self.min_interval)
+            if wait <= 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            # Другой воркер мог освободить/занять слот — перепроверяем не реже раза в минуту
+            time.sleep(min(wait, 60))
+
+
+class SharedAnalysisCache(AnalysisCache):
+    """Локальный LRU перед общим кэшем: готовый ответ одного воркера видят все"""
+
+    def __init__(self, store, maxsize=256, ttl=900):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.store = store
+
+    def get(self, key, record=True):
+        value = super().get(key, record=False)
+        if value is not None:
+            return value
+
+        value = self.store.cache_get(key)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+            elif record:
+                self.misses += 1
+        if value is not None:
+            super().put(key, value)
+        return value
+
+    def put(self, key, value):
+        super().put(key, value)
+        self.store.cache_put(key, value, self.ttl)
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class CommentIndex:
+    """
+    Индекс обработанных комментариев фиксированного размера
+    Вставка/поиск/вытеснение — O(1); журнал на диске переживает рестарт
+    """
+
+    def __init__(self, path=None, capacity=1000):
+        self.path = path
+        self.capacity = capacity
+        self.last_created = 0.0
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+        self._file = None
+        self._lines = 0
+
+        if path:
+            started = time.perf_counter()
+            self._load()
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, 'a', encoding='utf-8')
+            if self._ids:
+                elapsed = (time.perf_counter() - started) * 1000
+                print(f"📂 Restored {len(self._ids)} processed comments in {elapsed:.1f}ms")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                self._lines += 1
+                comment_id, _, created = line.rstrip('\n').partition('\t')
+                if not comment_id:
+                    continue
+                self._remember(comment_id, float(created) if created else 0.0)
+
+    def _remember(self, comment_id, created_utc):
+        self._ids[comment_id] = created_utc
+        self._ids.move_to_end(comment_id)
+        if len(self._ids) > self.capacity:
+            self._ids.popitem(last=False)
+        self.last_created = max(self.last_created, created_utc)
+
+    def __contains__(self, comment_id):
+        with self._lock:
+            return comment_id in self._ids
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ids)
+
+    def add(self, comment_id, created_utc=0.0):
+        """Запомнить комментарий; False — если он уже был"""
+        with self._lock:
+            if comment_id in self._ids:
+                return False
+            self._remember(comment_id, created_utc or 0.0)
+
+            if self._file:
+                self._file.write(f"{comment_id}\t{created_utc or 0.0}\n")
+                self._file.flush()
+                self._lines += 1
+                if self._lines > 2 * self.capacity:
+                    self._compact()
+            return True
+
+    def _compact(self):
+        """Переписать журнал, оставив только актуальные id"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for comment_id, created_utc in self._ids.items():
+                f.write(f"{comment_id}\t{created_utc}\n")
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._lines = len(self._ids)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
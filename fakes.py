@@ -0,0 +1,379 @@
+"""
+Локальные заглушки для praw / yfinance / Anthropic и генератор синтетических OHLCV
+Используются бенчмарками и нагрузочными прогонами — без сети и ключей
+"""
+
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from cache import interval_seconds
+from quotes import Quote, QuoteFeed
+
+
+def interval_to_freq(interval):
+    """Интервал Yahoo ('15m', '1h', '1d') -> частота pandas"""
+    for suffix, unit in (('m', 'min'), ('h', 'h'), ('d', 'D')):
+        if interval.endswith(suffix):
+            return interval[:-len(suffix)] + unit
+    raise ValueError(f"Unsupported interval: {interval}")
+
+
+def synthetic_ohlcv(bars, interval='15m', seed=0, start_price=100.0, volatility=0.004,
+                    end=None, tz='UTC'):
+    """Детерминированный OHLCV: геометрическое блуждание с фиксированным seed"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, volatility, bars)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    wick = np.abs(rng.normal(0, volatility * 0.75, bars)) * close
+    high = np.maximum(open_, close) + wick * rng.random(bars)
+    low = np.minimum(open_, close) - wick * rng.random(bars)
+    volume = rng.lognormal(10, 0.6, bars).round()
+
+    freq = interval_to_freq(interval)
+    end = pd.Timestamp(end or '2024-06-28 20:00', tz=tz).floor(freq)
+    index = pd.date_range(end=end, periods=bars, freq=freq, name='Datetime')
+    return pd.DataFrame(
+        {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+        index=index
+    )
+
+
+# ============================================================================
+# yfinance
+# ============================================================================
+
+class FakeTicker:
+    def __init__(self, source, symbol):
+        self.source = source
+        self.symbol = symbol
+
+    def history(self, period=None, interval='15m', start=None, **kwargs):
+        self.source.calls += 1
+        time.sleep(self.source.latency)
+        data = self.source.frame(self.symbol, interval)
+        if start is not None:
+            return data[data.index >= pd.Timestamp(start)].copy()
+        return data.copy()
+
+
+class FakeYFinance:
+    """Замена модуля yfinance: Ticker() и download() на синтетических данных"""
+
+    def __init__(self, bars=6000, latency=0.0, frames=None):
+        self.bars = bars
+        self.latency = latency
+        self.calls = 0
+        self._frames = dict(frames or {})
+        self._lock = threading.Lock()
+
+    def frame(self, symbol, interval='15m'):
+        with self._lock:
+            key = (symbol, interval)
+            if key not in self._frames:
+                seed = sum(ord(c) for c in symbol)
+                self._frames[key] = synthetic_ohlcv(self.bars, interval, seed=seed)
+            return self._frames[key]
+
+    def Ticker(self, symbol, session=None):
+        return FakeTicker(self, symbol)
+
+    def download(self, tickers, interval='15m', start=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        frames = {}
+        for symbol in tickers:
+            data = self.frame(symbol, interval)
+            frames[symbol] = data[data.index >= pd.Timestamp(start)] if start is not None else data
+        return pd.concat(frames, axis=1)
+
+
+class FakeYahooServer:
+    """
+    Локальный HTTP-сервер с chart API Yahoo (/v8/finance/chart/<символ>) для MarketDataClient:
+    MarketDataClient(base_url=server.url)
+    status можно менять на лету (503 — проверить повторы и circuit breaker)
+    """
+
+    def __init__(self, source=None, latency=0.0, status=200, port=0):
+        self.source = source or FakeYFinance()  # откуда брать бары
+        self.latency = latency
+        self.status = status
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0  # пик одновременных запросов (проверка лимита на хост)
+        self._lock = threading.Lock()
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, как у Yahoo
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.calls += 1
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                try:
+                    time.sleep(fake.latency)
+                    status, body = fake._respond(self.path)
+                finally:
+                    with fake._lock:
+                        fake.in_flight -= 1
+
+                payload = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-yahoo", daemon=True).start()
+
+    def _respond(self, path):
+        if self.status != 200:
+            return self.status, {'chart': {'result': None, 'error': {'code': 'Internal', 'description': 'fake failure'}}}
+
+        url = urlsplit(path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        symbol = unquote(url.path.rsplit('/', 1)[-1])
+        interval = query.get('interval', '15m')
+        data = self.source.frame(symbol, interval)
+        if 'period1' in query:
+            data = data[data.index >= pd.Timestamp(int(query['period1']), unit='s', tz='UTC')]
+        elif query.get('range') == '1d':
+            data = data.iloc[-1:]
+
+        quotes = {key: data[col].round(6).tolist() for col, key in
+                  (('Open', 'open'), ('High', 'high'), ('Low', 'low'), ('Close', 'close'), ('Volume', 'volume'))}
+        # Живая цена, как у Yahoo, не зависит от интервала запроса: последний 15m бар
+        live = self.source.frame(symbol, '15m')
+        meta = {'symbol': symbol, 'dataGranularity': interval, 'exchangeTimezoneName': str(data.index.tz or 'UTC'),
+                'regularMarketPrice': round(float(live['Close'].iloc[-1]), 6),
+                'regularMarketTime': int(live.index[-1].timestamp())}
+        return 200, {'chart': {'result': [{
+            'meta': meta,
+            'timestamp': (data.index.as_unit('ns').asi8 // 10**9).tolist(),
+            'indicators': {'quote': [quotes]},
+        }], 'error': None}}
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeQuoteFeed(QuoteFeed):
+    """
+    Push-поток котировок без сети (как websocket): раз в tick секунд по каждому символу
+    случайный шаг цены от последнего Close синтетических баров; время сделок — внутри последнего бара
+    """
+
+    def __init__(self, source=None, interval='15m', tick=1.0, volatility=0.0005, seed=0):
+        super().__init__()
+        self.source = source or FakeYFinance()
+        self.interval = interval
+        self.tick = tick
+        self.volatility = volatility
+        self._rng = np.random.default_rng(seed)
+        self._prices = {}
+        self._started = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="fake-quotes", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+
+    def step(self):
+        """По одной котировке на каждый подписанный символ"""
+        elapsed = time.monotonic() - self._started
+        for symbol in self.symbols():
+            frame = self.source.frame(symbol, self.interval)
+            price = self._prices.get(symbol, float(frame['Close'].iloc[-1]))
+            price *= float(np.exp(self._rng.normal(0, self.volatility)))
+            self._prices[symbol] = price
+            ts = frame.index[-1].timestamp() + min(elapsed, interval_seconds(self.interval) - 1)
+            self.publish(Quote(symbol, round(price, 6), ts))
+
+    def _loop(self):
+        while not self._stop.wait(self.tick):
+            self.step()
+
+
+# ============================================================================
+# Anthropic
+# ============================================================================
+
+def fake_reply(prompt, reply_text=None):
+    """Текст заглушки: reply_text или первая строка промпта; на пакетный промпт — раздел на каждый маркер"""
+    markers = re.findall(r'^=== \d+\. .+ ===$', prompt, re.MULTILINE)
+    if not markers:
+        return reply_text or prompt.splitlines()[0]
+    return '\n\n'.join(f"{marker}\n{reply_text or '## 📊 ' + marker[4:-4].split('. ', 1)[1] + ' Analysis'}"
+                       for marker in markers)
+
+
+class _FakeMessages:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, model=None, max_tokens=500, messages=None, **kwargs):
+        self.client.calls += 1
+        time.sleep(self.client.latency)
+        prompt = messages[-1]['content'] if messages else ''
+        text = fake_reply(prompt, self.client.reply_text)
+        return SimpleNamespace(
+            content=[SimpleNamespace(type='text', text=text)],
+            usage=SimpleNamespace(input_tokens=len(prompt) // 4, output_tokens=len(text) // 4),
+        )
+
+
+class FakeAnthropic:
+    """Замена клиента Anthropic с настраиваемой задержкой"""
+
+    def __init__(self, latency=0.0, reply_text=None):
+        self.latency = latency
+        self.reply_text = reply_text
+        self.calls = 0
+        self.messages = _FakeMessages(self)
+
+
+class FakeAnthropicServer:
+    """
+    Локальный HTTP-сервер с API /v1/messages для настоящего клиента Anthropic:
+    Anthropic(api_key='test', base_url=server.url)
+    """
+
+    def __init__(self, delay=0.0, reply_text=None, status=200, port=0):
+        self.delay = delay
+        self.reply_text = reply_text
+        self.status = status
+        self.calls = 0
+        self._lock = threading.Lock()
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                with fake._lock:
+                    fake.calls += 1
+                time.sleep(fake.delay)
+
+                if fake.status != 200:
+                    body = {'type': 'error', 'error': {'type': 'api_error', 'message': 'fake failure'}}
+                else:
+                    messages = request.get('messages') or [{}]
+                    prompt = messages[-1].get('content', '')
+                    text = fake_reply(prompt, fake.reply_text)
+                    body = {
+                        'id': f"msg_fake_{fake.calls}",
+                        'type': 'message',
+                        'role': 'assistant',
+                        'model': request.get('model', 'fake'),
+                        'content': [{'type': 'text', 'text': text}],
+                        'stop_reason': 'end_turn',
+                        'stop_sequence': None,
+                        'usage': {'input_tokens': len(prompt) // 4, 'output_tokens': len(text) // 4},
+                    }
+
+                payload = json.dumps(body).encode()
+                try:
+                    self.send_response(fake.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # клиент уже ушел по таймауту
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-anthropic", daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ============================================================================
+# praw
+# ============================================================================
+
+_comment_ids = itertools.count(1)
+
+
+class FakeComment:
+    def __init__(self, body, author='tester', comment_id=None, created_utc=None, reply_latency=0.0):
+        self.id = comment_id or f"c{next(_comment_ids)}"
+        self.body = body
+        self.author = author
+        self.created_utc = created_utc if created_utc is not None else time.time()
+        self.reply_latency = reply_latency
+        self.replies = []
+        self.replied_at = None  # time.monotonic() последнего ответа
+
+    def reply(self, text):
+        time.sleep(self.reply_latency)
+        self.replies.append(text)
+        self.replied_at = time.monotonic()
+        return SimpleNamespace(id=f"r_{self.id}", body=text)
+
+
+class _FakeStream:
+    def __init__(self, subreddit):
+        self.subreddit = subreddit
+
+    def comments(self, skip_existing=False, **kwargs):
+        yield from self.subreddit.comments
+
+
+class FakeSubreddit:
+    def __init__(self, name, comments=None):
+        self.display_name = name
+        self.comments = list(comments or [])
+        self.stream = _FakeStream(self)
+
+
+class FakeReddit:
+    """Замена praw.Reddit: сабреддиты с заранее заданными комментариями"""
+
+    def __init__(self, comments=None):
+        self.comments = list(comments or [])
+
+    def subreddit(self, name):
+        return FakeSubreddit(name, self.comments)
@@ -0,0 +1,445 @@
+import math
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from signal_graph import INDICATOR_COLUMNS, reach
+
+FLOAT_COLUMNS = [col for col in INDICATOR_COLUMNS if col != 'Volume_Spike']
+
+
+def _div(a, b):
+    """Деление с семантикой NumPy (inf/NaN вместо исключения)"""
+    if b == 0:
+        if a == 0 or a != a:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class _Rolling:
+    """Скользящее окно: среднее и std (ddof=1) как у pandas rolling(window)"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.valid = 0
+        self.base = 0.0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.pushes = 0
+
+    def copy(self):
+        other = _Rolling.__new__(_Rolling)
+        other.__dict__.update(self.__dict__)
+        other.values = deque(self.values)
+        return other
+
+    def push(self, x):
+        self.values.append(x)
+        if x == x:
+            self.valid += 1
+            self.sum += x - self.base
+            self.sumsq += (x - self.base) ** 2
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.valid -= 1
+                self.sum -= old - self.base
+                self.sumsq -= (old - self.base) ** 2
+
+        # Пересчет сумм раз в окно: нет накопления ошибки, амортизированно O(1)
+        self.pushes += 1
+        if self.pushes >= self.window:
+            self._resync()
+
+    def _resync(self):
+        valid = [x for x in self.values if x == x]
+        self.base = valid[0] if valid else 0.0
+        self.sum = math.fsum(x - self.base for x in valid)
+        self.sumsq = math.fsum((x - self.base) ** 2 for x in valid)
+        self.pushes = 0
+
+    def mean(self):
+        if self.valid < self.window:
+            return math.nan
+        return self.base + self.sum / self.valid
+
+    def std(self):
+        if self.valid < self.window:
+            return math.nan
+        n = self.valid
+        var = (self.sumsq - self.sum * self.sum / n) / (n - 1)
+        return math.sqrt(max(var, 0.0))
+
+
+class _RollingExtreme:
+    """Скользящий max/min на монотонной деке"""
+
+    def __init__(self, window, is_max=True):
+        self.window = window
+        self.is_max = is_max
+        self.count = 0
+        self.extremes = deque()
+        self.nans = deque()
+
+    def copy(self):
+        other = _RollingExtreme.__new__(_RollingExtreme)
+        other.__dict__.update(self.__dict__)
+        other.extremes = deque(self.extremes)
+        other.nans = deque(self.nans)
+        return other
+
+    def push(self, x):
+        i = self.count
+        self.count += 1
+
+        if x != x:
+            self.nans.append(i)
+        else:
+            while self.extremes and (x >= self.extremes[-1][1] if self.is_max else x <= self.extremes[-1][1]):
+                self.extremes.pop()
+            self.extremes.append((i, x))
+
+        lowest = i - self.window + 1
+        while self.extremes and self.extremes[0][0] < lowest:
+            self.extremes.popleft()
+        while self.nans and self.nans[0] < lowest:
+            self.nans.popleft()
+
+    def value(self):
+        if self.count < self.window or self.nans or not self.extremes:
+            return math.nan
+        return self.extremes[0][1]
+
+
+class _Ema:
+    """EMA как у pandas ewm(span, adjust=False)"""
+
+    def __init__(self, span):
+        alpha = 2.0 / (span + 1.0)
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = alpha
+        self.weighted = None
+        self.old_wt = 1.0
+
+    def copy(self):
+        other = _Ema.__new__(_Ema)
+        other.__dict__.update(self.__dict__)
+        return other
+
+    def push(self, x):
+        if self.weighted is None:
+            self.weighted = x
+            return x
+
+        weighted = self.weighted
+        if weighted == weighted:
+            self.old_wt *= self.old_wt_factor
+            if x == x:
+                if weighted != x:
+                    weighted = self.old_wt * weighted + self.new_wt * x
+                    weighted /= (self.old_wt + self.new_wt)
+                self.old_wt = 1.0
+        elif x == x:
+            weighted = x
+
+        self.weighted = weighted
+        return weighted
+
+
+class IndicatorState:
+    """Состояние индикаторов одного символа: один бар обновляется за O(1)"""
+
+    def __init__(self, volatility_adj=1.0, params=None):
+        params = params or {}
+        self.volatility_adj = volatility_adj
+        self.bb_std = params.get('bb_std', 2.0)
+        self.volume_spike = params.get('volume_spike', 1.2)
+        self.prev_high = math.nan
+        self.prev_low = math.nan
+        self.prev_close = math.nan
+
+        self.tr = _Rolling(14)
+        self.plus_dm = _Rolling(14)
+        self.minus_dm = _Rolling(14)
+        self.dx = _Rolling(14)
+        self.gain = _Rolling(14)
+        self.loss = _Rolling(14)
+
+        self.ema_fast = _Ema(params.get('ema_fast', 21))
+        self.ema_slow = _Ema(params.get('ema_slow', 50))
+        self.ema_filter = _Ema(params.get('ema_filter', 200))
+
+        self.bb = _Rolling(params.get('bb_period', 20))
+        self.volume = _Rolling(20)
+        self.highest = _RollingExtreme(20, is_max=True)
+        self.lowest = _RollingExtreme(20, is_max=False)
+
+    def copy(self):
+        other = IndicatorState.__new__(IndicatorState)
+        for name, value in self.__dict__.items():
+            other.__dict__[name] = value.copy() if hasattr(value, 'copy') else value
+        return other
+
+    def update(self, open_, high, low, close, volume):
+        """Добавить бар и вернуть значения индикаторов для него"""
+        # ATR / ADX: True Range (max по непустым значениям, как pandas max(axis=1))
+        ranges = [r for r in (high - low, abs(high - self.prev_close), abs(low - self.prev_close)) if r == r]
+        tr = max(ranges) if ranges else math.nan
+        self.tr.push(tr)
+        tr_mean = self.tr.mean()
+
+        plus_dm = high - self.prev_high
+        minus_dm = -(low - self.prev_low)
+        self.plus_dm.push(0.0 if plus_dm < 0 else plus_dm)
+        self.minus_dm.push(0.0 if minus_dm < 0 else minus_dm)
+
+        plus_di = 100 * _div(self.plus_dm.mean(), tr_mean)
+        minus_di = 100 * _div(self.minus_dm.mean(), tr_mean)
+        self.dx.push(_div(100 * abs(plus_di - minus_di), plus_di + minus_di))
+
+        # RSI: первое delta = NaN превращается в 0, как у where()
+        delta = close - self.prev_close
+        self.gain.push(delta if delta > 0 else 0.0)
+        self.loss.push(-(delta if delta < 0 else 0.0))
+        rsi = 100 - _div(100, 1 + _div(self.gain.mean(), self.loss.mean()))
+
+        # Bollinger Bands
+        self.bb.push(close)
+        bb_middle = self.bb.mean()
+        bb_std = self.bb.std()
+
+        # Volume
+        self.volume.push(volume)
+        volume_sma = self.volume.mean()
+
+        self.highest.push(high)
+        self.lowest.push(low)
+
+        self.prev_high = high
+        self.prev_low = low
+        self.prev_close = close
+
+        return {
+            'ATR': tr_mean * self.volatility_adj,
+            'EMA_Fast': self.ema_fast.push(close),
+            'EMA_Slow': self.ema_slow.push(close),
+            'EMA_Filter': self.ema_filter.push(close),
+            'ADX': self.dx.mean(),
+            'RSI': rsi,
+            'BB_Middle': bb_middle,
+            'BB_Std': bb_std,
+            'BB_Upper': bb_middle + (self.bb_std * bb_std),
+            'BB_Lower': bb_middle - (self.bb_std * bb_std),
+            'Volume_SMA': volume_sma,
+            'Volume_Spike': volume > (volume_sma * self.volume_spike),
+            'Highest_High': self.highest.value(),
+            'Lowest_Low': self.lowest.value(),
+        }
+
+
+class _Entry:
+    """Закрытые бары символа: состояние + уже посчитанные колонки"""
+
+    VERIFY_TAIL = 32
+    WARMUP = 64  # баров достаточно, чтобы заполнить все окна (ADX — 2 x 14)
+
+    def __init__(self, volatility_adj, params=None):
+        self.lock = threading.Lock()
+        self.reset(volatility_adj, params)
+
+    def reset(self, volatility_adj, params=None):
+        self.state = IndicatorState(volatility_adj, params)
+        self.warmup = max(self.WARMUP, 2 * (params or {}).get('bb_period', 20))
+        # Сколько первых строк окна зависят от баров до него (EMA — все, их поправляет ema_offsets)
+        graph_params = {'bb_period': 20, **(params or {})}
+        self.reach = {col: rows for col in INDICATOR_COLUMNS if (rows := reach(col, graph_params)) is not None}
+        self.trimmed = False  # окно сдвигалось: первые строки посчитаны с барами до окна
+        self.rows = 0
+        self.ts = np.empty(0, dtype=np.int64)
+        self.close = np.empty(0, dtype=np.float64)
+        self.columns = {col: np.empty(0, dtype=bool if col == 'Volume_Spike' else np.float64)
+                        for col in INDICATOR_COLUMNS}
+
+    def _reserve(self, rows):
+        if rows <= len(self.ts):
+            return
+        capacity = max(rows, 2 * len(self.ts), 256)
+        self.ts = np.resize(self.ts, capacity)
+        self.close = np.resize(self.close, capacity)
+        for col, values in self.columns.items():
+            self.columns[col] = np.resize(values, capacity)
+
+    def append(self, ts, close, row):
+        self._reserve(self.rows + 1)
+        self.ts[self.rows] = ts
+        self.close[self.rows] = close
+        for col in INDICATOR_COLUMNS:
+            self.columns[col][self.rows] = row[col]
+        self.rows += 1
+
+    def seed(self, ts, open_, high, low, close, volume, df, rows):
+        """
+        Заполнить строки из полного расчета и восстановить состояние:
+        EMA берутся из готовых колонок, окна — прогоном последних WARMUP баров
+        """
+        self._reserve(rows)
+        self.ts[:rows] = ts[:rows]
+        self.close[:rows] = close[:rows]
+        for col in INDICATOR_COLUMNS:
+            self.columns[col][:rows] = df[col].to_numpy()[:rows]
+        self.rows = rows
+
+        state = self.state
+        start = max(rows - self.warmup, 0)
+        if start > 0:
+            state.prev_high = high[start - 1]
+            state.prev_low = low[start - 1]
+            state.prev_close = close[start - 1]
+            state.ema_fast.weighted = df['EMA_Fast'].iloc[start - 1]
+            state.ema_slow.weighted = df['EMA_Slow'].iloc[start - 1]
+            state.ema_filter.weighted = df['EMA_Filter'].iloc[start - 1]
+        for j in range(start, rows):
+            state.update(open_[j], high[j], low[j], close[j], volume[j])
+
+    def drop_head(self, count):
+        """Окно данных сдвинулось вперед — старые строки больше не нужны"""
+        if count <= 0:
+            return
+        self.trimmed = True
+        self.ts = self.ts[count:]
+        self.close = self.close[count:]
+        for col in INDICATOR_COLUMNS:
+            self.columns[col] = self.columns[col][count:]
+        self.rows -= count
+
+    def ema_offsets(self, positions):
+        """
+        Поправки EMA для строк positions окна: {колонка: массив} (пусто, если поправлять нечего)
+        Пересчет pandas по окну стартует EMA с Close первого бара, а состояние помнит бары,
+        ушедшие из окна: EMA_окна(j) = EMA_поток(j) + (1 - alpha)^j * (Close_0 - EMA_поток(0))
+        """
+        if self.rows == 0:
+            return {}
+        offsets = {}
+        for col, ema in (('EMA_Fast', self.state.ema_fast), ('EMA_Slow', self.state.ema_slow),
+                         ('EMA_Filter', self.state.ema_filter)):
+            gap = self.close[0] - self.columns[col][0]
+            if gap != 0 and gap == gap:
+                offsets[col] = gap * ema.old_wt_factor ** np.asarray(positions, dtype=np.float64)
+        return offsets
+
+    def align(self, ts, close):
+        """Позиция начала новых данных в сохраненных строках (или None)"""
+        if self.rows == 0:
+            return None
+        pos = int(np.searchsorted(self.ts[:self.rows], ts[0]))
+        overlap = self.rows - pos
+        if pos >= self.rows or self.ts[pos] != ts[0] or overlap > len(ts) - 1:
+            return None
+        # Сверяем хвост пересечения: Yahoo мог пересчитать последние закрытые бары
+        check = min(overlap, self.VERIFY_TAIL)
+        if not (np.array_equal(ts[overlap - check:overlap], self.ts[self.rows - check:self.rows]) and
+                np.array_equal(close[overlap - check:overlap], self.close[self.rows - check:self.rows], equal_nan=True)):
+            return None
+        return pos
+
+
+class IncrementalIndicators:
+    """
+    Потоковый расчет индикаторов с состоянием по символам
+    Новый бар считается за O(1); последний (формирующийся) бар
+    считается на копии состояния и не фиксируется
+    Когда окно данных сдвигается, EMA поправляются к старту с первого бара окна, и хвост
+    совпадает с полным пересчетом pandas. Первые бары окна, которые зависят от баров до него
+    (прогрев скользящих окон: reach колонки по графу, до 40 у ADX), становятся NaN (False у
+    Volume_Spike), как прогрев у пересчета; остальные строки совпадают с ним
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._guard = threading.Lock()
+
+    def apply(self, key, data, volatility_adj, batch=None, params=None):
+        """
+        Вернуть новый DataFrame: бары data + колонки индикаторов
+        batch — функция полного расчета pandas; ускоряет холодный старт
+        """
+        n = len(data)
+        index = data.index if data.index.tz is not None else data.index.tz_localize('UTC')
+        ts = index.as_unit('ns').asi8
+        open_ = data['Open'].to_numpy(dtype=np.float64)
+        high = data['High'].to_numpy(dtype=np.float64)
+        low = data['Low'].to_numpy(dtype=np.float64)
+        close = data['Close'].to_numpy(dtype=np.float64)
+        volume = data['Volume'].to_numpy(dtype=np.float64)
+
+        with self._guard:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(volatility_adj, params)
+
+        with entry.lock:
+            pos = entry.align(ts, close)
+            if pos is None or entry.state.volatility_adj != volatility_adj:
+                # Новый символ или история разошлась — считаем с нуля
+                entry.reset(volatility_adj, params)
+                if batch is not None:
+                    df = batch(data)
+                    entry.seed(ts, open_, high, low, close, volume, df, n - 1)
+                    return df
+            else:
+                entry.drop_head(pos)
+
+            for j in range(entry.rows, n - 1):
+                row = entry.state.update(open_[j], high[j], low[j], close[j], volume[j])
+                entry.append(ts[j], close[j], row)
+
+            last_row = entry.state.copy().update(open_[-1], high[-1], low[-1], close[-1], volume[-1])
+
+            # Все float-колонки — один блок (строка на колонку, как их хранит pandas): без вставок по одной
+            values = np.empty((len(FLOAT_COLUMNS), n))
+            for i, col in enumerate(FLOAT_COLUMNS):
+                values[i, :n - 1] = entry.columns[col][:n - 1]
+                values[i, -1] = last_row[col]
+            spike = np.append(entry.columns['Volume_Spike'][:n - 1], last_row['Volume_Spike'])
+            for col, rows in entry.reach.items() if entry.trimmed else ():
+                if col == 'Volume_Spike':
+                    spike[:rows] = False
+                else:
+                    values[FLOAT_COLUMNS.index(col), :rows] = np.nan
+            for col, offsets in entry.ema_offsets(np.arange(n)).items():
+                values[FLOAT_COLUMNS.index(col)] += offsets
+
+        frame = pd.DataFrame(values.T, index=data.index, columns=FLOAT_COLUMNS, copy=False)
+        frame.insert(INDICATOR_COLUMNS.index('Volume_Spike'), 'Volume_Spike', spike)
+        bars = data.drop(columns=INDICATOR_COLUMNS) if data.columns.isin(INDICATOR_COLUMNS).any() else data.copy()
+        return pd.concat([bars, frame], axis=1, copy=False)
+
+    def forming(self, key, last_ts, bars):
+        """
+        Индикаторы баров после последнего закрытого (last_ts, нс) на копии состояния, без истории
+        bars — [(open, high, low, close, volume)], последний — формирующийся
+        -> [строка last_ts, строки bars...] или None, если состояние стоит не на last_ts
+        """
+        with self._guard:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        with entry.lock:
+            if entry.rows == 0 or entry.ts[entry.rows - 1] != last_ts:
+                return None
+            rows = [{col: entry.columns[col][entry.rows - 1] for col in INDICATOR_COLUMNS}]
+            state = entry.state.copy()
+            offsets = entry.ema_offsets(np.arange(entry.rows - 1, entry.rows + len(bars)))
+
+        for bar in bars:
+            rows.append(state.update(*bar))
+        for col, values in offsets.items():
+            for row, offset in zip(rows, values):
+                row[col] += offset
+        return rows
@@ -1,55 +1,197 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import praw
+import os
+import socket
+import threading
 import time
-from datetime import datetime, timedelta
-from anthropic import Anthropic
-from strategy import MultiAssetStrategy
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime
+from batcher import BudgetExhausted, ClaudeBatcher, TokenBudget
+from cache import AnalysisCache, SingleFlight, current_bar_start
+from pipeline import CommentPipeline, SlidingWindowRateLimiter
+from dedupe import CommentIndex
+from commands import CommandScanner
+from coordination import SQLiteCoordinationStore, SharedAnalysisCache, SharedRateLimiter
+from metrics import METRICS, SlowRequestProfiler, timed
 from config import *
 
+# praw, anthropic и научный стек (pandas, numpy, yfinance) импортируются там, где нужны:
+# проверка конфига и `python main.py --check` обходятся без них
+
+
+# Ответы на неудачный анализ; {symbol}/{label} подставляются для каждого запроса
+ANALYSIS_ERRORS = {
+    'unavailable': "⏳ Market data is temporarily unavailable, so I can't analyze **{symbol}** right now. Please try again in a few minutes.",
+    'no_data': "❌ Unable to fetch data for **{symbol}**. Please check the symbol.",
+    'not_enough': "❌ Not enough data for **{label}**",
+    'no_signal': "❌ No signal data available for **{symbol}**",
+}
+
+
+def warm_up():
+    """Фоновая загрузка модулей анализа, пока бот подключается к стриму"""
+    started = time.perf_counter()
+    import strategy
+    import scanner
+    print(f"🔥 Analysis modules loaded in {time.perf_counter() - started:.2f}s")
+
+
+def detect_asset_type(symbol_reddit):
+    """Тип актива по символу из комментария"""
+    for key, val in ASSET_TYPES.items():
+        if key in symbol_reddit:
+            return val
+    return 'Gold'  # default
+
+
+def build_watchlist():
+    """Все тикеры Yahoo из SYMBOL_MAP с типом актива"""
+    watchlist = {}
+    for symbol_reddit, symbol_yf in SYMBOL_MAP.items():
+        watchlist.setdefault(symbol_yf, detect_asset_type(symbol_reddit))
+    return watchlist
+
+
+def shard_subreddits(subreddits, index, count):
+    """Сабреддиты воркера index из count (по кругу)"""
+    return subreddits[index::count]
+
+
 class TradingRedditBot:
-    def __init__(self):
-        self.reddit = praw.Reddit(**REDDIT_CONFIG)
-        self.subreddit = self.reddit.subreddit(SUBREDDIT_NAME)
-        self.claude = Anthropic(api_key=CLAUDE_API_KEY)
-        self.processed_comments = set()
+    def __init__(self, reddit=None, claude=None, subreddits=None, worker_id=None, coordination=None, quote_feed=None):
+        # reddit/claude/quote_feed можно подменить локальными заглушками (бенчмарки, replay)
+        if reddit is None:
+            import praw
+            reddit = praw.Reddit(**REDDIT_CONFIG)
+        self.reddit = reddit
+        self.subreddits = list(subreddits or SUBREDDITS)
+        self.subreddit = self.reddit.subreddit('+'.join(self.subreddits))
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        # Общее состояние воркеров (None — все в памяти процесса)
+        if coordination is None and COORDINATION_DB:
+            coordination = SQLiteCoordinationStore(COORDINATION_DB)
+        self.coordination = coordination
+        if claude is None:
+            from anthropic import Anthropic
+            claude = Anthropic(api_key=CLAUDE_API_KEY, base_url=ANTHROPIC_BASE_URL, timeout=CLAUDE_TIMEOUT)
+        self.claude = claude
+        self.claude_executor = ThreadPoolExecutor(max_workers=CLAUDE_THREADS, thread_name_prefix="claude")
+        # Запросы к Claude из разных воркеров склеиваются в окне CLAUDE_BATCH_WINDOW
+        self.claude_batcher = ClaudeBatcher(
+            self.claude, CLAUDE_MODEL, self.claude_executor, window=CLAUDE_BATCH_WINDOW,
+            max_batch=CLAUDE_BATCH_SIZE, max_tokens=CLAUDE_MAX_TOKENS,
+            budget=TokenBudget(CLAUDE_TOKEN_BUDGET) if CLAUDE_TOKEN_BUDGET else None
+        )
+        self.request_deadline = threading.local()
+        self.bar_store = None
+        if BAR_STORE_DIR:
+            from bar_store import BarStore
+            self.bar_store = BarStore(BAR_STORE_DIR)
+        self.indicators = None
+        if INCREMENTAL_INDICATORS:
+            from indicators import IncrementalIndicators
+            self.indicators = IncrementalIndicators()
+        if self.coordination:
+            self.analysis_cache = SharedAnalysisCache(self.coordination, maxsize=ANALYSIS_CACHE_SIZE, ttl=ANALYSIS_CACHE_TTL)
+        else:
+            self.analysis_cache = AnalysisCache(maxsize=ANALYSIS_CACHE_SIZE, ttl=ANALYSIS_CACHE_TTL)
+        self.single_flight = SingleFlight()
+        self._texts_lock = threading.Lock()
+        self.commands = CommandScanner(
+            TRIGGERS, list(SYMBOL_MAP) + EXTRA_TICKERS, timeframes=TIMEFRAMES, max_symbols=MAX_SYMBOLS_PER_COMMAND
+        )
+        from resample import Resampler
+        self.resampler = Resampler()
+        self.processed_comments = CommentIndex(PROCESSED_COMMENTS_FILE or None, capacity=PROCESSED_COMMENTS_CAPACITY)
         self.reply_count = 0
-        self.last_reset = datetime.now()
+        self.reply_lock = threading.Lock()
+        if self.coordination:
+            self.rate_limiter = SharedRateLimiter(
+                self.coordination, MAX_REPLIES_PER_HOUR, period=3600, min_interval=REPLY_MIN_INTERVAL
+            )
+        else:
+            self.rate_limiter = SlidingWindowRateLimiter(
+                MAX_REPLIES_PER_HOUR, period=3600, min_interval=REPLY_MIN_INTERVAL
+            )
+        self.pipeline = CommentPipeline(self, workers=WORKER_THREADS, queue_size=WORK_QUEUE_SIZE)
+        self._market_data = None
+        self._market_data_lock = threading.Lock()
+        # Живые котировки: последний расчет по символу + формирующийся бар по котировкам
+        if quote_feed is None and LIVE_QUOTES:
+            from quotes import PollingQuoteFeed, yahoo_fetcher
+            quote_feed = PollingQuoteFeed(yahoo_fetcher(self.market_data), interval=QUOTE_POLL_INTERVAL)
+        self.quote_feed = quote_feed
+        self.live_strategies = {}
+        self._live_lock = threading.Lock()
+        self.scanner = None
+        if WATCHLIST_SCANNER:
+            from scanner import WatchlistScanner
+            self.scanner = WatchlistScanner(
+                build_watchlist(), store=self.bar_store, indicators=self.indicators,
+                engine=BACKTEST_ENGINE, delay=SCANNER_DELAY, client=self.market_data
+            )
+        self.profiler = SlowRequestProfiler(PROFILE_DIR, SLOW_REQUEST_SECONDS) if PROFILE_SLOW_REQUESTS else None
         
-        print(f"🤖 Bot initialized for r/{SUBREDDIT_NAME}")
+        print(f"🤖 Bot {self.worker_id} initialized for r/{'+'.join(self.subreddits)}")
         print(f"📊 Monitoring symbols: {list(SYMBOL_MAP.keys())[:5]}...")
         
+    @property
+    def market_data(self):
+        """Общий HTTP-клиент котировок; создается при первом обращении (None — yfinance)"""
+        if self._market_data is None and MARKET_DATA_URL:
+            with self._market_data_lock:
+                if self._market_data is None:
+                    from strategy import CircuitBreaker, MarketDataClient
+                    self._market_data = MarketDataClient(
+                        MARKET_DATA_URL, timeout=MARKET_DATA_TIMEOUT, deadline=MARKET_DATA_DEADLINE,
+                        retries=MARKET_DATA_RETRIES, max_per_host=MARKET_DATA_MAX_PER_HOST,
+                        breaker=CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET)
+                    )
+        return self._market_data
+    
     def run(self):
-        """Основной цикл бота"""
+        """Основной цикл бота: стрим только фильтрует триггеры, остальное — в конвейере"""
         print(f"\n✅ Bot started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"🔍 Monitoring comments every {CHECK_INTERVAL}s...")
-        print(f"⚡ Max replies per hour: {MAX_REPLIES_PER_HOUR}\n")
+        print(f"⚡ Max replies per hour: {MAX_REPLIES_PER_HOUR}")
+        print(f"🧵 Workers: {WORKER_THREADS} | Queue size: {WORK_QUEUE_SIZE}\n")
+        
+        if METRICS_PORT:
+            METRICS.serve(METRICS_PORT)
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+        self.pipeline.start()
+        if self.scanner:
+            print(f"🔭 Watchlist scanner enabled for {len(self.scanner.watchlist)} symbols")
+            self.scanner.start()
+        if self.quote_feed:
+            print(f"⚡ Live quotes every {QUOTE_POLL_INTERVAL}s for analyzed symbols")
+            self.quote_feed.start()
+        
+        # После рестарта дочитываем то, что пришло пока бот был выключен
+        resume = len(self.processed_comments) > 0
+        resume_from = self.processed_comments.last_created
+        if resume:
+            print(f"⏮ Resuming stream after {datetime.fromtimestamp(resume_from).strftime('%Y-%m-%d %H:%M:%S')}")
         
         while True:
             try:
-                # Сброс счетчика раз в час
-                if datetime.now() - self.last_reset > timedelta(hours=1):
-                    self.reply_count = 0
-                    self.last_reset = datetime.now()
-                    print(f"🔄 Reply counter reset at {datetime.now().strftime('%H:%M:%S')}")
-                
                 # Проверка новых комментариев
-                for comment in self.subreddit.stream.comments(skip_existing=True):
+                for comment in self.subreddit.stream.comments(skip_existing=not resume):
                     if comment.id in self.processed_comments:
                         continue
                     
-                    if self.reply_count >= MAX_REPLIES_PER_HOUR:
-                        print(f"⏸ Reply limit reached ({MAX_REPLIES_PER_HOUR}/hour). Waiting...")
-                        time.sleep(CHECK_INTERVAL)
-                        continue
+                    created = getattr(comment, 'created_utc', 0.0)
+                    self.processed_comments.add(comment.id, created)
                     
-                    self.process_comment(comment)
-                    self.processed_comments.add(comment.id)
+                    # Старше последнего обработанного и не в индексе — видели до последнего запуска
+                    if resume and created < resume_from:
+                        continue
                     
-                    # Ограничение памяти
-                    if len(self.processed_comments) > 1000:
-                        self.processed_comments = set(list(self.processed_comments)[-500:])
+                    METRICS.inc('comments_seen_total')
+                    request = self.parse_request(comment)
+                    if request and self.claim(comment):
+                        self.pipeline.submit(comment, request)
                 
             except KeyboardInterrupt:
                 print("\n👋 Bot stopped by user")
@@ -58,155 +200,413 @@ class TradingRedditBot:
                 print(f"❌ Error in main loop: {e}")
                 time.sleep(60)
     
+    def claim(self, comment):
+        """Закрепить комментарий за этим воркером; False — на него уже отвечает другой"""
+        if not self.coordination:
+            return True
+        if self.coordination.claim_comment(comment.id, self.worker_id, getattr(comment, 'created_utc', 0.0)):
+            return True
+        METRICS.inc('claims_lost_total')
+        print(f"🤝 Comment {comment.id} already taken by another worker")
+        return False
+    
     def process_comment(self, comment):
-        """Обработка одного комментария"""
-        text = comment.body.lower()
-        
-        # Проверка триггеров
-        if not any(trigger in text for trigger in ['!analyze', '!check', '!signal']):
+        """Обработка одного комментария (синхронно, без конвейера)"""
+        request = self.parse_request(comment)
+        if not request or not self.claim(comment):
             return
         
-        # Парсинг символа
-        symbol_reddit = self.parse_symbol(text)
+        with METRICS.span('process_comment'):
+            response = self.build_reply(comment, request)
+            self.send_reply(comment, response)
+    
+    def parse_request(self, comment):
+        """Триггер, символы и таймфрейм за один проход по тексту (без сети)"""
+        command = self.commands.scan(comment.body)
+        if command is None:
+            return None
         
-        if not symbol_reddit:
+        symbols, timeframe = command
+        if not symbols:
             print(f"⚠️ Invalid symbol in comment by u/{comment.author}")
-            return
+            return None
         
-        print(f"\n📊 Processing request from u/{comment.author}: {symbol_reddit}")
+        return symbols, timeframe or BASE_INTERVAL
+    
+    def build_reply(self, comment, request):
+        """Анализ одного или нескольких символов -> текст ответа"""
+        if isinstance(request, str):
+            request = ([request], BASE_INTERVAL)
+        symbols, timeframe = request
+        print(f"\n📊 Processing request from u/{comment.author}: {', '.join(symbols)} [{timeframe}]")
+        METRICS.inc('requests_total')
+        self.request_deadline.at = time.monotonic() + REPLY_DEADLINE
         
         try:
-            # Анализ символа
-            response = self.analyze_symbol(symbol_reddit)
-            
-            # Отправка ответа
-            comment.reply(response)
-            self.reply_count += 1
-            
-            print(f"✅ Replied to u/{comment.author} [{self.reply_count}/{MAX_REPLIES_PER_HOUR}]")
-            
-            time.sleep(2)  # Rate limiting
-            
-        except Exception as e:
-            error_msg = f"❌ Error analyzing {symbol_reddit}: {str(e)[:100]}"
-            print(error_msg)
-            
+            if self.profiler:
+                with self.profiler.profile('_'.join(symbols) + f"_{timeframe}"):
+                    return self.analyze_batch(symbols, timeframe)
+            return self.analyze_batch(symbols, timeframe)
+        finally:
+            self.request_deadline.at = None
+    
+    def analyze_batch(self, symbols, timeframe=BASE_INTERVAL):
+        """Анализ списка символов одним ответом; данные промахов кэша качаются одним пакетом"""
+        prefetched = {}
+        if len(symbols) > 1:
+            prefetched = self._prefetch(symbols, timeframe)
+        
+        parts = []
+        for symbol_reddit in symbols:
             try:
-                comment.reply(f"Sorry, I encountered an error analyzing {symbol_reddit}. Please try again later.")
-            except:
-                pass
+                fresh = prefetched.get(SYMBOL_MAP.get(symbol_reddit, symbol_reddit))
+                parts.append(self.analyze_symbol(symbol_reddit, timeframe, fresh))
+            except Exception as e:
+                METRICS.inc('errors_total', stage='analyze')
+                print(f"❌ Error analyzing {symbol_reddit}: {str(e)[:100]}")
+                parts.append(f"Sorry, I encountered an error analyzing {symbol_reddit}. Please try again later.")
+        
+        return '\n\n---\n\n'.join(parts)
     
-    def parse_symbol(self, text):
-        """Извлечение символа из текста"""
-        words = text.upper().replace(',', ' ').replace('.', ' ').split()
+    def _prefetch(self, symbols, timeframe=BASE_INTERVAL):
+        """Один yf.download для символов, которых нет ни в кэше, ни у сканера"""
+        missing = []
+        for symbol_reddit in symbols:
+            symbol_yf = SYMBOL_MAP.get(symbol_reddit, symbol_reddit)
+            if symbol_yf in missing or self._cached(symbol_yf, timeframe):
+                continue
+            if timeframe == BASE_INTERVAL and self.scanner and self.scanner.lookup(symbol_yf):
+                continue
+            missing.append(symbol_yf)
         
-        for word in words:
-            # Проверка в маппинге
-            if word in SYMBOL_MAP:
-                return word
-            
-            # Проверка паттерна (3-6 букв/цифр)
-            if 3 <= len(word) <= 6 and word.replace('-', '').isalnum():
-                # Проверка популярных тикеров
-                if word in ['SPY', 'QQQ', 'AAPL', 'TSLA', 'NVDA', 'MSFT', 'GOOGL', 'AMZN']:
-                    return word
+        if len(missing) < 2:
+            return {}
+        
+        from scanner import download_batch
+        
+        try:
+            with METRICS.span('batch_download'):
+                return download_batch(
+                    missing, period='3mo', interval=BASE_INTERVAL, store=self.bar_store, client=self.market_data
+                )
+        except Exception as e:
+            # Не получилось пакетом — каждый символ скачается отдельно
+            print(f"⚠️ Batch download failed: {str(e)[:100]}")
+            return {}
+    
+    def send_reply(self, comment, response):
+        """Отправка ответа с учетом лимита ответов"""
+        if self.rate_limiter.wait_time() > REPLY_MIN_INTERVAL:
+            print(f"⏸ Reply limit reached ({MAX_REPLIES_PER_HOUR}/hour). Waiting...")
+        self.rate_limiter.acquire()
+        
+        try:
+            with METRICS.span('reply'):
+                comment.reply(response)
+        except Exception as e:
+            METRICS.inc('errors_total', stage='reply')
+            print(f"❌ Failed to reply to u/{comment.author}: {str(e)[:100]}")
+            return False
+        
+        with self.reply_lock:
+            self.reply_count += 1
+        METRICS.inc('replies_total')
         
-        return None
+        print(f"✅ Replied to u/{comment.author} [{self.rate_limiter.in_window()}/{MAX_REPLIES_PER_HOUR} this hour]")
+        return True
     
-    def analyze_symbol(self, symbol_reddit):
+    def parse_symbol(self, text):
+        """Извлечение первого символа из текста"""
+        symbols = self.commands.find_symbols(text)
+        return symbols[0] if symbols else None
+    
+    @timed('analyze_symbol')
+    def analyze_symbol(self, symbol_reddit, timeframe=BASE_INTERVAL, fresh=None):
         """Полный анализ символа"""
         # Маппинг символа
         symbol_yf = SYMBOL_MAP.get(symbol_reddit, symbol_reddit)
         
         # Определение типа актива
-        asset_type = 'Gold'  # default
-        for key, val in ASSET_TYPES.items():
-            if key in symbol_reddit:
-                asset_type = val
-                break
+        asset_type = detect_asset_type(symbol_reddit)
+        label = symbol_reddit if timeframe == BASE_INTERVAL else f"{symbol_reddit} ({timeframe})"
+        
+        # Кэш: пока базовый бар не закрылся, результат не изменится (для любого таймфрейма)
+        result = self._cached(symbol_yf, timeframe)
+        cached = result[1] if result else None
+        if cached and label in cached['texts']:
+            METRICS.inc('cache_hits_total', layer='analysis')
+            print(f"⚡ Cache hit for {symbol_yf} [{timeframe}]")
+            return self._with_live(cached['texts'][label], symbol_yf, timeframe)
+        
+        # Одновременные запросы под тем же названием ждут один ответ, под разными (GOLD/XAUUSD) — один расчет
+        return self.single_flight.do(
+            (symbol_yf, timeframe, label),
+            lambda: self._answer(symbol_reddit, label, symbol_yf, asset_type, timeframe, fresh, result)
+        )
+    
+    def _cached(self, symbol_yf, timeframe=BASE_INTERVAL):
+        """
+        Расчет текущего бара без загрузки данных -> (ключ кэша, запись) или None
+        Запись лежит под последним фактическим баром данных, к нему ведет ссылка от текущего бара часов
+        """
+        bar = current_bar_start(BASE_INTERVAL)
+        cache_key = self.analysis_cache.get(('bar', symbol_yf, timeframe, bar), record=False)
+        entry = self.analysis_cache.get(cache_key, record=False) if cache_key else None
+        return (cache_key, entry) if entry else None
+    
+    def _link_bar(self, cache_key):
+        """Ссылка текущий бар часов -> ключ записи: следующий запрос найдет ее без загрузки данных"""
+        symbol_yf, timeframe, _ = cache_key
+        self.analysis_cache.put(('bar', symbol_yf, timeframe, current_bar_start(BASE_INTERVAL)), cache_key)
+    
+    def _answer(self, symbol_reddit, label, symbol_yf, asset_type, timeframe=BASE_INTERVAL, fresh=None, result=None):
+        """Ответ под названием label из общего для всех названий символа расчета"""
+        if result is None:
+            result = self.single_flight.do(
+                (symbol_yf, timeframe),
+                lambda: self._analyze_uncached(symbol_yf, asset_type, timeframe, fresh)
+            )
+        if isinstance(result, str):
+            return ANALYSIS_ERRORS[result].format(symbol=symbol_reddit, label=label)
+        
+        cache_key, entry = result
+        text = entry['texts'].get(label)
+        if text:
+            METRICS.inc('cache_hits_total', layer='analysis')
+            print(f"⚡ Cache hit for {symbol_yf} [{timeframe}]")
+            return self._with_live(text, symbol_yf, timeframe)
+        return self._render_and_cache(label, cache_key, entry)
+    
+    def _analyze_uncached(self, symbol_yf, asset_type, timeframe=BASE_INTERVAL, fresh=None):
+        """
+        Загрузка данных, бэктест и сигнал -> (ключ кэша, запись кэша)
+        Ошибка — ключ ANALYSIS_ERRORS: текст с названием символа собирает каждый запрос сам
+        """
+        # Готовый результат сканера: остается только сгенерировать текст
+        if self.scanner and timeframe == BASE_INTERVAL:
+            entry = self.scanner.lookup(symbol_yf)
+            if entry:
+                METRICS.inc('cache_hits_total', layer='scanner')
+                print(f"🔭 Scanner hit for {symbol_yf}")
+                signal = entry['signal']
+                if self.quote_feed:
+                    from strategy import MultiAssetStrategy
+                    strategy = MultiAssetStrategy(symbol_yf, entry['asset_type'], indicators=self.indicators)
+                    strategy.data, strategy.interval = entry['frame'], BASE_INTERVAL
+                    self._track_live(symbol_yf, strategy)
+                    signal = self.live_signal(symbol_yf) or signal
+                return self._cache_result((symbol_yf, timeframe, entry['bar_ts']), entry['backtest'], signal)
         
         # Инициализация стратегии
-        strategy = MultiAssetStrategy(symbol_yf, asset_type)
+        from strategy import MultiAssetStrategy
+        strategy = MultiAssetStrategy(
+            symbol_yf, asset_type, store=self.bar_store, indicators=self.indicators, client=self.market_data
+        )
         
-        # Получение данных
-        if not strategy.fetch_data(period='3mo', interval='15m'):
-            return f"❌ Unable to fetch data for **{symbol_reddit}**. Please check the symbol."
+        # Получение данных (или бары из пакетной загрузки)
+        if fresh is not None and not fresh.empty:
+            loaded = strategy.ingest_data(fresh, period='3mo', interval=BASE_INTERVAL)
+        else:
+            loaded = strategy.fetch_data(period='3mo', interval=BASE_INTERVAL)
+        if not loaded:
+            if self.market_data and self.market_data.breaker.state == 'open':
+                return 'unavailable'
+            return 'no_data'
+        
+        # Рынок закрыт или бар еще не появился — ключ по последнему фактическому базовому бару
+        cache_key = (symbol_yf, timeframe, int(strategy.data.index[-1].timestamp()))
+        cached = self.analysis_cache.get(cache_key)
+        if cached:
+            self._link_bar(cache_key)
+            return cache_key, cached
+        METRICS.inc('cache_misses_total', layer='analysis')
+        
+        # Старший таймфрейм собирается из базовых баров локально
+        if not strategy.resample(timeframe, self.resampler):
+            return 'not_enough'
         
         # Бэктест
-        backtest_results = strategy.backtest(lookback=100)
+        backtest_results = strategy.backtest(lookback=100, engine=BACKTEST_ENGINE)
         
         # Текущий сигнал
         current_signal = strategy.get_current_signal()
         
         if not current_signal:
-            return f"❌ No signal data available for **{symbol_reddit}**"
+            return 'no_signal'
+        
+        if self.quote_feed and timeframe == BASE_INTERVAL:
+            self._track_live(symbol_yf, strategy)
+            current_signal = self.live_signal(symbol_yf) or current_signal
         
-        # Генерация ответа через Claude
+        return self._cache_result(cache_key, backtest_results, current_signal)
+    
+    def _cache_result(self, cache_key, backtest_results, current_signal):
+        """Запись кэша: расчет общий для всех названий символа, тексты — по названию"""
+        # Доверительные интервалы по сделкам бэктеста (один раз на результат)
+        if 'intervals' not in backtest_results:
+            from stats import bootstrap_intervals
+            backtest_results['intervals'] = bootstrap_intervals(
+                [t['profit'] for t in backtest_results.get('trades', [])],
+                resamples=BOOTSTRAP_RESAMPLES, level=CONFIDENCE_LEVEL
+            )
+        entry = {'backtest': backtest_results, 'signal': current_signal, 'texts': {}}
+        self.analysis_cache.put(cache_key, entry)
+        self._link_bar(cache_key)
+        return cache_key, entry
+    
+    def _track_live(self, symbol_yf, strategy):
+        """Запомнить самый свежий расчет символа для живых котировок и подписаться на них"""
+        with self._live_lock:
+            current = self.live_strategies.get(symbol_yf)
+            if current is None or strategy.bar(-1)[0] >= current.bar(-1)[0]:
+                self.live_strategies[symbol_yf] = strategy
+        self.quote_feed.subscribe([symbol_yf])
+    
+    def live_signal(self, symbol_yf):
+        """
+        Сигнал по живой котировке: меняется только формирующийся бар, индикаторы —
+        из сохраненного состояния (миллисекунды вместо загрузки истории и пересчета)
+        None — нет свежей котировки или расчета, на который ее можно наложить
+        """
+        if not self.quote_feed:
+            return None
+        quote = self.quote_feed.latest(symbol_yf, max_age=QUOTE_MAX_AGE)
+        with self._live_lock:
+            strategy = self.live_strategies.get(symbol_yf)
+            if quote is None or strategy is None:
+                return None
+            with METRICS.span('live_signal'):
+                if not strategy.apply_quote(quote):
+                    METRICS.inc('live_quotes_total', result='stale')
+                    return None
+                signal = strategy.get_current_signal()
+        METRICS.inc('live_quotes_total', result='applied')
+        return signal if signal and 'quote_ts' in signal else None
+    
+    def _with_live(self, text, symbol_yf, timeframe=BASE_INTERVAL):
+        """Готовый ответ из кэша + строка с живой ценой и сигналом перед подписью"""
+        signal = self.live_signal(symbol_yf) if timeframe == BASE_INTERVAL else None
+        if not signal:
+            return text
+        line = (f"⚡ **Live ({time.strftime('%H:%M', time.gmtime(signal['quote_ts']))} UTC):** "
+                f"${signal['price']} | RSI {signal['rsi']} | ADX {signal['adx']} | Signal now: **{signal['type']}**")
+        if signal['type'] != 'WAIT':
+            line += f" (SL ${signal['stop_loss']} / TP ${signal['take_profit']})"
+        head, footer, tail = text.rpartition('\n---\n')
+        if not footer:
+            return f"{text}\n\n{line}"
+        return f"{head}\n\n{line}\n{footer}{tail}"
+    
+    def _render_and_cache(self, label, cache_key, entry):
+        """Генерация текста ответа под названием label и сохранение в кэш рядом с расчетом"""
+        def fill_cache(text):
+            with self._texts_lock:
+                entry['texts'][label] = text
+                self.analysis_cache.put(cache_key, entry)
+        
+        # Поздний текст Claude не должен затереться шаблоном
+        lock = threading.Lock()
+        late = []
+        
+        def fill_late(text):
+            with lock:
+                late.append(text)
+                fill_cache(text)
+        
+        # Генерация ответа через Claude (шаблон, если не успел к дедлайну)
         analysis = self.generate_claude_analysis(
-            symbol_reddit, 
-            backtest_results, 
-            current_signal
+            label, 
+            entry['backtest'], 
+            entry['signal'],
+            on_late=fill_late
         )
         
+        with lock:
+            if not late:
+                fill_cache(analysis)
         return analysis
     
-    def generate_claude_analysis(self, symbol, backtest, signal):
-        """Генерация анализа через Claude API"""
+    @timed('generate_claude_analysis')
+    def generate_claude_analysis(self, symbol, backtest, signal, on_late=None):
+        """Генерация анализа через Claude API
+
+        Ждем Claude только до дедлайна ответа; не успел — отдаем шаблон,
+        а поздний текст Claude передается в on_late (например, в кэш)
+        """
         
-        # Определение уверенности
-        winrate = backtest['winrate']
-        confidence = "WAIT"
+        from stats import confidence_label
         
-        if signal['type'] != 'WAIT':
-            if winrate >= 70:
-                confidence = "90%"
-            elif winrate >= 60:
-                confidence = "70%"
-            elif winrate >= 50:
-                confidence = "50%"
+        # Определение уверенности (по нижней границе интервала winrate)
+        confidence = confidence_label(backtest) if signal['type'] != 'WAIT' else "WAIT"
+        intervals = self.format_intervals(backtest)
         
         signal_text = f"{signal['type']} {confidence}" if signal['type'] != 'WAIT' else "WAIT"
         
-        # Промпт для Claude
-        prompt = f"""Create a concise Reddit trading analysis for {symbol}:
-
-**Performance (Last 100 trades):**
+        # Данные символа для промпта (требования к тексту добавит батчер)
+        details = f"""**Performance (Last 100 trades):**
 - Win Rate: {backtest['winrate']}%
 - Total Trades: {backtest['total_trades']}
 - Wins: {backtest['wins']} | Losses: {backtest['losses']}
 - Profit Factor: {backtest.get('profit_factor', 0)}
+{intervals}
 
 **Current Signal:** {signal_text}
 **Price:** {signal['price']}
 **RSI:** {signal['rsi']} | **ADX:** {signal['adx']}
 {f"**Entry:** {signal['price']}" if signal['type'] != 'WAIT' else ''}
 {f"**Stop Loss:** {signal.get('stop_loss', 'N/A')}" if signal['type'] != 'WAIT' else ''}
-{f"**Take Profit:** {signal.get('take_profit', 'N/A')}" if signal['type'] != 'WAIT' else ''}
-
-Format as Reddit markdown. Requirements:
-1. Start with ## 📊 {symbol} Analysis
-2. Clear signal headline (BUY/SELL/WAIT with confidence)
-3. Brief performance summary (1-2 sentences)
-4. Current setup with SL/TP if applicable
-5. 1-2 sentence market context
-6. End with: "---\\n*Not financial advice | Multi-Asset Adaptive Strategy*"
-
-Keep under 250 words. Professional but friendly tone.
-"""
+{f"**Take Profit:** {signal.get('take_profit', 'N/A')}" if signal['type'] != 'WAIT' else ''}"""
         
         try:
-            message = self.claude.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=500,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            future = self.claude_batcher.submit(symbol, details)
+        except BudgetExhausted as e:
+            METRICS.inc('generation_wins_total', path='fallback')
+            METRICS.inc('fallbacks_total', reason='token_budget')
+            print(f"💸 Claude token budget exhausted ({e}), posting template for {symbol}")
+            return self.generate_fallback_response(symbol, backtest, signal, confidence)
+        
+        # Шаблон готовим, пока Claude думает
+        fallback = self.generate_fallback_response(symbol, backtest, signal, confidence)
+        
+        deadline = getattr(self.request_deadline, 'at', None) or time.monotonic() + REPLY_DEADLINE
+        try:
+            text = future.result(timeout=max(deadline - time.monotonic(), 0))
+            METRICS.inc('generation_wins_total', path='claude')
+            return text
             
-            return message.content[0].text
+        except FutureTimeout:
+            METRICS.inc('generation_wins_total', path='fallback')
+            METRICS.inc('fallbacks_total', reason='deadline')
+            print(f"⏱ Claude missed the {REPLY_DEADLINE:g}s budget for {symbol}, posting template")
+            if on_late:
+                future.add_done_callback(lambda f: self._deliver_late(f, on_late))
+            return fallback
             
         except Exception as e:
             # Fallback если Claude не работает
+            METRICS.inc('generation_wins_total', path='fallback')
+            METRICS.inc('fallbacks_total', reason='claude_error')
             print(f"⚠️ Claude API error: {e}")
-            return self.generate_fallback_response(symbol, backtest, signal, confidence)
+            return fallback
+    
+    def _deliver_late(self, future, on_late):
+        """Поздний ответ Claude: в кэш для следующих запросов"""
+        if future.exception() is not None:
+            return
+        METRICS.inc('claude_late_total')
+        on_late(future.result())
+    
+    def format_intervals(self, backtest):
+        """Строка с доверительными интервалами для ответа (пусто, если сделок нет)"""
+        intervals = backtest.get('intervals')
+        if not intervals:
+            return ""
+        winrate, pf, dd = intervals['winrate'], intervals['profit_factor'], intervals['max_drawdown']
+        return (
+            f"- {intervals['level']:.0%} CI ({intervals['resamples']:,} resamples): "
+            f"win rate {winrate[0]}–{winrate[2]}%, profit factor {pf[0]}–{pf[2]}, "
+            f"max drawdown {dd[0]}–{dd[2]}%"
+        )
     
     def generate_fallback_response(self, symbol, backtest, signal, confidence):
         """Резервный ответ без Claude"""
@@ -221,6 +621,7 @@ Keep under 250 words. Professional but friendly tone.
 - Win Rate: **{backtest['winrate']}%**
 - Total Trades: {backtest['total_trades']} ({backtest['wins']}W / {backtest['losses']}L)
 - Profit Factor: {backtest.get('profit_factor', 'N/A')}
+{self.format_intervals(backtest)}
 
 **Market Context:**
 - Price: ${signal['price']}
@@ -242,27 +643,83 @@ Keep under 250 words. Professional but friendly tone.
         
         return response
 
+# ============================================================================
+# WORKER MODE
+# ============================================================================
+
+def run_worker(index, count):
+    """Процесс-воркер: свой шард сабреддитов, общее состояние через COORDINATION_DB"""
+    global METRICS_PORT, PROCESSED_COMMENTS_FILE
+    if METRICS_PORT:
+        METRICS_PORT += index
+    if PROCESSED_COMMENTS_FILE:
+        PROCESSED_COMMENTS_FILE = f"{PROCESSED_COMMENTS_FILE}.w{index}"
+    
+    bot = TradingRedditBot(
+        subreddits=shard_subreddits(SUBREDDITS, index, count),
+        worker_id=f"{socket.gethostname()}-w{index}"
+    )
+    bot.run()
+
+
+def run_workers(count):
+    """Запуск count процессов; сабреддитов меньше, чем процессов — лишние не стартуют"""
+    import multiprocessing
+    
+    global COORDINATION_DB
+    if not COORDINATION_DB:
+        COORDINATION_DB = os.environ['COORDINATION_DB'] = 'data/coordination.db'
+    
+    count = min(count, len(SUBREDDITS))
+    print(f"👥 Starting {count} workers for {len(SUBREDDITS)} subreddits (shared state: {COORDINATION_DB})")
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(i, count), name=f"bot-w{i}")
+        for i in range(count)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("\n👋 Workers stopped by user")
+
+
 # ============================================================================
 # MAIN ENTRY POINT
 # ============================================================================
 
 if __name__ == "__main__":
+    import argparse
+    from startup import check_credentials, import_report, run_check
+    
+    parser = argparse.ArgumentParser(description="Multi-asset trading bot for Reddit")
+    parser.add_argument('--check', action='store_true', help="validate config and credentials, then exit")
+    parser.add_argument('--online', action='store_true', help="with --check: log in to Reddit and call Claude")
+    parser.add_argument('--import-times', action='store_true', help="show the startup cost of each import")
+    args = parser.parse_args()
+    
+    if args.import_times:
+        exit(0 if import_report() else 1)
+    if args.check:
+        exit(run_check(online=args.online))
+    
     print("=" * 60)
     print("🚀 MULTI-ASSET TRADING BOT FOR REDDIT")
     print("=" * 60)
     print()
     
-    # Проверка конфигурации
-    if 'YOUR_' in REDDIT_CONFIG['client_id']:
-        print("❌ ERROR: Please configure your Reddit API credentials in .env file")
-        print("   Visit https://www.reddit.com/prefs/apps to create an app")
-        exit(1)
-    
-    if 'YOUR_' in CLAUDE_API_KEY:
-        print("❌ ERROR: Please configure your Anthropic API key in .env file")
-        print("   Visit https://console.anthropic.com/ to get your key")
+    # Проверка конфигурации (до загрузки praw, anthropic и pandas)
+    problems = check_credentials()
+    for message, hint in problems:
+        print(f"❌ ERROR: {message}")
+        print(f"   {hint}")
+    if problems:
         exit(1)
     
     # Запуск бота
-    bot = TradingRedditBot()
-    bot.run()
\ No newline at end of file
+    if WORKER_PROCESSES > 1:
+        run_workers(WORKER_PROCESSES)
+    else:
+        bot = TradingRedditBot()
+        bot.run()
\ No newline at end of file
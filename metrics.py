@@ -0,0 +1,187 @@
+import cProfile
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Границы корзин гистограмм задержки (секунды)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _labels_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Metrics:
+    """Счетчики, gauges и гистограммы задержек в формате Prometheus"""
+
+    def __init__(self, prefix='trading_bot'):
+        self.prefix = prefix
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, stage):
+        """Замер длительности стадии -> гистограмма stage_seconds{stage=...}"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc('stage_errors_total', stage=stage)
+            raise
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - started, stage=stage)
+
+    def render(self):
+        """Текст для /metrics (Prometheus exposition format)"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+            seen = set()
+            for (name, labels), value in counters:
+                metric = f"{self.prefix}_{name}"
+                if metric not in seen:
+                    lines.append(f"# TYPE {metric} counter")
+                    seen.add(metric)
+                lines.append(f"{metric}{_labels_text(labels)} {value}")
+
+            for (name, labels), value in gauges:
+                metric = f"{self.prefix}_{name}"
+                if metric not in seen:
+                    lines.append(f"# TYPE {metric} gauge")
+                    seen.add(metric)
+                lines.append(f"{metric}{_labels_text(labels)} {value}")
+
+            for (name, labels), histogram in histograms:
+                metric = f"{self.prefix}_{name}"
+                if metric not in seen:
+                    lines.append(f"# TYPE {metric} histogram")
+                    seen.add(metric)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    bucket_labels = labels + (('le', bound),)
+                    lines.append(f"{metric}_bucket{_labels_text(bucket_labels)} {cumulative}")
+                lines.append(f"{metric}_bucket{_labels_text(labels + (('le', '+Inf'),))} {histogram.total}")
+                lines.append(f"{metric}_sum{_labels_text(labels)} {histogram.sum:.6f}")
+                lines.append(f"{metric}_count{_labels_text(labels)} {histogram.total}")
+
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """HTTP endpoint /metrics в фоновом потоке; None — порт занят (бот работает без метрик)"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            print(f"⚠️ Metrics endpoint disabled, cannot bind {host}:{port}: {e}")
+            return None
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        print(f"📈 Metrics endpoint: http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+
+class SlowRequestProfiler:
+    """cProfile для запроса; дамп на диск, если запрос медленнее порога"""
+
+    def __init__(self, directory, threshold):
+        self.directory = directory
+        self.threshold = threshold
+        # cProfile нельзя включить в двух потоках одновременно
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def profile(self, name):
+        if not self._lock.acquire(blocking=False):
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - started
+            self._lock.release()
+            if elapsed >= self.threshold:
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, f"{int(time.time())}_{name}.prof")
+                profiler.dump_stats(path)
+                print(f"🐢 Slow request ({elapsed:.1f}s) profile saved to {path}")
+
+
+# Общий реестр метрик процесса
+METRICS = Metrics()
+
+
+def timed(stage):
+    """Декоратор: длительность вызова -> METRICS stage_seconds{stage=...}"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with METRICS.span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Перебор параметров стратегии на нескольких ядрах
+
+    python optimizer.py --symbols BTC GOLD SPY --mode random --samples 300 --workers 4
+
+OHLCV каждого символа лежит в shared memory: воркеры не получают копию данных
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from bar_store import BarStore
+from config import BAR_STORE_DIR, SYMBOL_MAP
+from main import detect_asset_type
+from strategy import DEFAULT_PARAMS, MultiAssetStrategy
+
+
+# Сетка значений для перебора
+PARAM_GRID = {
+    'ema_fast': [13, 21, 34],
+    'ema_slow': [50, 89],
+    'ema_filter': [100, 200],
+    'adx_threshold': [15, 20, 25],
+    'bb_period': [20, 30],
+    'bb_std': [1.5, 2.0, 2.5],
+    'volume_spike': [1.0, 1.2, 1.5],
+    'stop_atr_mult': [1.5, 2.0, 3.0],
+    'tp_atr_mult': [2.0, 3.0, 4.0],
+}
+
+COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+# Кэш подключенных блоков shared memory в процессе воркера
+_attached = {}
+
+
+def grid_params():
+    keys = list(PARAM_GRID)
+    for values in itertools.product(*(PARAM_GRID[k] for k in keys)):
+        params = dict(zip(keys, values))
+        if params['ema_fast'] < params['ema_slow']:
+            yield params
+
+
+def random_params(samples, seed=42):
+    rng = random.Random(seed)
+    seen = set()
+    attempts = 0
+    while len(seen) < samples and attempts < samples * 20:
+        attempts += 1
+        params = {k: rng.choice(v) for k, v in PARAM_GRID.items()}
+        key = tuple(sorted(params.items()))
+        if params['ema_fast'] >= params['ema_slow'] or key in seen:
+            continue
+        seen.add(key)
+        yield params
+
+
+def share_frame(data):
+    """DataFrame -> блок shared memory: строка 0 — время (int64), дальше OHLCV"""
+    n = len(data)
+    shm = shared_memory.SharedMemory(create=True, size=(len(COLUMNS) + 1) * n * 8)
+    block = np.ndarray((len(COLUMNS) + 1, n), dtype=np.float64, buffer=shm.buf)
+    block[0] = data.index.tz_convert('UTC').as_unit('ns').asi8.view(np.float64)
+    for i, col in enumerate(COLUMNS, start=1):
+        block[i] = data[col].to_numpy(dtype=np.float64)
+    return shm, {'name': shm.name, 'rows': n, 'tz': str(data.index.tz)}
+
+
+def _frame_from_shared(meta):
+    """Собрать DataFrame поверх shared memory без копирования"""
+    shm = _attached.get(meta['name'])
+    if shm is None:
+        # Воркеры делят resource tracker с родителем: блок удалит только родитель
+        shm = shared_memory.SharedMemory(name=meta['name'])
+        _attached[meta['name']] = shm
+
+    block = np.ndarray((len(COLUMNS) + 1, meta['rows']), dtype=np.float64, buffer=shm.buf)
+    index = pd.DatetimeIndex(block[0].view(np.int64).view('M8[ns]')).tz_localize('UTC').tz_convert(meta['tz'])
+    return pd.DataFrame({col: block[i] for i, col in enumerate(COLUMNS, start=1)}, index=index, copy=False)
+
+
+def _run_task(task):
+    symbol_reddit, asset_type, meta, lookback, params = task
+    strategy = MultiAssetStrategy(symbol_reddit, asset_type, params=params)
+    strategy.data = _frame_from_shared(meta)
+    result = strategy.backtest(lookback=lookback, engine='vectorized')
+
+    trades = result['trades']
+    expectancy = sum(t['profit'] for t in trades) / len(trades) if trades else 0.0
+    return {
+        'symbol': symbol_reddit,
+        **params,
+        'total_trades': result['total_trades'],
+        'winrate': result['winrate'],
+        'profit_factor': result['profit_factor'],
+        'expectancy': round(expectancy, 4),
+    }
+
+
+def load_symbols(symbols, period, interval):
+    store = BarStore(BAR_STORE_DIR) if BAR_STORE_DIR else None
+    frames = {}
+    for symbol_reddit in symbols:
+        strategy = MultiAssetStrategy(SYMBOL_MAP.get(symbol_reddit, symbol_reddit), store=store)
+        if strategy.fetch_data(period=period, interval=interval):
+            frames[symbol_reddit] = strategy.data
+            print(f"📥 {symbol_reddit}: {len(strategy.data)} bars")
+    return frames
+
+
+def run_sweep(frames, param_sets, lookback=1000, workers=None, min_trades=10, rank_by='expectancy'):
+    shared = {}
+    try:
+        for symbol_reddit, data in frames.items():
+            shared[symbol_reddit] = share_frame(data)
+
+        tasks = [
+            (symbol_reddit, detect_asset_type(symbol_reddit), meta, min(lookback, frames[symbol_reddit].shape[0]), params)
+            for params in param_sets
+            for symbol_reddit, (_, meta) in shared.items()
+        ]
+
+        workers = workers or os.cpu_count()
+        started = time.time()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(_run_task, tasks, chunksize=max(1, len(tasks) // (workers * 8))))
+        print(f"⚙️ {len(tasks)} backtests on {workers} workers in {time.time() - started:.1f}s")
+    finally:
+        for shm, _ in shared.values():
+            shm.close()
+            shm.unlink()
+
+    rows = [r for r in rows if r['total_trades'] >= min_trades]
+    rows.sort(key=lambda r: (r['symbol'], -r[rank_by], -r['total_trades']))
+    return rows
+
+
+def write_results(rows, path):
+    if not rows:
+        print("⚠️ No parameter set produced enough trades")
+        return
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"💾 Saved {len(rows)} rows to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Strategy parameter sweep")
+    parser.add_argument('--symbols', nargs='+', default=['BTC', 'ETH', 'GOLD', 'SPY'])
+    parser.add_argument('--mode', choices=['grid', 'random'], default='random')
+    parser.add_argument('--samples', type=int, default=200, help="parameter sets for random mode")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--period', default='60d')
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--lookback', type=int, default=1000, help="bars per backtest")
+    parser.add_argument('--min-trades', type=int, default=10)
+    parser.add_argument('--rank-by', choices=['expectancy', 'winrate', 'profit_factor'], default='expectancy')
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('--out', default='sweep_results.csv')
+    args = parser.parse_args()
+
+    frames = load_symbols(args.symbols, args.period, args.interval)
+    if not frames:
+        print("❌ No data to optimize on")
+        return
+
+    param_sets = list(grid_params() if args.mode == 'grid' else random_params(args.samples))
+    param_sets.insert(0, {k: DEFAULT_PARAMS[k] for k in PARAM_GRID})
+    print(f"🔬 {len(param_sets)} parameter sets x {len(frames)} symbols")
+
+    rows = run_sweep(frames, param_sets, args.lookback, args.workers, args.min_trades, args.rank_by)
+    write_results(rows, args.out)
+
+    for symbol_reddit in frames:
+        print(f"\n🏆 Top {args.top} for {symbol_reddit} by {args.rank_by}:")
+        for row in [r for r in rows if r['symbol'] == symbol_reddit][:args.top]:
+            params = ', '.join(f"{k}={row[k]}" for k in PARAM_GRID)
+            print(f"   {row[args.rank_by]:>8} | WR {row['winrate']}% | PF {row['profit_factor']} | "
+                  f"{row['total_trades']} trades | {params}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import queue
+import threading
+import time
+from collections import deque
+
+from metrics import METRICS
+
+
+class SlidingWindowRateLimiter:
+    """Не больше max_events событий за period секунд + минимальный интервал между ними"""
+
+    def __init__(self, max_events, period=3600, min_interval=0.0):
+        self.max_events = max_events
+        self.period = period
+        self.min_interval = min_interval
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def _wait_time(self, now):
+        while self._events and now - self._events[0] >= self.period:
+            self._events.popleft()
+
+        wait = 0.0
+        if len(self._events) >= self.max_events:
+            wait = self._events[0] + self.period - now
+        if self._events and self.min_interval:
+            wait = max(wait, self._events[-1] + self.min_interval - now)
+        return wait
+
+    def wait_time(self):
+        """Сколько секунд придется ждать следующий слот"""
+        with self._lock:
+            return self._wait_time(time.monotonic())
+
+    def in_window(self):
+        with self._lock:
+            self._wait_time(time.monotonic())
+            return len(self._events)
+
+    def acquire(self, timeout=None):
+        """Занять слот; False — если слот не освободится за timeout секунд"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._wait_time(now)
+                if wait <= 0:
+                    self._events.append(now)
+                    return True
+
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CommentPipeline:
+    """
+    Конвейер обработки комментариев:
+    чтение стрима -> очередь -> пул воркеров (данные/бэктест/LLM) -> ответы с rate limit
+    """
+
+    def __init__(self, bot, workers=4, queue_size=100):
+        self.bot = bot
+        self.workers = workers
+        self.work_queue = queue.Queue(maxsize=queue_size)
+        self.reply_queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            self._spawn(self._work_loop, f"worker-{i}")
+        self._spawn(self._reply_loop, "replier")
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def submit(self, comment, request):
+        """Поставить запрос в очередь (блокируется, если очередь заполнена)"""
+        if self.work_queue.full():
+            print(f"⏳ Work queue full ({self.work_queue.maxsize}), waiting for workers...")
+        self.work_queue.put((comment, request, time.perf_counter()))
+        METRICS.set_gauge('queue_depth', self.work_queue.qsize(), queue='work')
+
+    def _work_loop(self):
+        while True:
+            comment, request, enqueued = self.work_queue.get()
+            METRICS.set_gauge('queue_depth', self.work_queue.qsize(), queue='work')
+            METRICS.observe('queue_wait_seconds', time.perf_counter() - enqueued, queue='work')
+            try:
+                response = self.bot.build_reply(comment, request)
+                if response:
+                    self.reply_queue.put((comment, response, enqueued))
+                    METRICS.set_gauge('queue_depth', self.reply_queue.qsize(), queue='reply')
+            except Exception as e:
+                METRICS.inc('errors_total', stage='worker')
+                print(f"❌ Worker error: {e}")
+            finally:
+                self.work_queue.task_done()
+
+    def _reply_loop(self):
+        while True:
+            comment, response, enqueued = self.reply_queue.get()
+            METRICS.set_gauge('queue_depth', self.reply_queue.qsize(), queue='reply')
+            try:
+                self.bot.send_reply(comment, response)
+                METRICS.observe('request_seconds', time.perf_counter() - enqueued, mode='pipeline')
+            except Exception as e:
+                METRICS.inc('errors_total', stage='reply')
+                print(f"❌ Reply error: {e}")
+            finally:
+                self.reply_queue.task_done()
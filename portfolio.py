@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Портфельный бэктест: все символы одной 2D-матрицей (бары x символы)
+
+    python portfolio.py --symbols BTC ETH GOLD SILVER SPY QQQ --period 60d --lookback 1000
+
+Индикаторы и сигналы — узлы signal_graph, посчитанные одним вызовом pandas на всю матрицу
+вместо N отдельных конвейеров MultiAssetStrategy
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from signal_graph import INDICATOR_COLUMNS, SignalGraph
+from strategy import DEFAULT_PARAMS, MultiAssetStrategy
+
+
+COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+def _utc_index(df, symbol):
+    index = df.index if df.index.tz is not None else df.index.tz_localize('UTC')
+    index = index.tz_convert('UTC').as_unit('ns')
+    if not (index.is_monotonic_increasing and index.is_unique):
+        raise ValueError(f"{symbol}: bars must be sorted by time without duplicates")
+    return index
+
+
+def stack_frames(frames):
+    """
+    {символ: DataFrame} -> {колонка: DataFrame время x символы} + общий индекс времени
+    Строки — объединение времени баров всех символов; где у символа нет бара — NaN
+    """
+    frames = {symbol: df.set_axis(_utc_index(df, symbol)) for symbol, df in frames.items()}
+    stacked = {
+        col: pd.concat({symbol: df[col] for symbol, df in frames.items()}, axis=1).astype(np.float64)
+        for col in COLUMNS
+    }
+    return stacked, stacked['Close'].index
+
+
+class PortfolioBacktest:
+    """Сигналы и сделки для набора символов; правила как у MultiAssetStrategy"""
+
+    def __init__(self, frames, asset_types=None, params=None, max_hold=100):
+        asset_types = asset_types or {}
+        self.symbols = list(frames)
+        self.frames = frames
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.max_hold = max_hold
+        self.strategies = {
+            symbol: MultiAssetStrategy(symbol, asset_types.get(symbol, 'Gold'), params=self.params)
+            for symbol in self.symbols
+        }
+        self.volatility_adj = pd.Series(
+            {symbol: s.volatility_adj for symbol, s in self.strategies.items()}
+        )[self.symbols].to_numpy()
+        self.data, self.index = stack_frames(frames)
+        # Позиции баров каждого символа в общем индексе времени
+        self.rows = {symbol: self.index.get_indexer(_utc_index(frames[symbol], symbol)) for symbol in self.symbols}
+        self._graphs = None
+
+    def signal_graphs(self):
+        """
+        Графы signal_graph над панелями (поле, символ): каждая колонка — матрица бары x символы
+        Символы, чьи бары идут в общем индексе подряд (тот же календарь, разная длина истории),
+        считаются одной матрицей; символ с пропусками (другой календарь) — по своим барам,
+        чтобы скользящие окна не видели чужих пропусков и совпадали с расчетом по одному символу
+        """
+        if self._graphs is None:
+            dense = [s for s in self.symbols if np.all(np.diff(self.rows[s]) == 1)]
+            groups = [(dense, None)] if dense else []
+            groups += [([s], self.rows[s]) for s in self.symbols if s not in dense]
+
+            self._graphs = []
+            for symbols, rows in groups:
+                panel = pd.concat({col: self.data[col][symbols] for col in COLUMNS}, axis=1)
+                if rows is not None:
+                    panel = panel.iloc[rows]
+                adj = self.volatility_adj[[self.symbols.index(s) for s in symbols]]
+                self._graphs.append(SignalGraph(panel, adj, self.params))
+        return self._graphs
+
+    def _gather(self, parts):
+        """Части по графам -> DataFrame время x символы; нет бара — NaN (у флагов False)"""
+        fill = False if all(part.dtypes.eq(bool).all() for part in parts) else np.nan
+        parts = [part.reindex(self.index, fill_value=fill) for part in parts]
+        return pd.concat(parts, axis=1)[self.symbols]
+
+    def calculate_indicators(self):
+        """Те же узлы signal_graph, что у MultiAssetStrategy, но по всей матрице сразу"""
+        graphs = self.signal_graphs()
+        for name in INDICATOR_COLUMNS:
+            self.data[name] = self._gather([graph.get(name) for graph in graphs])
+        return self.data
+
+    def generate_signals(self):
+        """Long_Signal / Short_Signal (время x символы)"""
+        d = self.calculate_indicators()
+        signals = [graph.signals() for graph in self.signal_graphs()]
+        d['Long_Signal'] = self._gather([long for long, _ in signals])
+        d['Short_Signal'] = self._gather([short for _, short in signals])
+        return d
+
+    def correlation_weights(self):
+        """
+        Веса символов: обратная волатильность, деленная на суммарную
+        положительную корреляцию с остальными — связанные активы делят один бюджет
+        """
+        # Доходность по своим барам символа (не через чужие пропуски), в общем индексе времени
+        returns = pd.DataFrame({
+            symbol: self.data['Close'][symbol].iloc[self.rows[symbol]].pct_change() for symbol in self.symbols
+        })
+
+        corr = returns.corr(min_periods=30).fillna(0.0)
+        np.fill_diagonal(corr.values, 1.0)
+        vol = returns.std().replace(0, np.nan)
+        crowding = corr.clip(lower=0).sum(axis=1)
+        raw = (1.0 / (vol * crowding)).fillna(0.0)
+        weights = raw / raw.sum() if raw.sum() > 0 else pd.Series(1.0 / len(raw), index=raw.index)
+        return weights, corr
+
+    def run(self, lookback=None):
+        """Бэктест всех символов -> отчет по символам, веса и общая кривая доходности"""
+        d = self.generate_signals()
+        weights, corr = self.correlation_weights()
+
+        per_symbol = {}
+        events = []  # (время выхода, взвешенный результат, %)
+        for symbol in self.symbols:
+            rows = self.rows[symbol]
+            n = len(rows)
+            columns = {
+                col: d[col][symbol].to_numpy()[rows]
+                for col in ('Close', 'High', 'Low', 'ATR', 'Long_Signal', 'Short_Signal')
+            }
+
+            strategy = self.strategies[symbol]
+            window = min(lookback or n, n)
+            trades = strategy._backtest_vectorized(columns, window, self.max_hold)
+            stats = strategy._summarize_trades(trades)
+            stats.pop('trades')
+            stats['weight'] = round(float(weights[symbol]), 4)
+            per_symbol[symbol] = stats
+
+            ts = self.index.asi8[rows]
+            for trade in trades:
+                events.append((int(ts[trade['exit_idx']]), trade['profit'] * weights[symbol]))
+
+        equity = self._equity_curve(events)
+        return {
+            'symbols': per_symbol,
+            'weights': {s: round(float(w), 4) for s, w in weights.items()},
+            'correlation': corr.round(3).to_dict(),
+            'effective_bets': round(float(1.0 / (weights ** 2).sum()), 2) if weights.sum() else 0,
+            'aggregate': self._aggregate(per_symbol, equity),
+            'equity_curve': equity,
+        }
+
+    def _equity_curve(self, events):
+        """Накопленная взвешенная доходность (%) по времени выхода сделок"""
+        if not events:
+            return pd.Series(dtype=float)
+        events.sort()
+        index = pd.DatetimeIndex(np.array([e[0] for e in events]).view('M8[ns]')).tz_localize('UTC')
+        curve = pd.Series(np.cumsum([e[1] for e in events]), index=index, name='equity_pct')
+        return curve[~curve.index.duplicated(keep='last')]
+
+    def _aggregate(self, per_symbol, equity):
+        total = sum(s['total_trades'] for s in per_symbol.values())
+        wins = sum(s['wins'] for s in per_symbol.values())
+        drawdown = float((equity.cummax().clip(lower=0) - equity).max()) if len(equity) else 0.0
+        return {
+            'total_trades': total,
+            'winrate': round(wins / total * 100, 2) if total else 0,
+            'return_pct': round(float(equity.iloc[-1]), 2) if len(equity) else 0.0,
+            'max_drawdown_pct': round(drawdown, 2),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portfolio backtest across symbols")
+    parser.add_argument('--symbols', nargs='+', default=['BTC', 'ETH', 'GOLD', 'SILVER', 'SPY', 'QQQ'])
+    parser.add_argument('--period', default='60d')
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--lookback', type=int, default=None, help="bars per symbol (default: all)")
+    parser.add_argument('--out', default=None, help="save the JSON report")
+    args = parser.parse_args()
+
+    from main import detect_asset_type
+    from optimizer import load_symbols
+
+    frames = load_symbols(args.symbols, args.period, args.interval)
+    if not frames:
+        print("❌ No data for the portfolio")
+        return
+
+    portfolio = PortfolioBacktest(frames, {s: detect_asset_type(s) for s in frames})
+    report = portfolio.run(lookback=args.lookback)
+
+    print(f"\n💼 Portfolio of {len(frames)} symbols (effective bets: {report['effective_bets']})")
+    for symbol, stats in report['symbols'].items():
+        print(f"   {symbol:<8} w={stats['weight']:<6} {stats['total_trades']:>4} trades  "
+              f"WR {stats['winrate']:>6}%  PF {stats['profit_factor']}")
+    agg = report['aggregate']
+    print(f"   Total: {agg['total_trades']} trades | WR {agg['winrate']}% | "
+          f"return {agg['return_pct']}% | max DD {agg['max_drawdown_pct']}%")
+
+    if args.out:
+        report['equity_curve'] = {ts.isoformat(): round(v, 4) for ts, v in report['equity_curve'].items()}
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import namedtuple
+
+from metrics import METRICS
+
+
+# Последняя цена символа; ts — epoch-секунды сделки
+Quote = namedtuple('Quote', ['symbol', 'price', 'ts'])
+
+
+class QuoteFeed:
+    """
+    Последние котировки по символам
+    Источник (опрос, websocket, заглушка) кладет котировки через publish(), бот читает latest()
+    """
+
+    def __init__(self):
+        self._quotes = {}  # символ -> (котировка, когда получена по time.monotonic())
+        self._symbols = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, symbols):
+        """Символы, котировки которых нужны боту"""
+        with self._lock:
+            self._symbols.update(symbols)
+
+    def symbols(self):
+        with self._lock:
+            return sorted(self._symbols)
+
+    def publish(self, quote):
+        """Принять котировку; более старая, чем уже известная, отбрасывается"""
+        with self._lock:
+            current = self._quotes.get(quote.symbol)
+            if current is None or quote.ts >= current[0].ts:
+                self._quotes[quote.symbol] = (quote, time.monotonic())
+        METRICS.inc('quotes_total')
+
+    def latest(self, symbol, max_age=None):
+        """
+        Последняя котировка или None, если ее нет или она получена больше max_age секунд назад
+        (возраст — по времени получения: у закрытого рынка время сделки старое, а цена актуальна)
+        """
+        with self._lock:
+            current = self._quotes.get(symbol)
+        if current is None or (max_age is not None and time.monotonic() - current[1] > max_age):
+            return None
+        return current[0]
+
+    def start(self):
+        return self
+
+    def close(self):
+        pass
+
+
+class PollingQuoteFeed(QuoteFeed):
+    """Опрос источника раз в interval секунд: fetch(symbols) -> [Quote]"""
+
+    def __init__(self, fetch, interval=5.0):
+        super().__init__()
+        self.fetch = fetch
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="quotes", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+
+    def poll_once(self):
+        symbols = self.symbols()
+        if not symbols:
+            return 0
+        with METRICS.span('quotes_poll'):
+            quotes = self.fetch(symbols)
+        for quote in quotes:
+            self.publish(quote)
+        return len(quotes)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                METRICS.inc('errors_total', stage='quotes')
+                print(f"⚠️ Quote poll failed: {str(e)[:100]}")
+            self._stop.wait(self.interval)
+
+
+def yahoo_fetcher(client=None):
+    """fetch(symbols) для PollingQuoteFeed: chart API через MarketDataClient или yfinance"""
+    if client is not None:
+        return client.quotes
+
+    def fetch(symbols):
+        import yfinance as yf
+
+        quotes = []
+        for symbol in symbols:
+            try:
+                info = yf.Ticker(symbol).fast_info
+                quotes.append(Quote(symbol, float(info['last_price']), time.time()))
+            except Exception as e:
+                print(f"⚠️ No quote for {symbol}: {str(e)[:100]}")
+        return quotes
+
+    return fetch
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Нагрузочный прогон бота на записанном трафике
+
+    python replay.py record --subreddit stocks --limit 500 --comments comments.jsonl --bars-dir snapshots
+    python replay.py play --comments comments.jsonl --bars-dir snapshots --speed 60 --llm-latency 2
+
+Комментарии (JSONL) проигрываются через настоящий process_comment в N раз быстрее;
+praw / yfinance / Anthropic заменены заглушками из fakes.py
+"""
+
+import argparse
+import json
+import os
+import queue
+import random
+import statistics
+import threading
+import time
+
+import pandas as pd
+
+import main
+import scanner as scanner_module
+import strategy as strategy_module
+from fakes import (
+    FakeAnthropic, FakeAnthropicServer, FakeComment, FakeQuoteFeed, FakeReddit, FakeYahooServer, FakeYFinance
+)
+from pipeline import SlidingWindowRateLimiter
+
+
+SYNTHETIC_BODIES = [
+    "!analyze BTC", "!check GOLD", "!signal SPY 1h", "!analyze ETH BTC", "!check XAUUSD 4h",
+    "what do you think about gold?", "lol", "I bought NVDA at the top again", "nice post",
+    "anyone trading SILVER today?", "this sub is wild", "!signal QQQ",
+]
+
+
+def load_comments(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def synthetic_comments(count, rate, seed=0):
+    """Поток комментариев с пуассоновскими интервалами (rate — комментариев в секунду)"""
+    rng = random.Random(seed)
+    created = 1_700_000_000.0
+    comments = []
+    for i in range(count):
+        created += rng.expovariate(rate)
+        comments.append({'id': f"s{i}", 'body': rng.choice(SYNTHETIC_BODIES),
+                         'author': f"user{rng.randrange(500)}", 'created_utc': created})
+    return comments
+
+
+def load_bars(directory, interval='15m'):
+    """Снимки OHLCV: <символ Yahoo>.csv -> {(символ, интервал): DataFrame}"""
+    frames = {}
+    if not directory:
+        return frames
+    for name in os.listdir(directory):
+        if name.endswith('.csv'):
+            data = pd.read_csv(os.path.join(directory, name), index_col=0)
+            data.index = pd.to_datetime(data.index, utc=True)
+            frames[(name[:-4], interval)] = data
+    return frames
+
+
+class _TimedLimiter(SlidingWindowRateLimiter):
+    """Лимитер ответов, который запоминает, сколько ждал каждый ответ"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waits = []
+        self.waiting = 0  # ответы, которые сейчас ждут слот
+        self._waits_lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        started = time.monotonic()
+        with self._waits_lock:
+            self.waiting += 1
+        try:
+            return super().acquire(timeout)
+        finally:
+            with self._waits_lock:
+                self.waiting -= 1
+                self.waits.append(time.monotonic() - started)
+
+
+def make_bot(frames, speed, yf_latency, llm_latency, llm_server=False, yf_server=False, live_quotes=False):
+    main.BAR_STORE_DIR = ''
+    main.PROCESSED_COMMENTS_FILE = ''
+    main.WATCHLIST_SCANNER = False
+    main.METRICS_PORT = 0
+    main.COORDINATION_DB = ''
+    if yf_server:
+        source = FakeYFinance(frames=frames)
+        main.MARKET_DATA_URL = FakeYahooServer(source, latency=yf_latency).url
+        strategy_module.yf = scanner_module.yf = source
+    else:
+        main.MARKET_DATA_URL = ''
+        strategy_module.yf = scanner_module.yf = FakeYFinance(latency=yf_latency, frames=frames)
+
+    if llm_server:
+        from anthropic import Anthropic
+        server = FakeAnthropicServer(delay=llm_latency)
+        claude = Anthropic(api_key='replay', base_url=server.url, max_retries=0)
+    else:
+        claude = FakeAnthropic(latency=llm_latency)
+    # Котировки идут в реальном времени, независимо от скорости проигрывания
+    feed = FakeQuoteFeed(strategy_module.yf, tick=0.5).start() if live_quotes else None
+    bot = main.TradingRedditBot(reddit=FakeReddit(), claude=claude, quote_feed=feed)
+
+    # Час лимита сжимается вместе со временем проигрывания
+    scale = speed or 1.0
+    bot.rate_limiter = _TimedLimiter(
+        main.MAX_REPLIES_PER_HOUR, period=3600 / scale, min_interval=main.REPLY_MIN_INTERVAL / scale
+    )
+    return bot
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def play(bot, records, speed, workers, reply_latency=0.0, drain=30.0, delay_threshold=1.0):
+    """Проиграть комментарии; speed=0 — без пауз, как можно быстрее"""
+    comments = [
+        FakeComment(r['body'], author=r.get('author', 'replay'), comment_id=r.get('id'),
+                    created_utc=r.get('created_utc', 0.0), reply_latency=reply_latency)
+        for r in records
+    ]
+    first = comments[0].created_utc if comments else 0.0
+    arrivals = {}
+    errors = []
+
+    work = queue.Queue()
+
+    def worker():
+        while True:
+            comment = work.get()
+            try:
+                bot.process_comment(comment)
+            except Exception as e:
+                errors.append(str(e))
+
+    # Потоки-демоны: застрявшие в лимитере ответы не держат процесс после отчета
+    for i in range(workers):
+        threading.Thread(target=worker, name=f"replay-{i}", daemon=True).start()
+
+    started = time.monotonic()
+    for comment in comments:
+        if speed:
+            due = started + (comment.created_utc - first) / speed
+            time.sleep(max(due - time.monotonic(), 0))
+        arrivals[comment.id] = time.monotonic()
+        work.put(comment)
+    played = time.monotonic() - started
+
+    # Ответы, не успевшие к концу окна дренажа, считаются потерянными
+    deadline = time.monotonic() + drain
+    requested = [c for c in comments if (bot.commands.scan(c.body) or [None])[0]]
+    while time.monotonic() < deadline and any(c.replied_at is None for c in requested):
+        time.sleep(0.05)
+    elapsed = time.monotonic() - started
+
+    latencies = [c.replied_at - arrivals[c.id] for c in requested if c.replied_at is not None]
+    waits = list(bot.rate_limiter.waits)
+    replied = len(latencies)
+    return {
+        'comments': len(comments),
+        'requests': len(requested),
+        'replies': replied,
+        'dropped': len(requested) - replied,
+        'errors': len(errors),
+        'speed': speed,
+        'play_seconds': round(played, 2),
+        'elapsed_seconds': round(elapsed, 2),
+        'throughput': {
+            'comments_per_s': round(len(comments) / elapsed, 2) if elapsed else 0,
+            'replies_per_s': round(replied / elapsed, 2) if elapsed else 0,
+        },
+        'latency_s': {
+            'p50': round(percentile(latencies, 50), 3),
+            'p90': round(percentile(latencies, 90), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(max(latencies, default=0.0), 3),
+            'mean': round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        },
+        'rate_limit': {
+            'delayed': sum(1 for w in waits if w > delay_threshold),
+            'still_waiting': bot.rate_limiter.waiting,
+            'total_wait_s': round(sum(waits), 2),
+            'max_wait_s': round(max(waits, default=0.0), 2),
+        },
+        'cache': bot.analysis_cache.stats(),
+    }
+
+
+def record(subreddit, limit, comments_path, bars_dir, period='60d', interval='15m'):
+    """Записать последние комментарии сабреддита и снимки OHLCV всех символов"""
+    import praw
+    import yfinance as yf
+
+    reddit = praw.Reddit(**main.REDDIT_CONFIG)
+    rows = [
+        {'id': c.id, 'body': c.body, 'author': str(c.author), 'created_utc': c.created_utc}
+        for c in reddit.subreddit(subreddit).comments(limit=limit)
+    ]
+    rows.sort(key=lambda r: r['created_utc'])
+    with open(comments_path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+    print(f"💾 {len(rows)} comments saved to {comments_path}")
+
+    os.makedirs(bars_dir, exist_ok=True)
+    for symbol_yf in sorted(set(main.SYMBOL_MAP.values())):
+        data = yf.Ticker(symbol_yf).history(period=period, interval=interval)
+        if not data.empty:
+            data.to_csv(os.path.join(bars_dir, f"{symbol_yf}.csv"))
+            print(f"📥 {symbol_yf}: {len(data)} bars")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Record / replay load testing")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help="record comments and OHLCV snapshots")
+    rec.add_argument('--subreddit', default=main.SUBREDDIT_NAME)
+    rec.add_argument('--limit', type=int, default=500)
+    rec.add_argument('--comments', default='comments.jsonl')
+    rec.add_argument('--bars-dir', default='snapshots')
+
+    run = sub.add_parser('play', help="replay through process_comment")
+    run.add_argument('--comments', default=None, help="JSONL file (default: synthetic stream)")
+    run.add_argument('--synthetic', type=int, default=300, help="synthetic comments if no file")
+    run.add_argument('--rate', type=float, default=0.5, help="synthetic comments per second (recorded time)")
+    run.add_argument('--bars-dir', default=None, help="OHLCV snapshots (default: synthetic bars)")
+    run.add_argument('--speed', type=float, default=60.0, help="replay speed multiplier, 0 = no pauses")
+    run.add_argument('--workers', type=int, default=main.WORKER_THREADS)
+    run.add_argument('--yf-latency', type=float, default=0.3)
+    run.add_argument('--llm-latency', type=float, default=2.0)
+    run.add_argument('--llm-server', action='store_true', help="serve fake Claude over local HTTP")
+    run.add_argument('--yf-server', action='store_true', help="serve fake Yahoo chart API over local HTTP")
+    run.add_argument('--live-quotes', action='store_true', help="stream fake live quotes to the bot")
+    run.add_argument('--reply-latency', type=float, default=0.2)
+    run.add_argument('--drain', type=float, default=30.0, help="seconds to wait for replies after the stream ends")
+    run.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.subreddit, args.limit, args.comments, args.bars_dir)
+        return
+
+    records = load_comments(args.comments) if args.comments else synthetic_comments(args.synthetic, args.rate)
+    bot = make_bot(load_bars(args.bars_dir), args.speed, args.yf_latency, args.llm_latency,
+                   args.llm_server, args.yf_server, args.live_quotes)
+    print(f"\n▶️ Replaying {len(records)} comments at {args.speed or 'max'}x with {args.workers} workers")
+    report = play(bot, records, args.speed, args.workers, args.reply_latency, args.drain)
+
+    print(f"\n📈 {report['replies']}/{report['requests']} requests answered in {report['elapsed_seconds']}s "
+          f"({report['throughput']['replies_per_s']} replies/s, {report['throughput']['comments_per_s']} comments/s)")
+    lat = report['latency_s']
+    print(f"   Latency p50 {lat['p50']}s | p90 {lat['p90']}s | p99 {lat['p99']}s | max {lat['max']}s")
+    rl = report['rate_limit']
+    print(f"   Rate limit: {rl['delayed']} delayed (max wait {rl['max_wait_s']}s), "
+          f"{rl['still_waiting']} still waiting | {report['dropped']} dropped | {report['errors']} errors")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+OHLCV_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def timeframe_rule(timeframe):
+    """Таймфрейм ('30m', '4h', '1d') -> правило pandas resample"""
+    for suffix, unit in (('m', 'min'), ('h', 'h'), ('d', 'D')):
+        if timeframe.endswith(suffix) and timeframe[:-len(suffix)].isdigit():
+            return timeframe[:-len(suffix)] + unit
+    raise ValueError(f"Unsupported timeframe: {timeframe}")
+
+
+def resample_ohlcv(data, timeframe):
+    """Базовые бары -> бары старшего таймфрейма; пустые интервалы (рынок закрыт) выкидываются"""
+    if data.empty:
+        return data
+    bars = data[list(OHLCV_AGG)].resample(timeframe_rule(timeframe), label='left', closed='left').agg(OHLCV_AGG)
+    return bars.dropna(subset=['Open'])
+
+
+class Resampler:
+    """
+    Кэш пересчитанных таймфреймов
+    При новых базовых барах пересчитывается только последний (незакрытый) интервал,
+    закрытые интервалы берутся из кэша
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resample(self, key, data, timeframe):
+        with self._lock:
+            cached = self._frames.get(key)
+
+        frame = self._extend(cached, data, timeframe) if cached is not None else None
+        if frame is None:
+            frame = resample_ohlcv(data, timeframe)
+
+        with self._lock:
+            self._frames[key] = frame
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.maxsize:
+                self._frames.popitem(last=False)
+        return frame
+
+    def _extend(self, cached, data, timeframe):
+        """Дописать новые интервалы к кэшу; None — если окна не пересекаются"""
+        if data.empty or len(cached) < 2:
+            return None
+        first, last = data.index[0], data.index[-1]
+        tail_start = cached.index[-1]
+        if tail_start > last or cached.index[0] > first:
+            return None
+
+        # Интервалы целиком внутри окна данных; первый может быть неполным — его пересчитываем
+        lo = int(cached.index.searchsorted(first))
+        head = cached.iloc[lo:-1]
+        if head.empty:
+            return None
+
+        parts = [
+            resample_ohlcv(data[data.index < head.index[0]], timeframe),
+            head,
+            resample_ohlcv(data[data.index >= tail_start], timeframe),
+        ]
+        return pd.concat([p for p in parts if not p.empty])
@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pandas as pd
+import yfinance as yf
+
+from cache import current_bar_start, interval_seconds
+from metrics import METRICS
+from strategy import MultiAssetStrategy
+
+
+def download_batch(symbols, period='3mo', interval='15m', store=None, client=None):
+    """
+    Пакетная загрузка нескольких тикеров: {символ: DataFrame}
+    yf.download одним вызовом или MarketDataClient параллельно (в пределах лимита на хост)
+    """
+    symbols = list(symbols)
+    params = {'period': period}
+
+    if store is not None:
+        lasts = [store.last_timestamp(s, interval) for s in symbols]
+        if all(last is not None for last in lasts):
+            # Все символы уже в хранилище — догружаем только хвост
+            params = {'start': min(lasts)}
+
+    if client is not None:
+        return client.history_many(symbols, interval=interval, **params)
+
+    raw = yf.download(
+        tickers=symbols,
+        interval=interval,
+        group_by='ticker',
+        auto_adjust=True,  # как у Ticker.history()
+        threads=True,
+        progress=False,
+        **params
+    )
+
+    frames = {}
+    for symbol in symbols:
+        if isinstance(raw.columns, pd.MultiIndex):
+            if symbol not in raw.columns.get_level_values(0):
+                continue
+            df = raw[symbol]
+        else:
+            df = raw
+        # Общий индекс у разных рынков: строки без торгов пустые
+        frames[symbol] = df.dropna(how='all')
+    return frames
+
+
+class WatchlistScanner:
+    """
+    Фоновый прогрев watchlist
+    На закрытии каждого бара все тикеры скачиваются одним пакетом,
+    сигналы и бэктесты складываются в таблицу в памяти
+    """
+
+    def __init__(self, watchlist, store=None, indicators=None, period='3mo', interval='15m',
+                 engine='vectorized', delay=20, client=None):
+        self.watchlist = watchlist  # {символ Yahoo: тип актива}
+        self.store = store
+        self.indicators = indicators
+        self.client = client
+        self.period = period
+        self.interval = interval
+        self.engine = engine
+        self.delay = delay
+        self.table = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="scanner", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        step = interval_seconds(self.interval)
+        while True:
+            try:
+                self.scan_once()
+            except Exception as e:
+                print(f"❌ Scanner error: {e}")
+
+            # Ждем закрытия следующего бара (+ задержка на публикацию у Yahoo)
+            next_close = current_bar_start(self.interval) + step + self.delay
+            time.sleep(max(next_close - time.time(), 1))
+
+    def lookup(self, symbol_yf):
+        """Готовый результат, посчитанный на текущем баре (или None)"""
+        with self._lock:
+            entry = self.table.get(symbol_yf)
+        if entry and entry['scanned_bar'] == current_bar_start(self.interval):
+            return entry
+        return None
+
+    def memory_report(self):
+        """Память компактных кадров по символам, байт"""
+        with self._lock:
+            return {symbol: entry['frame'].nbytes for symbol, entry in self.table.items()}
+
+    def _download(self):
+        """Пакетная загрузка всех тикеров: {символ: DataFrame}"""
+        return download_batch(self.watchlist, self.period, self.interval, self.store, self.client)
+
+    def scan_once(self):
+        started = time.time()
+        scanned_bar = current_bar_start(self.interval)
+        frames = self._download()
+
+        changed = []
+        for symbol_yf, asset_type in self.watchlist.items():
+            strategy = MultiAssetStrategy(symbol_yf, asset_type, store=self.store, indicators=self.indicators)
+            if not strategy.ingest_data(frames.get(symbol_yf), period=self.period, interval=self.interval):
+                print(f"⚠️ Scanner: no data for {symbol_yf}")
+                continue
+
+            # Дальше стратегия работает на компактной копии: DataFrame не хранится
+            frame = strategy.to_compact()
+            strategy.data = frame
+            backtest = strategy.backtest(lookback=100, engine=self.engine)
+            signal = strategy.get_current_signal()
+            if not signal:
+                continue
+
+            entry = {
+                'asset_type': asset_type,
+                'bar_ts': int(frame.ts[-1] // 10**9),
+                'frame': frame,
+                'scanned_bar': scanned_bar,
+                'backtest': backtest,
+                'signal': signal,
+            }
+            with self._lock:
+                previous = self.table.get(symbol_yf)
+                self.table[symbol_yf] = entry
+            METRICS.set_gauge('frame_bytes', frame.nbytes, symbol=symbol_yf)
+
+            if previous and previous['signal']['type'] != signal['type']:
+                changed.append(f"{symbol_yf}: {previous['signal']['type']} -> {signal['type']}")
+
+        total_mb = sum(self.memory_report().values()) / 2**20
+        print(f"🔭 Scanned {len(self.table)}/{len(self.watchlist)} symbols in {time.time() - started:.1f}s "
+              f"({total_mb:.1f} MB kept)")
+        for line in changed:
+            print(f"🔔 Signal changed {line}")
@@ -0,0 +1,330 @@
+import functools
+import operator
+
+import numpy as np
+import pandas as pd
+
+
+class Node:
+    """Колонка графа: входные колонки, формула и сколько предыдущих баров ей нужно"""
+
+    __slots__ = ('name', 'deps', 'func', 'lookback')
+
+    def __init__(self, name, deps, func, lookback):
+        self.name = name
+        self.deps = deps
+        self.func = func
+        self.lookback = lookback  # int, None — вся история (рекурсивные EMA) или f(params)
+
+    def warmup(self, params):
+        return self.lookback(params) if callable(self.lookback) else self.lookback
+
+
+NODES = {}
+
+
+def node(name, *deps, lookback=0):
+    """Регистрация колонки; формула получает граф (params, volatility_adj) и Series входов"""
+    def register(func):
+        NODES[name] = Node(name, deps, func, lookback)
+        return func
+    return register
+
+
+# Колонки в порядке, в котором их добавляют calculate_indicators / generate_signals
+INDICATOR_COLUMNS = [
+    'ATR', 'EMA_Fast', 'EMA_Slow', 'EMA_Filter', 'ADX', 'RSI',
+    'BB_Middle', 'BB_Std', 'BB_Upper', 'BB_Lower',
+    'Volume_SMA', 'Volume_Spike', 'Highest_High', 'Lowest_Low',
+]
+SIGNAL_COLUMNS = [
+    'Is_Trending', 'Is_Ranging', 'Bullish_Trend', 'Bearish_Trend', 'EMA_Cross_Up', 'EMA_Cross_Down',
+    'Trend_Long', 'Trend_Short', 'Breakout_Long', 'Breakout_Short', 'Mean_Rev_Long', 'Mean_Rev_Short',
+    'Long_Signal', 'Short_Signal',
+]
+
+# Семейства подстратегий: (колонка LONG, колонка SHORT)
+FAMILIES = {
+    'trend': ('Trend_Long', 'Trend_Short'),
+    'breakout': ('Breakout_Long', 'Breakout_Short'),
+    'mean_reversion': ('Mean_Rev_Long', 'Mean_Rev_Short'),
+}
+
+
+# === INDICATORS === (единственный источник формул: стратегия, бэктесты и потоковый движок берут их отсюда)
+
+@node('TR', 'High', 'Low', 'Close', lookback=1)
+def _tr(g, high, low, close):
+    tr1 = high - low
+    tr2 = abs(high - close.shift())
+    tr3 = abs(low - close.shift())
+    # fmax пропускает NaN, как max(axis=1), и работает и по Series, и по матрице бары x символы
+    return np.fmax(np.fmax(tr1, tr2), tr3)
+
+
+@node('TR_Mean', 'TR', lookback=13)
+def _tr_mean(g, tr):
+    return tr.rolling(14).mean()
+
+
+@node('ATR', 'TR_Mean')
+def _atr(g, tr_mean):
+    return tr_mean * g.volatility_adj
+
+
+@node('EMA_Fast', 'Close', lookback=None)
+def _ema_fast(g, close):
+    return close.ewm(span=g.params['ema_fast'], adjust=False).mean()
+
+
+@node('EMA_Slow', 'Close', lookback=None)
+def _ema_slow(g, close):
+    return close.ewm(span=g.params['ema_slow'], adjust=False).mean()
+
+
+@node('EMA_Filter', 'Close', lookback=None)
+def _ema_filter(g, close):
+    return close.ewm(span=g.params['ema_filter'], adjust=False).mean()
+
+
+@node('Plus_DM', 'High', lookback=1)
+def _plus_dm(g, high):
+    plus_dm = high.diff()
+    return plus_dm.mask(plus_dm < 0, 0)
+
+
+@node('Minus_DM', 'Low', lookback=1)
+def _minus_dm(g, low):
+    minus_dm = -low.diff()
+    return minus_dm.mask(minus_dm < 0, 0)
+
+
+@node('DX', 'Plus_DM', 'Minus_DM', 'TR_Mean', lookback=13)
+def _dx(g, plus_dm, minus_dm, tr_mean):
+    plus_di = 100 * (plus_dm.rolling(14).mean() / tr_mean)
+    minus_di = 100 * (minus_dm.rolling(14).mean() / tr_mean)
+    return 100 * abs(plus_di - minus_di) / (plus_di + minus_di)
+
+
+@node('ADX', 'DX', lookback=13)
+def _adx(g, dx):
+    return dx.rolling(14).mean()
+
+
+@node('RSI', 'Close', lookback=14)
+def _rsi(g, close):
+    delta = close.diff()
+    # where() превращает NaN в 0; строки до первого бара символа (выравнивание в портфеле) остаются NaN
+    before_first = close.ffill().isna()
+    gain = delta.where(delta > 0, 0).mask(before_first).rolling(14).mean()
+    loss = -delta.where(delta < 0, 0).mask(before_first).rolling(14).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+
+@node('BB_Middle', 'Close', lookback=lambda p: p['bb_period'] - 1)
+def _bb_middle(g, close):
+    return close.rolling(g.params['bb_period']).mean()
+
+
+@node('BB_Std', 'Close', lookback=lambda p: p['bb_period'] - 1)
+def _bb_std(g, close):
+    return close.rolling(g.params['bb_period']).std()
+
+
+@node('BB_Upper', 'BB_Middle', 'BB_Std')
+def _bb_upper(g, middle, std):
+    return middle + (g.params['bb_std'] * std)
+
+
+@node('BB_Lower', 'BB_Middle', 'BB_Std')
+def _bb_lower(g, middle, std):
+    return middle - (g.params['bb_std'] * std)
+
+
+@node('Volume_SMA', 'Volume', lookback=19)
+def _volume_sma(g, volume):
+    return volume.rolling(20).mean()
+
+
+@node('Volume_Spike', 'Volume', 'Volume_SMA')
+def _volume_spike(g, volume, volume_sma):
+    return volume > (volume_sma * g.params['volume_spike'])
+
+
+@node('Highest_High', 'High', lookback=19)
+def _highest_high(g, high):
+    return high.rolling(20).max()
+
+
+@node('Lowest_Low', 'Low', lookback=19)
+def _lowest_low(g, low):
+    return low.rolling(20).min()
+
+
+# === SIGNALS === (как в MultiAssetStrategy.generate_signals)
+
+@node('Is_Trending', 'ADX')
+def _is_trending(g, adx):
+    return adx > g.params['adx_threshold']
+
+
+@node('Is_Ranging', 'ADX')
+def _is_ranging(g, adx):
+    return adx <= g.params['adx_threshold']
+
+
+@node('Bullish_Trend', 'EMA_Fast', 'EMA_Slow', 'Close', 'EMA_Filter')
+def _bullish_trend(g, fast, slow, close, trend_filter):
+    return (fast > slow) & (close > trend_filter)
+
+
+@node('Bearish_Trend', 'EMA_Fast', 'EMA_Slow', 'Close', 'EMA_Filter')
+def _bearish_trend(g, fast, slow, close, trend_filter):
+    return (fast < slow) & (close < trend_filter)
+
+
+@node('EMA_Cross_Up', 'EMA_Fast', 'EMA_Slow', lookback=1)
+def _ema_cross_up(g, fast, slow):
+    return (fast > slow) & (fast.shift(1) <= slow.shift(1))
+
+
+@node('EMA_Cross_Down', 'EMA_Fast', 'EMA_Slow', lookback=1)
+def _ema_cross_down(g, fast, slow):
+    return (fast < slow) & (fast.shift(1) >= slow.shift(1))
+
+
+@node('Trend_Long', 'Is_Trending', 'Bullish_Trend', 'EMA_Cross_Up', 'Volume_Spike')
+def _trend_long(g, trending, bullish, cross_up, spike):
+    return trending & bullish & cross_up & spike
+
+
+@node('Trend_Short', 'Is_Trending', 'Bearish_Trend', 'EMA_Cross_Down', 'Volume_Spike')
+def _trend_short(g, trending, bearish, cross_down, spike):
+    return trending & bearish & cross_down & spike
+
+
+@node('Breakout_Long', 'Close', 'Highest_High', 'Volume_Spike', 'EMA_Filter', lookback=1)
+def _breakout_long(g, close, highest, spike, trend_filter):
+    return (close > highest.shift(1)) & spike & (close > trend_filter)
+
+
+@node('Breakout_Short', 'Close', 'Lowest_Low', 'Volume_Spike', 'EMA_Filter', lookback=1)
+def _breakout_short(g, close, lowest, spike, trend_filter):
+    return (close < lowest.shift(1)) & spike & (close < trend_filter)
+
+
+@node('Mean_Rev_Long', 'Is_Ranging', 'Close', 'BB_Lower', 'RSI')
+def _mean_rev_long(g, ranging, close, lower, rsi):
+    return ranging & (close < lower) & (rsi < 30)
+
+
+@node('Mean_Rev_Short', 'Is_Ranging', 'Close', 'BB_Upper', 'RSI')
+def _mean_rev_short(g, ranging, close, upper, rsi):
+    return ranging & (close > upper) & (rsi > 70)
+
+
+@node('Long_Signal', 'Trend_Long', 'Breakout_Long', 'Mean_Rev_Long')
+def _long_signal(g, trend, breakout, mean_rev):
+    return trend | breakout | mean_rev
+
+
+@node('Short_Signal', 'Trend_Short', 'Breakout_Short', 'Mean_Rev_Short')
+def _short_signal(g, trend, breakout, mean_rev):
+    return trend | breakout | mean_rev
+
+
+def reach(name, params):
+    """
+    Сколько первых баров колонки зависят от баров до начала данных (считаются по неполному окну)
+    None — от всей истории (EMA)
+    """
+    node = NODES.get(name)
+    if node is None:
+        return 0
+    own = node.warmup(params)
+    deps = [reach(dep, params) for dep in node.deps]
+    if own is None or None in deps:
+        return None
+    return own + max(deps, default=0)
+
+
+def family_columns(families=None):
+    """Колонки LONG и SHORT выбранных семейств (None — общий сигнал всех подстратегий)"""
+    if families is None:
+        return ['Long_Signal'], ['Short_Signal']
+    unknown = set(families) - set(FAMILIES)
+    if unknown:
+        raise ValueError(f"Unknown strategy families: {', '.join(sorted(unknown))}")
+    return [FAMILIES[f][0] for f in families], [FAMILIES[f][1] for f in families]
+
+
+def _tail(series, offset):
+    """series без первых offset строк (без среза, если отрезать нечего)"""
+    return series.iloc[offset:] if offset else series
+
+
+class SignalGraph:
+    """
+    Ленивый расчет колонок над одним набором баров
+    data — DataFrame одного символа или панель с колонками (поле, символ): тогда каждая колонка
+    графа — матрица бары x символы, а volatility_adj — массив по символам
+    Считаются только запрошенные колонки и их зависимости и только на нужном хвосте
+    (плюс прогрев окон); результаты запоминаются до замены данных
+    Колонки, которые уже есть в data (например, от IncrementalIndicators), не пересчитываются;
+    reuse=False — из data берутся только исходные бары
+    """
+
+    def __init__(self, data, volatility_adj=1.0, params=None, reuse=True):
+        self.data = data
+        self.volatility_adj = volatility_adj
+        self.params = params or {}
+        self.reuse = reuse
+        self._values = {}  # колонка -> (первый верный бар, Series)
+        self.computed = {}  # колонка -> сколько баров посчитано (для отладки/бенчмарков)
+
+    def _start(self, tail):
+        return 0 if tail is None else max(len(self.data) - tail, 0)
+
+    def get(self, name, tail=None):
+        """Колонка целиком или последние tail баров"""
+        return self._eval(name, self._start(tail))
+
+    def frame(self, names, tail=None, with_data=True):
+        """DataFrame: бары (with_data) + запрошенные колонки"""
+        start = self._start(tail)
+        df = self.data.iloc[start:].copy() if with_data else pd.DataFrame(index=self.data.index[start:])
+        for name in names:
+            df[name] = self._eval(name, start)
+        return df
+
+    def signals(self, families=None, tail=None):
+        """(LONG, SHORT) — все подстратегии или только выбранные семейства"""
+        start = self._start(tail)
+        longs, shorts = family_columns(families)
+        return (
+            functools.reduce(operator.or_, (self._eval(c, start) for c in longs)),
+            functools.reduce(operator.or_, (self._eval(c, start) for c in shorts)),
+        )
+
+    def _eval(self, name, start):
+        cached = self._values.get(name)
+        if cached is not None and cached[0] <= start:
+            return _tail(cached[1], start - cached[0])
+
+        if name in self.data.columns and (self.reuse or name not in NODES):
+            return _tail(self.data[name], start)
+        if name not in NODES:
+            raise KeyError(name)
+
+        node = NODES[name]
+        warmup = node.warmup(self.params)
+        dep_start = 0 if warmup is None else max(start - warmup, 0)
+        inputs = [self._eval(dep, dep_start) for dep in node.deps]
+        value = node.func(self, *inputs)
+
+        # Первые warmup баров посчитаны без истории — верны только если это начало данных
+        valid_from = start if dep_start > 0 else 0
+        value = _tail(value, valid_from - dep_start)
+        self._values[name] = (valid_from, value)
+        self.computed[name] = len(value)
+        return _tail(value, start - valid_from)
@@ -0,0 +1,191 @@
+"""
+Быстрый старт: проверка конфигурации без тяжелых модулей и отчет о времени импорта
+
+    python main.py --check            # конфиг и учетные данные, pandas не загружается
+    python main.py --check --online   # + вход в Reddit и пробный запрос к Claude
+    python main.py --import-times     # сколько стоит каждый импорт при старте
+"""
+
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+import time
+
+from config import (
+    ANTHROPIC_BASE_URL, BACKTEST_ENGINE, BAR_STORE_DIR, BASE_INTERVAL, CLAUDE_API_KEY, CLAUDE_BATCH_SIZE,
+    CLAUDE_BATCH_WINDOW, CLAUDE_MAX_TOKENS, CLAUDE_MODEL, CLAUDE_TIMEOUT, CLAUDE_TOKEN_BUDGET, COORDINATION_DB,
+    LIVE_QUOTES, MARKET_DATA_DEADLINE, MARKET_DATA_TIMEOUT, MARKET_DATA_URL, METRICS_PORT,
+    PROCESSED_COMMENTS_FILE, PROFILE_DIR, PROFILE_SLOW_REQUESTS, QUOTE_MAX_AGE, QUOTE_POLL_INTERVAL,
+    REDDIT_CONFIG, REPLY_DEADLINE, SUBREDDITS, TIMEFRAMES, WORKER_PROCESSES,
+)
+
+
+# Пакеты, без которых бот не обработает ни одного запроса (проверяются без импорта)
+REQUIRED_PACKAGES = ['praw', 'anthropic', 'numpy', 'pandas', 'yfinance', 'dotenv']
+
+# Импорты при старте в порядке загрузки и когда их платит бот
+STARTUP_IMPORTS = [
+    ('dotenv', 'startup'), ('config', 'startup'), ('metrics', 'startup'), ('cache', 'startup'),
+    ('pipeline', 'startup'), ('dedupe', 'startup'), ('commands', 'startup'), ('coordination', 'startup'),
+    ('batcher', 'startup'), ('main', 'startup'), ('praw', 'bot init'), ('anthropic', 'bot init'),
+    ('numpy', 'bot init'), ('pandas', 'bot init'), ('bar_store', 'bot init'), ('resample', 'bot init'),
+    ('yfinance', 'warm-up'), ('strategy', 'warm-up'), ('scanner', 'warm-up'),
+]
+
+
+def check_credentials():
+    """Незаполненные учетные данные -> [(ошибка, подсказка)]"""
+    problems = []
+    reddit_keys = ('client_id', 'client_secret', 'username', 'password')
+    if any(not REDDIT_CONFIG[key] or 'YOUR_' in REDDIT_CONFIG[key] for key in reddit_keys):
+        problems.append(("Please configure your Reddit API credentials in .env file",
+                         "Visit https://www.reddit.com/prefs/apps to create an app"))
+    if not CLAUDE_API_KEY or 'YOUR_' in CLAUDE_API_KEY:
+        problems.append(("Please configure your Anthropic API key in .env file",
+                         "Visit https://console.anthropic.com/ to get your key"))
+    return problems
+
+
+def _writable(path):
+    """Путь можно создать: ближайший существующий каталог доступен для записи"""
+    path = os.path.abspath(path or '.')
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return os.access(path, os.W_OK)
+
+
+def check_config():
+    """Проверка настроек без тяжелых импортов -> (ошибки, предупреждения)"""
+    errors = [message for message, _ in check_credentials()]
+    warnings = []
+
+    missing = [name for name in REQUIRED_PACKAGES if importlib.util.find_spec(name) is None]
+    if missing:
+        errors.append(f"Missing packages: {', '.join(missing)} (pip install -r requirements.txt)")
+
+    if not SUBREDDITS:
+        errors.append("SUBREDDITS is empty")
+    if WORKER_PROCESSES < 1:
+        errors.append(f"WORKER_PROCESSES must be >= 1, got {WORKER_PROCESSES}")
+    elif WORKER_PROCESSES > len(SUBREDDITS):
+        warnings.append(f"WORKER_PROCESSES={WORKER_PROCESSES} but only {len(SUBREDDITS)} subreddits: "
+                        "extra workers will not start")
+
+    if BACKTEST_ENGINE not in ('vectorized', 'legacy'):
+        errors.append(f"Unknown BACKTEST_ENGINE: {BACKTEST_ENGINE}")
+    bad = [tf for tf in TIMEFRAMES if not re.fullmatch(r'\d+[mhd]', tf)]
+    if bad:
+        errors.append(f"Unsupported timeframes: {', '.join(bad)}")
+    if BASE_INTERVAL not in TIMEFRAMES:
+        errors.append(f"BASE_INTERVAL {BASE_INTERVAL} is not in TIMEFRAMES")
+
+    if REPLY_DEADLINE <= 0:
+        errors.append(f"REPLY_DEADLINE must be positive, got {REPLY_DEADLINE:g}")
+    elif REPLY_DEADLINE >= CLAUDE_TIMEOUT:
+        warnings.append(f"REPLY_DEADLINE ({REPLY_DEADLINE:g}s) >= CLAUDE_TIMEOUT ({CLAUDE_TIMEOUT}s): "
+                        "the template fallback never wins")
+    if CLAUDE_BATCH_SIZE < 1:
+        errors.append(f"CLAUDE_BATCH_SIZE must be >= 1, got {CLAUDE_BATCH_SIZE}")
+    if REPLY_DEADLINE > 0 and CLAUDE_BATCH_WINDOW >= REPLY_DEADLINE:
+        errors.append(f"CLAUDE_BATCH_WINDOW ({CLAUDE_BATCH_WINDOW:g}s) >= REPLY_DEADLINE ({REPLY_DEADLINE:g}s): "
+                      "every reply would be a template")
+    if 0 < CLAUDE_TOKEN_BUDGET < CLAUDE_MAX_TOKENS * 2:
+        warnings.append(f"CLAUDE_TOKEN_BUDGET ({CLAUDE_TOKEN_BUDGET}) covers fewer than 2 replies per hour")
+    if MARKET_DATA_URL and not re.match(r'https?://[^/]+', MARKET_DATA_URL):
+        errors.append(f"MARKET_DATA_URL must be an http(s) URL, got {MARKET_DATA_URL}")
+    elif MARKET_DATA_URL and MARKET_DATA_DEADLINE < MARKET_DATA_TIMEOUT:
+        warnings.append(f"MARKET_DATA_DEADLINE ({MARKET_DATA_DEADLINE}s) < MARKET_DATA_TIMEOUT "
+                        f"({MARKET_DATA_TIMEOUT}s): slow responses are cut before the timeout")
+    if LIVE_QUOTES and QUOTE_MAX_AGE <= QUOTE_POLL_INTERVAL:
+        warnings.append(f"QUOTE_MAX_AGE ({QUOTE_MAX_AGE}s) <= QUOTE_POLL_INTERVAL ({QUOTE_POLL_INTERVAL}s): "
+                        "quotes expire before the next poll")
+    if not 0 <= METRICS_PORT <= 65535:
+        errors.append(f"METRICS_PORT out of range: {METRICS_PORT}")
+
+    paths = {'BAR_STORE_DIR': BAR_STORE_DIR, 'PROCESSED_COMMENTS_FILE': PROCESSED_COMMENTS_FILE,
+             'COORDINATION_DB': COORDINATION_DB, 'PROFILE_DIR': PROFILE_DIR if PROFILE_SLOW_REQUESTS else ''}
+    for name, path in paths.items():
+        if path and not _writable(path):
+            errors.append(f"{name} is not writable: {path}")
+
+    return errors, warnings
+
+
+def check_online():
+    """Вход в Reddit и минимальный запрос к Claude (praw/anthropic, без pandas)"""
+    import praw
+    from anthropic import Anthropic
+
+    errors = []
+    try:
+        me = praw.Reddit(**REDDIT_CONFIG).user.me()
+        print(f"   Reddit: logged in as u/{me}")
+    except Exception as e:
+        errors.append(f"Reddit login failed: {str(e)[:100]}")
+
+    try:
+        claude = Anthropic(api_key=CLAUDE_API_KEY, base_url=ANTHROPIC_BASE_URL, timeout=CLAUDE_TIMEOUT)
+        claude.messages.create(model=CLAUDE_MODEL, max_tokens=1, messages=[{"role": "user", "content": "ping"}])
+        print(f"   Claude: {CLAUDE_MODEL} reachable")
+    except Exception as e:
+        errors.append(f"Claude request failed: {str(e)[:100]}")
+    return errors
+
+
+def run_check(online=False):
+    """python main.py --check: отчет и код выхода (0 — можно запускать)"""
+    started = time.perf_counter()
+    print("🩺 Checking configuration...")
+    errors, warnings = check_config()
+    if online and not errors:
+        errors += check_online()
+
+    for warning in warnings:
+        print(f"⚠️ {warning}")
+    for error in errors:
+        print(f"❌ {error}")
+
+    heavy = [name for name in ('pandas', 'numpy', 'yfinance') if name in sys.modules]
+    print(f"⏱ Check took {(time.perf_counter() - started) * 1000:.0f} ms"
+          f"{' (loaded: ' + ', '.join(heavy) + ')' if heavy else ''}")
+    if errors:
+        return 1
+    print("✅ Configuration OK")
+    return 0
+
+
+def import_report(modules=STARTUP_IMPORTS):
+    """
+    Время импорта по модулям в чистом интерпретаторе (python -X importtime)
+    Каждый модуль стоит столько, сколько он добавил поверх предыдущих
+    """
+    code = '; '.join(f"import {name}" for name, _ in modules)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        print(f"❌ Import failed:\n{result.stderr.strip().splitlines()[-1]}")
+        return None
+
+    costs = {}
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if not line.startswith('import time:') or len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        # Верхний уровень — без отступа в имени: его cumulative включает все вложенные импорты
+        if parts[2].startswith('   '):
+            continue
+        costs[parts[2].strip()] = int(parts[1]) / 1e6
+
+    print(f"\n⏱ Startup imports ({sys.executable})")
+    totals = {}
+    for name, stage in modules:
+        seconds = costs.get(name, 0.0)
+        totals[stage] = totals.get(stage, 0.0) + seconds
+        print(f"   {name:<14} {seconds * 1000:>8.1f} ms   {stage}")
+    print("   " + " | ".join(f"{stage}: {seconds * 1000:.0f} ms" for stage, seconds in totals.items()))
+    print(f"   Total: {sum(totals.values()) * 1000:.0f} ms")
+    return costs
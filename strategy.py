@@ -1,19 +1,321 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
 import pandas as pd
 import numpy as np
+import requests
+import requests.adapters
 import yfinance as yf
 from datetime import datetime, timedelta
 
+from metrics import METRICS, timed
+from cache import interval_seconds
+from compact import CompactFrame
+from indicators import IncrementalIndicators
+from quotes import Quote
+from resample import resample_ohlcv
+from signal_graph import INDICATOR_COLUMNS, SIGNAL_COLUMNS, SignalGraph, family_columns
+
+
+def _period_offset(period):
+    """Период Yahoo ('5d', '3mo', '1y', 'max') -> смещение pandas"""
+    units = {
+        'd': lambda n: pd.DateOffset(days=n),
+        'wk': lambda n: pd.DateOffset(weeks=n),
+        'mo': lambda n: pd.DateOffset(months=n),
+        'y': lambda n: pd.DateOffset(years=n),
+    }
+    for suffix, make in units.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return make(int(period[:-len(suffix)]))
+    return None
+
+# Параметры стратегии (значения по умолчанию — как в Pine Script)
+DEFAULT_PARAMS = {
+    'ema_fast': 21,
+    'ema_slow': 50,
+    'ema_filter': 200,
+    'adx_threshold': 20,
+    'bb_period': 20,
+    'bb_std': 2.0,
+    'volume_spike': 1.2,
+    'stop_atr_mult': 2.0,          # бэктест
+    'tp_atr_mult': 2.0,            # бэктест
+    'signal_stop_atr_mult': 2.0,   # текущий сигнал
+    'signal_tp_atr_mult': 3.0,     # текущий сигнал
+}
+
+OHLCV = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+# ============================================================================
+# MARKET DATA CLIENT
+# ============================================================================
+
+YAHOO_CHART_URL = 'https://query2.finance.yahoo.com'
+
+
+class MarketDataError(Exception):
+    """Бары не получены: сеть, ошибка HTTP или ответ без данных"""
+
+
+class CircuitOpenError(MarketDataError):
+    """Провайдер помечен нездоровым — запрос не отправлялся"""
+
+
+class CircuitBreaker:
+    """
+    closed -> threshold неудачных вызовов подряд -> open: вызовы сразу отклоняются
+    open -> через reset_timeout -> half-open: пропускается один пробный вызов;
+    успех закрывает цепь, ошибка снова открывает
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def retry_in(self):
+        """Секунд до пробного вызова (0 — цепь закрыта или уже можно пробовать)"""
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(self.opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                print("✅ Market data provider recovered, circuit closed")
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+        METRICS.set_gauge('market_data_circuit_open', 0)
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            tripped = self._probing or self.failures >= self.threshold
+            self._probing = False
+            if tripped:
+                if self.opened_at is None:
+                    print(f"⛔ Market data provider failing ({self.failures} calls), "
+                          f"circuit open for {self.reset_timeout:g}s")
+                self.opened_at = time.monotonic()
+        if tripped:
+            METRICS.set_gauge('market_data_circuit_open', 1)
+
+    def release(self):
+        """Вызов не дошел до провайдера (например, свой лимит) — пробный слот освобождается"""
+        with self._lock:
+            self._probing = False
+
+
+class MarketDataClient:
+    """
+    HTTP-клиент chart API Yahoo Finance (замена yf.Ticker().history())
+    Одна keep-alive сессия с пулом соединений, не больше max_per_host запросов к хосту
+    одновременно, повторы с джиттером в пределах дедлайна вызова и circuit breaker
+    base_url можно направить на локальный сервер (fakes.FakeYahooServer)
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    COLUMNS = {'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close', 'Volume': 'volume'}
+
+    def __init__(self, base_url=YAHOO_CHART_URL, timeout=5.0, deadline=12.0, retries=3, backoff=0.5,
+                 max_per_host=4, breaker=None, session=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout  # одна HTTP-попытка
+        self.deadline = deadline  # весь вызов вместе с повторами
+        self.retries = retries
+        self.backoff = backoff
+        self.max_per_host = max_per_host
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = session or requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max_per_host)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'Mozilla/5.0 (compatible; multi-asset-bot/1.0)'
+
+        self._slots = {}
+        self._slots_lock = threading.Lock()
+
+    def _slot(self, host):
+        with self._slots_lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._slots[host]
+
+    def history(self, symbol, period='3mo', interval='15m', start=None):
+        """Бары символа как у Ticker.history(): последние period или начиная со start"""
+        params = {'interval': interval, 'includePrePost': 'false'}
+        if start is not None:
+            params['period1'] = int(pd.Timestamp(start).timestamp())
+            params['period2'] = int(time.time()) + 60
+        else:
+            params['range'] = period
+        payload = self._get(f"/v8/finance/chart/{quote(symbol, safe='')}", params)
+        return self._parse_chart(payload, symbol)
+
+    def quote(self, symbol):
+        """Последняя цена из meta chart API (один дневной бар — минимальный ответ)"""
+        payload = self._get(f"/v8/finance/chart/{quote(symbol, safe='')}", {'range': '1d', 'interval': '1d'})
+        result = ((payload.get('chart') or {}).get('result') or [None])[0]
+        meta = (result or {}).get('meta') or {}
+        if meta.get('regularMarketPrice') is None:
+            raise MarketDataError(f"{symbol}: no quote")
+        return Quote(symbol, float(meta['regularMarketPrice']), float(meta.get('regularMarketTime') or time.time()))
+
+    def quotes(self, symbols):
+        """Котировки нескольких символов (для PollingQuoteFeed); сбойные пропускаются"""
+        with ThreadPoolExecutor(max_workers=self.max_per_host, thread_name_prefix="quotes") as pool:
+            futures = {s: pool.submit(self.quote, s) for s in symbols}
+        result = []
+        for symbol, future in futures.items():
+            try:
+                result.append(future.result())
+            except MarketDataError as e:
+                print(f"⚠️ {symbol}: {e}")
+        return result
+
+    def history_many(self, symbols, period='3mo', interval='15m', start=None):
+        """Несколько символов параллельно (в пределах лимита на хост): {символ: DataFrame}"""
+        frames = {}
+        with ThreadPoolExecutor(max_workers=self.max_per_host, thread_name_prefix="market-data") as pool:
+            futures = {s: pool.submit(self.history, s, period, interval, start) for s in symbols}
+            for symbol, future in futures.items():
+                try:
+                    frames[symbol] = future.result()
+                except MarketDataError as e:
+                    print(f"⚠️ {symbol}: {e}")
+        return frames
+
+    def _get(self, path, params):
+        if not self.breaker.allow():
+            METRICS.inc('market_data_requests_total', result='rejected')
+            raise CircuitOpenError(f"market data unavailable, retry in {self.breaker.retry_in():.0f}s")
+
+        url = self.base_url + path
+        slot = self._slot(urlsplit(url).netloc)
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if not slot.acquire(timeout=max(remaining, 0)):
+                # Очередь к хосту — наша перегрузка, а не сбой провайдера
+                self.breaker.release()
+                METRICS.inc('market_data_requests_total', result='saturated')
+                raise MarketDataError(f"no free connection to {urlsplit(url).netloc} within the deadline")
+            # Ожидание слота съело часть дедлайна — таймаут запроса от оставшегося
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                slot.release()
+                self.breaker.release()
+                METRICS.inc('market_data_requests_total', result='saturated')
+                raise MarketDataError(f"deadline passed waiting for a connection to {urlsplit(url).netloc}")
+
+            retry_after = 0.0
+            try:
+                with METRICS.span('market_data'):
+                    response = self.session.get(url, params=params, timeout=max(min(self.timeout, remaining), 0.1))
+                error = None
+            except requests.RequestException as e:
+                response, error = None, str(e)[:100]
+            finally:
+                slot.release()
+
+            if response is not None:
+                if response.status_code == 200:
+                    self.breaker.success()
+                    METRICS.inc('market_data_requests_total', result='ok')
+                    return response.json()
+                if response.status_code not in self.RETRY_STATUSES:
+                    # Провайдер отвечает, ошибка в запросе (например, неизвестный символ)
+                    self.breaker.success()
+                    METRICS.inc('market_data_requests_total', result='rejected_by_server')
+                    raise MarketDataError(f"HTTP {response.status_code} for {path}")
+                error = f"HTTP {response.status_code}"
+                retry_after = float(response.headers.get('Retry-After', 0) or 0)
+
+            # Full jitter: пауза случайна в [0, backoff * 2^attempt], не меньше Retry-After
+            attempt += 1
+            delay = max(random.uniform(0, self.backoff * 2 ** attempt), retry_after)
+            if attempt > self.retries or time.monotonic() + delay >= deadline:
+                self.breaker.failure()
+                METRICS.inc('market_data_requests_total', result='failed')
+                raise MarketDataError(f"{error} after {attempt} attempt(s)")
+            METRICS.inc('market_data_retries_total')
+            time.sleep(delay)
+
+    @classmethod
+    def _parse_chart(cls, payload, symbol):
+        chart = payload.get('chart') or {}
+        if chart.get('error'):
+            raise MarketDataError(f"{symbol}: {chart['error'].get('description', chart['error'])}")
+        result = (chart.get('result') or [None])[0]
+        if not result or not result.get('timestamp'):
+            return pd.DataFrame(columns=list(cls.COLUMNS))
+
+        quotes = result['indicators']['quote'][0]
+        tz = (result.get('meta') or {}).get('exchangeTimezoneName') or 'UTC'
+        index = pd.to_datetime(result['timestamp'], unit='s', utc=True).tz_convert(tz)
+        index.name = 'Datetime'
+        data = pd.DataFrame(
+            {col: np.array(quotes.get(key) or [np.nan] * len(index), dtype=np.float64)
+             for col, key in cls.COLUMNS.items()},
+            index=index
+        )
+        # Незакрытый бар Yahoo иногда присылает дважды; строки без сделок — пустые
+        data = data[~data.index.duplicated(keep='last')]
+        return data.dropna(subset=['Close'])
+
+
 class MultiAssetStrategy:
     """
     Multi-Asset Adaptive Strategy
     Портировано из Pine Script
     """
     
-    def __init__(self, symbol, asset_type='Gold'):
+    def __init__(self, symbol, asset_type='Gold', store=None, indicators=None, params=None, client=None):
         self.symbol = symbol
         self.asset_type = asset_type
         self.volatility_adj = self._get_volatility_adj()
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.store = store
+        self.indicators = indicators
+        self.client = client  # MarketDataClient; None — напрямую через yfinance
+        self.interval = None
         self.data = None
+        self._graph = None
+        self._live = None  # формирующийся бар по живым котировкам
         
     def _get_volatility_adj(self):
         """Адаптивная волатильность по типу актива"""
@@ -27,181 +329,170 @@ class MultiAssetStrategy:
         }
         return vol_map.get(self.asset_type, 1.0)
     
+    @timed('fetch_data')
     def fetch_data(self, period='3mo', interval='15m'):
         """Получение данных с Yahoo Finance"""
         try:
-            ticker = yf.Ticker(self.symbol)
-            data = ticker.history(period=period, interval=interval)
+            if self.store is not None:
+                data = self._fetch_incremental(period, interval)
+            else:
+                data = self._history(period=period, interval=interval)
             
-            if data.empty:
+            if data is None or data.empty:
                 print(f"⚠️ No data for {self.symbol}")
                 return False
             
             self.data = data
+            self.interval = interval
             return True
             
+        except CircuitOpenError as e:
+            print(f"⛔ Skipping {self.symbol}: {e}")
+            return False
         except Exception as e:
             print(f"❌ Error fetching {self.symbol}: {e}")
             return False
     
-    def calculate_atr(self, period=14):
-        """Average True Range"""
-        high = self.data['High']
-        low = self.data['Low']
-        close = self.data['Close']
-        
-        tr1 = high - low
-        tr2 = abs(high - close.shift())
-        tr3 = abs(low - close.shift())
-        
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        atr = tr.rolling(period).mean() * self.volatility_adj
-        
-        return atr
+    def _history(self, **kwargs):
+        """Бары с Yahoo: через общий MarketDataClient или yfinance"""
+        if self.client is not None:
+            return self.client.history(self.symbol, **kwargs)
+        return yf.Ticker(self.symbol).history(**kwargs)
     
-    def calculate_adx(self, period=14):
-        """ADX (Average Directional Index)"""
-        high = self.data['High']
-        low = self.data['Low']
-        close = self.data['Close']
-        
-        plus_dm = high.diff()
-        minus_dm = -low.diff()
-        
-        plus_dm[plus_dm < 0] = 0
-        minus_dm[minus_dm < 0] = 0
-        
-        tr1 = high - low
-        tr2 = abs(high - close.shift())
-        tr3 = abs(low - close.shift())
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        
-        atr = tr.rolling(period).mean()
-        
-        plus_di = 100 * (plus_dm.rolling(period).mean() / atr)
-        minus_di = 100 * (minus_dm.rolling(period).mean() / atr)
-        
-        dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di)
-        adx = dx.rolling(period).mean()
-        
-        return adx
+    def _fetch_incremental(self, period, interval):
+        """Догрузка только новых баров в локальное хранилище"""
+        last = self.store.last_timestamp(self.symbol, interval)
+        offset = _period_offset(period)
+        
+        fresh = None
+        if last is not None:
+            # Последний сохраненный бар мог быть незакрытым — запрашиваем с него
+            try:
+                fresh = self._history(start=last, interval=interval)
+            except MarketDataError as e:
+                # Провайдер недоступен — отдаем то, что уже лежит в хранилище
+                print(f"⚠️ {self.symbol}: no new bars ({e}), serving stored history")
+        
+        stale = last is None or (offset is not None and last < pd.Timestamp.now(tz='UTC') - offset)
+        if (fresh is None or fresh.empty) and stale:
+            fresh = self._history(period=period, interval=interval)
+        
+        self.store.merge(self.symbol, interval, fresh)
+        return self._load_window(period, interval)
     
-    def calculate_rsi(self, period=14):
-        """RSI (Relative Strength Index)"""
-        delta = self.data['Close'].diff()
-        gain = delta.where(delta > 0, 0).rolling(period).mean()
-        loss = -delta.where(delta < 0, 0).rolling(period).mean()
-        
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        
-        return rsi
+    def _load_window(self, period, interval):
+        """Последние period баров из хранилища"""
+        last = self.store.last_timestamp(self.symbol, interval)
+        if last is None:
+            return None
+        offset = _period_offset(period)
+        since = last - offset if offset is not None else None
+        return self.store.load(self.symbol, interval, since=since)
     
-    def calculate_indicators(self):
-        df = self.data.copy()
-        
-        # ATR
-        df['ATR'] = self.calculate_atr(14)
-        
-        # EMAs
-        df['EMA_Fast'] = df['Close'].ewm(span=21, adjust=False).mean()
-        df['EMA_Slow'] = df['Close'].ewm(span=50, adjust=False).mean()
-        df['EMA_Filter'] = df['Close'].ewm(span=200, adjust=False).mean()
-        
-        # ADX
-        df['ADX'] = self.calculate_adx(14)
+    def ingest_data(self, fresh, period='3mo', interval='15m'):
+        """Принять уже скачанные бары (например, из пакетной загрузки)"""
+        if self.store is not None:
+            self.store.merge(self.symbol, interval, fresh)
+            data = self._load_window(period, interval)
+        else:
+            data = fresh
         
-        # RSI
-        df['RSI'] = self.calculate_rsi(14)
+        if data is None or data.empty:
+            return False
         
-        # Bollinger Bands
-        bb_period = 20
-        bb_std = 2.0
-        df['BB_Middle'] = df['Close'].rolling(bb_period).mean()
-        df['BB_Std'] = df['Close'].rolling(bb_period).std()
-        df['BB_Upper'] = df['BB_Middle'] + (bb_std * df['BB_Std'])
-        df['BB_Lower'] = df['BB_Middle'] - (bb_std * df['BB_Std'])
+        self.data = data
+        self.interval = interval
+        return True
+    
+    def resample(self, timeframe, resampler=None):
+        """Перевести загруженные бары в старший таймфрейм локально, без запроса к Yahoo"""
+        if timeframe == self.interval:
+            return True
         
-        # Volume
-        df['Volume_SMA'] = df['Volume'].rolling(20).mean()
-        df['Volume_Spike'] = df['Volume'] > (df['Volume_SMA'] * 1.2)
+        if resampler is not None:
+            data = resampler.resample((self.symbol, self.interval, timeframe), self.data, timeframe)
+        else:
+            data = resample_ohlcv(self.data, timeframe)
         
-        # Breakout levels
-        df['Highest_High'] = df['High'].rolling(20).max()
-        df['Lowest_Low'] = df['Low'].rolling(20).min()
+        if data is None or data.empty:
+            return False
         
+        self.data = data
+        self.interval = timeframe
+        return True
+    
+    def calculate_indicators(self):
+        if self.indicators is not None:
+            # Потоковый движок: пересчитываются только новые бары
+            df = self.indicators.apply(
+                self._indicator_key(), self.data, self.volatility_adj,
+                batch=self._calculate_indicators_batch, params=self.params
+            )
+            self.data = df
+            return df
+        
+        df = self._calculate_indicators_batch(self.data)
         self.data = df
         return df
     
+    def _indicator_key(self):
+        return (self.symbol, self.interval, tuple(sorted(self.params.items())))
+    
+    def _calculate_indicators_batch(self, data):
+        """Полный расчет индикаторов на pandas (формулы — в signal_graph)"""
+        self.data = data
+        return SignalGraph(data, self.volatility_adj, self.params, reuse=False).frame(INDICATOR_COLUMNS)
+    
+    def signal_graph(self):
+        """Ленивый граф колонок над текущими data; после замены data строится заново"""
+        if self._graph is None or self._graph.data is not self.data:
+            self._graph = SignalGraph(self.data, self.volatility_adj, self.params)
+        return self._graph
+    
+    @timed('generate_signals')
     def generate_signals(self):
-        df = self.calculate_indicators()
-        
-        # Market Regime
-        df['Is_Trending'] = df['ADX'] > 20
-        df['Is_Ranging'] = df['ADX'] <= 20
-        
-        # Trend Direction
-        df['Bullish_Trend'] = (df['EMA_Fast'] > df['EMA_Slow']) & (df['Close'] > df['EMA_Filter'])
-        df['Bearish_Trend'] = (df['EMA_Fast'] < df['EMA_Slow']) & (df['Close'] < df['EMA_Filter'])
-        
-        # EMA Crossovers
-        df['EMA_Cross_Up'] = (df['EMA_Fast'] > df['EMA_Slow']) & (df['EMA_Fast'].shift(1) <= df['EMA_Slow'].shift(1))
-        df['EMA_Cross_Down'] = (df['EMA_Fast'] < df['EMA_Slow']) & (df['EMA_Fast'].shift(1) >= df['EMA_Slow'].shift(1))
-        
-        # === STRATEGY SIGNALS ===
-        
-        # 1. Trend Following
-        df['Trend_Long'] = (
-            df['Is_Trending'] & 
-            df['Bullish_Trend'] & 
-            df['EMA_Cross_Up'] & 
-            df['Volume_Spike']
-        )
-        
-        df['Trend_Short'] = (
-            df['Is_Trending'] & 
-            df['Bearish_Trend'] & 
-            df['EMA_Cross_Down'] & 
-            df['Volume_Spike']
-        )
-        
-        # 2. Breakout
-        df['Breakout_Long'] = (
-            (df['Close'] > df['Highest_High'].shift(1)) & 
-            df['Volume_Spike'] & 
-            (df['Close'] > df['EMA_Filter'])
-        )
-        
-        df['Breakout_Short'] = (
-            (df['Close'] < df['Lowest_Low'].shift(1)) & 
-            df['Volume_Spike'] & 
-            (df['Close'] < df['EMA_Filter'])
-        )
-        
-        # 3. Mean Reversion
-        df['Mean_Rev_Long'] = (
-            df['Is_Ranging'] & 
-            (df['Close'] < df['BB_Lower']) & 
-            (df['RSI'] < 30)
-        )
-        
-        df['Mean_Rev_Short'] = (
-            df['Is_Ranging'] & 
-            (df['Close'] > df['BB_Upper']) & 
-            (df['RSI'] > 70)
-        )
-        
-        # Combined Signals
-        df['Long_Signal'] = df['Trend_Long'] | df['Breakout_Long'] | df['Mean_Rev_Long']
-        df['Short_Signal'] = df['Trend_Short'] | df['Breakout_Short'] | df['Mean_Rev_Short']
-        
+        """Все индикаторы и сигналы подстратегий на всей истории"""
+        self.calculate_indicators()
+        df = self.signal_graph().frame(SIGNAL_COLUMNS)
         self.data = df
         return df
     
-    def backtest(self, lookback=100):
-        """Бэктест стратегии (последние N сделок)"""
-        df = self.generate_signals()
+    @timed('backtest')
+    def backtest(self, lookback=100, engine='vectorized'):
+        """Бэктест стратегии (последние N сделок)
+
+        engine: 'vectorized' — NumPy-движок, 'legacy' — исходный цикл по барам
+        Если data — CompactFrame, сигналы уже посчитаны и берутся из него
+        """
+        offset = 0
+        if isinstance(self.data, CompactFrame):
+            df = self.data
+            if engine == 'legacy' or len(df) < lookback:
+                df = df.to_frame()
+        elif engine == 'vectorized' and len(self.data) >= lookback:
+            # Входы ищутся только в последних lookback барах — сигналы нужны только там
+            if self.indicators is not None:
+                self.calculate_indicators()
+            offset = len(self.data) - lookback
+            df = self.signal_graph().frame(['ATR', 'Long_Signal', 'Short_Signal'], tail=lookback)
+        else:
+            df = self.generate_signals()
+        
+        if engine == 'legacy' or len(df) < lookback:
+            # При короткой истории старт уходит в отрицательные индексы —
+            # эту ветку обслуживает только исходный цикл
+            trades = self._backtest_legacy(df, lookback)
+        elif engine == 'vectorized':
+            trades = self._backtest_vectorized(df, lookback)
+            for trade in trades:
+                trade['exit_idx'] += offset
+        else:
+            raise ValueError(f"Unknown backtest engine: {engine}")
         
+        return self._summarize_trades(trades)
+    
+    def _backtest_legacy(self, df, lookback):
+        """Исходный цикл по барам через iloc"""
         trades = []
         i = len(df) - lookback
         
@@ -224,7 +515,89 @@ class MultiAssetStrategy:
             else:
                 i += 1
         
-        # Статистика
+        return trades
+    
+    def _backtest_vectorized(self, df, lookback, max_hold=100):
+        """Бэктест на массивах NumPy: выходы по SL/TP/таймауту ищутся пачкой"""
+        close = np.asarray(df['Close'], dtype=np.float64)
+        high = np.asarray(df['High'], dtype=np.float64)
+        low = np.asarray(df['Low'], dtype=np.float64)
+        atr = np.asarray(df['ATR'], dtype=np.float64)
+        long_sig = np.asarray(df['Long_Signal'], dtype=bool)
+        short_sig = np.asarray(df['Short_Signal'], dtype=bool)
+        
+        n = len(close)
+        start = n - lookback
+        
+        # Кандидаты на вход: бары с сигналом в окне [start, n - 1)
+        candidates = np.flatnonzero(long_sig[start:n - 1] | short_sig[start:n - 1]) + start
+        if len(candidates) == 0:
+            return []
+        
+        is_long = long_sig[candidates]
+        entry = close[candidates]
+        entry_atr = atr[candidates]
+        valid = ~(np.isnan(entry_atr) | (entry_atr == 0))
+        
+        stop_atr_mult = self.params['stop_atr_mult']
+        tp_atr_mult = self.params['tp_atr_mult']
+        sl = np.where(is_long, entry - entry_atr * stop_atr_mult, entry + entry_atr * stop_atr_mult)
+        tp = np.where(is_long, entry + entry_atr * tp_atr_mult, entry - entry_atr * tp_atr_mult)
+        
+        # Окна (кандидат x следующие max_hold - 1 баров); хвост добит NaN,
+        # сравнение с NaN ложно — как и у iloc-цикла за пределами данных
+        pad = np.full(max_hold - 1, np.nan)
+        high_win = np.lib.stride_tricks.sliding_window_view(
+            np.concatenate([high[1:], pad]), max_hold - 1)[candidates]
+        low_win = np.lib.stride_tricks.sliding_window_view(
+            np.concatenate([low[1:], pad]), max_hold - 1)[candidates]
+        
+        with np.errstate(invalid='ignore'):
+            sl_hit = np.where(is_long[:, None], low_win <= sl[:, None], high_win >= sl[:, None])
+            tp_hit = np.where(is_long[:, None], high_win >= tp[:, None], low_win <= tp[:, None])
+        touched = sl_hit | tp_hit
+        first = touched.argmax(axis=1)
+        any_touch = touched.any(axis=1)
+        first_is_sl = sl_hit[np.arange(len(candidates)), first]
+        
+        # Последовательная цепочка сделок: следующий вход только после выхода
+        trades = []
+        i = start
+        for k, entry_idx in enumerate(candidates):
+            if entry_idx < i or not valid[k]:
+                continue
+            
+            direction = 'LONG' if is_long[k] else 'SHORT'
+            entry_price = entry[k]
+            
+            if any_touch[k]:
+                exit_idx = int(entry_idx + 1 + first[k])
+                if first_is_sl[k]:
+                    exit_price, exit_type = sl[k], 'SL'
+                else:
+                    exit_price, exit_type = tp[k], 'TP'
+                if direction == 'LONG':
+                    profit = ((exit_price - entry_price) / entry_price) * 100
+                else:
+                    profit = ((entry_price - exit_price) / entry_price) * 100
+            else:
+                exit_idx = int(min(entry_idx + max_hold, n) - 1)
+                exit_price, exit_type, profit = close[exit_idx], 'TIMEOUT', 0
+            
+            trades.append({
+                'entry': entry_price,
+                'exit': exit_price,
+                'profit': profit,
+                'exit_type': exit_type,
+                'exit_idx': exit_idx,
+                'direction': direction
+            })
+            i = exit_idx + 1
+        
+        return trades
+    
+    def _summarize_trades(self, trades):
+        """Статистика по списку сделок"""
         wins = sum(1 for t in trades if t['profit'] > 0)
         losses = sum(1 for t in trades if t['profit'] <= 0)
         total = len(trades)
@@ -254,8 +627,8 @@ class MultiAssetStrategy:
             return None
         
         # Stop Loss & Take Profit 
-        stop_atr_mult = 2.0
-        tp_atr_mult = 2.0
+        stop_atr_mult = self.params['stop_atr_mult']
+        tp_atr_mult = self.params['tp_atr_mult']
         
         if direction == 'LONG':
             sl = entry_price - (atr * stop_atr_mult)
@@ -316,12 +689,103 @@ class MultiAssetStrategy:
             'direction': direction
         }
     
-    def get_current_signal(self):
-        """Получить текущий сигнал"""
+    def to_compact(self):
+        """Бары + индикаторы + сигналы в компактном виде (float32 / биты, цены ответа — float64)"""
+        if self.data is None or 'Long_Signal' not in self.data:
+            self.generate_signals()
+        return CompactFrame.from_frame(self.data)
+    
+    def bar(self, i):
+        """(время нс UTC, open, high, low, close, volume) бара i"""
+        if isinstance(self.data, CompactFrame):
+            return (int(self.data.ts[i]), *(float(self.data[c][i]) for c in OHLCV))
+        row = self.data.iloc[i]
+        return (int(self.data.index[i].value), *(float(row[c]) for c in OHLCV))
+    
+    def apply_quote(self, quote):
+        """
+        Живая котировка -> формирующийся (последний) бар; история не перекачивается
+        Котировка внутри бара двигает Close/High/Low, котировка следующего бара закрывает текущий
+        и открывает новый (объем нового бара до следующей загрузки — 0)
+        False — котировка старше бара или история отстала больше чем на бар (нужна загрузка)
+        """
+        if self.data is None or len(self.data) < 2 or self.interval is None:
+            return False
+        if self._live is None or self._live['data'] is not self.data:
+            self._live = {'data': self.data, 'closed': [], 'bar': self.bar(-1), 'quote': None, 'own': None}
+        
+        live = self._live
+        step = interval_seconds(self.interval) * 10**9
+        ts = int(quote.ts * 10**9)
+        bar_ts, open_, high, low, _, volume = live['bar']
+        price = quote.price
+        if ts < bar_ts:
+            return False
+        if ts < bar_ts + step:
+            live['bar'] = (bar_ts, open_, max(high, price), min(low, price), price, volume)
+        elif ts < bar_ts + 2 * step and not live['closed']:
+            live['closed'].append(live['bar'])
+            live['bar'] = (bar_ts + step, price, price, price, price, 0.0)
+        else:
+            return False
+        live['quote'] = quote
+        return True
+    
+    def _live_row(self, longs, shorts):
+        """
+        Строка формирующегося бара: индикаторы — на копии состояния закрытых баров,
+        сигналы — графом по последнему закрытому и новым барам (O(1) от длины истории)
+        """
+        live = self._live
+        key = self._indicator_key()
+        last_closed = self.bar(-2)
+        new_bars = live['closed'] + [live['bar']]
+        bars = [bar[1:] for bar in new_bars]
+        
+        rows = self.indicators.forming(key, last_closed[0], bars) if self.indicators is not None else None
+        if rows is None:
+            # Общего состояния нет или оно ушло на другие данные — свое, из уже посчитанных колонок
+            if live['own'] is None:
+                live['own'] = self._seed_indicators(key)
+            rows = live['own'].forming(key, last_closed[0], bars)
+        if rows is None:
+            return None
+        
+        index = pd.to_datetime([last_closed[0]] + [bar[0] for bar in new_bars], unit='ns', utc=True)
+        tz = self.data.tz if isinstance(self.data, CompactFrame) else self.data.index.tz
+        index = index.tz_convert(tz) if tz is not None else index.tz_localize(None)
+        frame = pd.DataFrame(rows, index=index)
+        frame['Close'] = [last_closed[4]] + [bar[4] for bar in new_bars]
+        graph = SignalGraph(frame, self.volatility_adj, self.params)
+        return graph.frame(['ATR', 'RSI', 'ADX'] + longs + shorts).iloc[-1]
+    
+    def _seed_indicators(self, key):
+        """Свое потоковое состояние из посчитанных колонок: прогон только окон прогрева"""
+        frame = self.data.to_frame() if isinstance(self.data, CompactFrame) else self.data
+        if any(col not in frame.columns for col in INDICATOR_COLUMNS):
+            frame = SignalGraph(frame, self.volatility_adj, self.params).frame(INDICATOR_COLUMNS)
+        own = IncrementalIndicators()
+        own.apply(key, frame, self.volatility_adj, batch=lambda data: frame, params=self.params)
+        return own
+    
+    def get_current_signal(self, families=None):
+        """Получить текущий сигнал (families — только выбранные подстратегии, например ['breakout'])"""
         if self.data is None or self.data.empty:
             return None
         
-        last = self.data.iloc[-1]
+        longs, shorts = family_columns(families)
+        # Была живая котировка — сигнал по формирующемуся бару
+        quote = self._live['quote'] if self._live is not None and self._live['data'] is self.data else None
+        last = self._live_row(longs, shorts) if quote else None
+        if last is None:
+            quote = None
+            if isinstance(self.data, CompactFrame):
+                last = self.data.row(-1)
+            elif all(c in self.data.columns for c in longs + shorts):
+                last = self.data.iloc[-1]
+            else:
+                # Нужен один бар: граф досчитывает только его
+                last = self.signal_graph().frame(['ATR', 'RSI', 'ADX'] + longs + shorts, tail=1).iloc[-1]
         
         signal = {
             'timestamp': last.name,
@@ -331,14 +795,16 @@ class MultiAssetStrategy:
             'adx': round(last['ADX'], 1) if not pd.isna(last['ADX']) else 0,
             'type': 'WAIT'
         }
+        if quote:
+            signal['quote_ts'] = quote.ts
         
-        if last['Long_Signal']:
+        if any(last[c] for c in longs):
             signal['type'] = 'LONG'
-            signal['stop_loss'] = round(signal['price'] - (signal['atr'] * 2.0), 2)
-            signal['take_profit'] = round(signal['price'] + (signal['atr'] * 3.0), 2)
-        elif last['Short_Signal']:
+            signal['stop_loss'] = round(signal['price'] - (signal['atr'] * self.params['signal_stop_atr_mult']), 2)
+            signal['take_profit'] = round(signal['price'] + (signal['atr'] * self.params['signal_tp_atr_mult']), 2)
+        elif any(last[c] for c in shorts):
             signal['type'] = 'SHORT'
-            signal['stop_loss'] = round(signal['price'] + (signal['atr'] * 2.0), 2)
-            signal['take_profit'] = round(signal['price'] - (signal['atr'] * 3.0), 2)
+            signal['stop_loss'] = round(signal['price'] + (signal['atr'] * self.params['signal_stop_atr_mult']), 2)
+            signal['take_profit'] = round(signal['price'] - (signal['atr'] * self.params['signal_tp_atr_mult']), 2)
         
         return signal
\ No newline at end of file
@@ -0,0 +1,14 @@
+import os
+import sys
+
+# Модули бота лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def reference(df, asset_type, lookback, engine='vectorized'):
+    """Бэктест одного символа через MultiAssetStrategy — эталон для портфеля и walk-forward"""
+    from strategy import MultiAssetStrategy
+
+    strategy = MultiAssetStrategy('SYM', asset_type)
+    strategy.data, strategy.interval = df.copy(), '15m'
+    return strategy.backtest(lookback=lookback, engine=engine)
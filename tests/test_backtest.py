@@ -0,0 +1,41 @@
+import pytest
+
+from fakes import synthetic_ohlcv
+from strategy import MultiAssetStrategy
+
+
+def run(df, asset_type, lookback, engine):
+    strategy = MultiAssetStrategy('SYM', asset_type)
+    strategy.data, strategy.interval = df.copy(), '15m'
+    return strategy.backtest(lookback=lookback, engine=engine)
+
+
+@pytest.mark.parametrize('asset_type', ['Bitcoin', 'Gold'])
+@pytest.mark.parametrize('lookback', [100, 1000, 2999])
+@pytest.mark.parametrize('seed', range(4))
+def test_vectorized_matches_legacy(seed, lookback, asset_type):
+    df = synthetic_ohlcv(3000, seed=seed, start_price=2000.0, volatility=0.006)
+    legacy = run(df, asset_type, lookback, 'legacy')
+    vectorized = run(df, asset_type, lookback, 'vectorized')
+
+    # Сделки те же, до последнего знака: вход, выход, цены и прибыль
+    assert vectorized.pop('trades') == legacy.pop('trades')
+    assert vectorized['total_trades'] == legacy['total_trades']
+    assert vectorized['winrate'] == legacy['winrate']
+    assert vectorized['profit_factor'] == legacy['profit_factor']
+    # avg_loss = NaN, если все убыточные сделки закрылись в ноль
+    assert vectorized == pytest.approx(legacy, rel=0, abs=0, nan_ok=True)
+
+
+def test_short_history_falls_back_to_legacy():
+    # lookback длиннее истории: старт в отрицательных индексах обслуживает только исходный цикл
+    df = synthetic_ohlcv(300, seed=7, volatility=0.006)
+    vectorized, legacy = run(df, 'Bitcoin', 500, 'vectorized'), run(df, 'Bitcoin', 500, 'legacy')
+    assert vectorized['total_trades'] > 0
+    assert vectorized['trades'] == legacy['trades']
+
+
+def test_unknown_engine():
+    df = synthetic_ohlcv(300, seed=7)
+    with pytest.raises(ValueError):
+        run(df, 'Bitcoin', 100, 'numba')
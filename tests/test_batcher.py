@@ -0,0 +1,111 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import batcher
+from batcher import BudgetExhausted, ClaudeBatcher, MissingSection, TokenBudget
+from fakes import FakeAnthropic
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(batcher, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+def test_split_by_markers():
+    text = (
+        "preamble outside the analyses\n"
+        "=== 2. ETH ===\nsecond\n\n"
+        "=== 1. BTC ===  \nfirst\nline two\n"
+        "=== 1. BTC ===\nduplicate\n"
+        "=== 3. GOLD ===\n\n"
+        "=== 9. SPY ===\nout of range\n"
+        "not a marker === 3. GOLD ===\n"
+    )
+    assert ClaudeBatcher.split(text, 3) == {1: 'first\nline two', 2: 'second'}
+
+
+def test_split_without_markers():
+    assert ClaudeBatcher.split("## 📊 BTC Analysis", 2) == {}
+
+
+def test_budget_reserve_and_settle(clock):
+    budget = TokenBudget(max_tokens=1000, period=3600)
+    first = budget.reserve(600)
+    assert first is not None and budget.remaining() == 400
+    assert budget.reserve(500) is None
+
+    # Фактический расход меньше оценки: остаток возвращается в окно
+    budget.settle(first, 200)
+    assert budget.remaining() == 800
+    assert budget.reserve(500) is not None
+    assert budget.remaining() == 300
+
+    # Окно сдвинулось: старые резервы больше не считаются
+    clock.now += 3600
+    assert budget.remaining() == 1000
+
+
+def test_exhausted_budget_raises_before_request(executor):
+    claude = FakeAnthropic()
+    budget = TokenBudget(max_tokens=200)
+    queue = ClaudeBatcher(claude, 'model', executor, max_tokens=150, budget=budget)
+    with pytest.raises(BudgetExhausted):
+        queue.submit('BTC', 'RSI 55, ADX 30')
+    assert claude.calls == 0
+    assert budget.remaining() == 200
+
+
+def test_requests_in_flight_share_one_prompt(executor):
+    claude = FakeAnthropic(latency=0.3)
+    queue = ClaudeBatcher(claude, 'model', executor, window=5, max_batch=5)
+
+    first = queue.submit('BTC', 'BTC data')
+    # Claude занят первым запросом: остальные копятся и уходят одним пакетом после него
+    rest = {symbol: queue.submit(symbol, f"{symbol} data") for symbol in ('ETH', 'GOLD', 'SPY')}
+
+    assert first.result(5).startswith('Create a concise Reddit trading analysis for BTC')
+    for symbol, future in rest.items():
+        assert future.result(5) == f"## 📊 {symbol} Analysis"
+    assert claude.calls == 2
+
+
+def test_missing_section_fails_only_its_request(executor):
+    class PartialClaude:
+        """Первый (одиночный) запрос идет 0.3 с; в пакетном ответе нет раздела ETH"""
+
+        def __init__(self):
+            self.messages = self
+            self.calls = 0
+
+        def create(self, model, max_tokens, messages):
+            self.calls += 1
+            if self.calls == 1:
+                time.sleep(0.3)
+            return SimpleNamespace(content=[SimpleNamespace(text="=== 1. BTC ===\nonly btc")], usage=None)
+
+    queue = ClaudeBatcher(PartialClaude(), 'model', executor, window=5)
+    queue.submit('SPY', 'c')
+    futures = [queue.submit('BTC', 'a'), queue.submit('ETH', 'b')]
+
+    assert futures[0].result(5) == 'only btc'
+    with pytest.raises(MissingSection):
+        futures[1].result(5)
@@ -0,0 +1,159 @@
+import threading
+import time
+
+import pytest
+
+import cache
+import main
+import scanner as scanner_module
+import strategy as strategy_module
+from cache import AnalysisCache, SingleFlight
+from fakes import FakeAnthropic, FakeReddit, FakeYFinance
+from strategy import MultiAssetStrategy
+
+
+class Clock:
+    """Управляемое time.monotonic для проверок TTL"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'monotonic', clock)
+    return clock
+
+
+def test_single_flight_collapses_concurrent_calls():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'result'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('key', work)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do('key', work))) for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    while flight.coalesced < 5:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ['result'] * 6
+    # После завершения ключ свободен: следующий вызов снова выполняет работу
+    assert flight.do('key', lambda: 'again') == 'again'
+
+
+def test_single_flight_shares_error():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('boom')
+
+    def call():
+        try:
+            flight.do('key', fail)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    while flight.coalesced < 1:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+
+def test_analysis_cache_ttl(clock):
+    analysis_cache = AnalysisCache(maxsize=4, ttl=60)
+    analysis_cache.put('a', 1)
+    clock.now += 59
+    assert analysis_cache.get('a') == 1
+    clock.now += 1
+    assert analysis_cache.get('a') is None
+    assert analysis_cache.stats() == {'size': 0, 'hits': 1, 'misses': 1, 'hit_rate': 50.0}
+
+
+def test_analysis_cache_evicts_least_recently_used(clock):
+    analysis_cache = AnalysisCache(maxsize=2, ttl=60)
+    analysis_cache.put('a', 1)
+    analysis_cache.put('b', 2)
+    assert analysis_cache.get('a') == 1  # 'b' теперь самый старый
+    analysis_cache.put('c', 3)
+    assert analysis_cache.get('b', record=False) is None
+    assert analysis_cache.get('a') == 1
+    assert analysis_cache.get('c') == 3
+    assert analysis_cache.stats()['misses'] == 0
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    # Бот без диска, сканера и сети: бары из синтетики, которая закончилась в прошлом
+    for name, value in {'BAR_STORE_DIR': '', 'PROCESSED_COMMENTS_FILE': '', 'WATCHLIST_SCANNER': False,
+                        'METRICS_PORT': 0, 'MARKET_DATA_URL': '', 'COORDINATION_DB': ''}.items():
+        monkeypatch.setattr(main, name, value)
+    source = FakeYFinance(bars=1500)
+    monkeypatch.setattr(strategy_module, 'yf', source)
+    monkeypatch.setattr(scanner_module, 'yf', source)
+    return main.TradingRedditBot(reddit=FakeReddit(), claude=FakeAnthropic())
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    calls = []
+    fetch_data = MultiAssetStrategy.fetch_data
+
+    def counting(self, *args, **kwargs):
+        calls.append(self.symbol)
+        return fetch_data(self, *args, **kwargs)
+
+    monkeypatch.setattr(MultiAssetStrategy, 'fetch_data', counting)
+    return calls
+
+
+def test_cache_hit_skips_fetch(bot, fetches):
+    # Последний бар данных старше текущего бара часов: ключ записи другой, но повтор не грузит данные
+    first = bot.analyze_symbol('BTC')
+    assert fetches == ['BTC-USD']
+    assert bot.analyze_symbol('BTC') == first
+    assert fetches == ['BTC-USD']
+
+
+def test_alias_hit_skips_fetch(bot, fetches):
+    # Другое название того же символа: текст рендерится заново, расчет и данные — из кэша
+    bot.analyze_symbol('GOLD')
+    assert 'XAUUSD' in bot.analyze_symbol('XAUUSD')
+    assert fetches == ['GC=F']
+
+
+def test_next_bar_fetches_again(bot, fetches, monkeypatch):
+    bot.analyze_symbol('BTC')
+    bar = main.current_bar_start(main.BASE_INTERVAL)
+    monkeypatch.setattr(main, 'current_bar_start', lambda interval: bar + 900)
+    bot.analyze_symbol('BTC')
+    assert fetches == ['BTC-USD', 'BTC-USD']
@@ -0,0 +1,54 @@
+import pytest
+
+from commands import CommandScanner
+
+
+@pytest.fixture
+def scanner():
+    return CommandScanner(
+        triggers=['!analyze', '!check'],
+        symbols=['XAU', 'XAUUSD', 'BTC', 'ETH', 'GOLD', 'SPY'],
+        timeframes=['15m', '1h', '4h'],
+        max_symbols=3,
+    )
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('!analyze BTC', (['BTC'], None)),
+    ('please !CHECK gold 4H', (['GOLD'], '4h')),
+    ('!analyze XAUUSD', (['XAUUSD'], None)),  # длинный тикер не распадается на XAU
+    ('!analyze $BTC, eth.', (['BTC', 'ETH'], None)),
+    ('!analyze BTC btc BTC', (['BTC'], None)),
+    ('!analyze BTC 1h 4h', (['BTC'], '1h')),
+    ('!analyze', ([], None)),
+])
+def test_scan(scanner, text, expected):
+    assert scanner.scan(text) == expected
+
+
+@pytest.mark.parametrize('text', [
+    'BTC to the moon',  # без триггера
+    '!analyzer BTC',  # триггер — часть другого слова
+    'x!analyze BTC',
+    '!analyze-it BTC',
+])
+def test_no_trigger(scanner, text):
+    assert scanner.scan(text) is None
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('!analyze BTCUSD SPYDER', []),  # тикер внутри слова
+    ('!analyze BTC-USD', []),  # дефис — часть тикера Yahoo
+    ('!analyze XAU/USD', ['XAU']),
+    ('!analyze 15mins BTC', ['BTC']),
+])
+def test_symbol_boundaries(scanner, text, expected):
+    assert scanner.scan(text)[0] == expected
+
+
+def test_max_symbols(scanner):
+    assert scanner.scan('!analyze BTC ETH GOLD SPY XAU') == (['BTC', 'ETH', 'GOLD'], None)
+
+
+def test_find_symbols_ignores_triggers(scanner):
+    assert scanner.find_symbols('gold and Xau, not xauusdt; !analyze') == ['GOLD', 'XAU']
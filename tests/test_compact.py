@@ -0,0 +1,53 @@
+import math
+
+import pytest
+
+from compact import CompactFrame
+from fakes import synthetic_ohlcv
+from strategy import MultiAssetStrategy
+
+
+def comparable(value):
+    """NaN == NaN для сравнения результатов (avg_loss без убыточных сделок)"""
+    if isinstance(value, dict):
+        return {k: comparable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [comparable(v) for v in value]
+    if isinstance(value, float) and math.isnan(value):
+        return 'nan'
+    return value
+
+
+def on_demand(df, asset_type):
+    strategy = MultiAssetStrategy('SYM', asset_type)
+    strategy.data, strategy.interval = df.copy(), '15m'
+    return strategy.backtest(lookback=100), strategy.get_current_signal()
+
+
+def scanned(df, asset_type):
+    """Как в WatchlistScanner.scan_once: бэктест и сигнал по CompactFrame"""
+    strategy = MultiAssetStrategy('SYM', asset_type)
+    strategy.data, strategy.interval = df.copy(), '15m'
+    strategy.data = strategy.to_compact()
+    assert isinstance(strategy.data, CompactFrame)
+    return strategy.backtest(lookback=100), strategy.get_current_signal()
+
+
+@pytest.mark.parametrize('start_price, asset_type', [
+    (94485.41, 'Bitcoin'), (2263.94, 'Gold'), (3421.07, 'Ethereum'), (28.13, 'Silver'), (1.0873, 'Gold'),
+])
+@pytest.mark.parametrize('seed', range(12))
+def test_scanner_matches_on_demand(seed, start_price, asset_type):
+    df = synthetic_ohlcv(1500, seed=seed, start_price=start_price, volatility=0.006)
+    assert comparable(scanned(df, asset_type)) == comparable(on_demand(df, asset_type))
+
+
+def test_reported_columns_stay_float64():
+    df = synthetic_ohlcv(300, start_price=94485.41)
+    strategy = MultiAssetStrategy('SYM', 'Bitcoin')
+    strategy.data = df
+    frame = strategy.to_compact()
+    for col in CompactFrame.PRECISE:
+        assert frame[col].dtype.name == 'float64'
+    assert (frame['Close'] == df['Close'].to_numpy()).all()
+    assert frame['Volume'].dtype.name == 'float32'
@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+
+import coordination
+from coordination import CoordinationStore, SharedRateLimiter, SQLiteCoordinationStore
+
+
+class Clock:
+    """Управляемое time.time для окна ответов"""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(coordination.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'coordination.db')
+
+
+def test_backend_must_implement_every_method():
+    class Partial(CoordinationStore):
+        def claim_comment(self, comment_id, worker, created_utc=0.0):
+            return True
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_claim_is_deduplicated_across_workers(path):
+    # Каждый воркер — свое соединение (свой экземпляр store в своем процессе)
+    stores = [SQLiteCoordinationStore(path) for _ in range(4)]
+    winners = []
+    barrier = threading.Barrier(len(stores))
+
+    def claim(worker, store):
+        barrier.wait()
+        for i in range(50):
+            if store.claim_comment(f"c{i}", worker):
+                winners.append(f"c{i}")
+
+    threads = [threading.Thread(target=claim, args=(w, s)) for w, s in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(winners) == sorted(f"c{i}" for i in range(50))
+
+
+def test_reply_quota_is_shared_between_connections(path, clock):
+    first, second = SQLiteCoordinationStore(path), SQLiteCoordinationStore(path)
+    start = clock.now
+    assert first.reserve_reply(3, 3600) == 0
+    clock.now += 10
+    assert second.reserve_reply(3, 3600) == 0
+    clock.now += 10
+    assert first.reserve_reply(3, 3600) == 0
+
+    # Квота исчерпана для обоих: ждать, пока первый ответ выйдет из окна
+    clock.now += 10
+    assert second.reserve_reply(3, 3600) == pytest.approx(start + 3600 - clock.now)
+    assert first.reserve_reply(3, 3600) == pytest.approx(start + 3600 - clock.now)
+    assert second.replies_in_window(3600) == 3
+
+    clock.now = start + 3600
+    assert second.reserve_reply(3, 3600) == 0
+    assert first.reply_window(3600) == (3, start + 10, start + 3600)
+
+
+def test_reply_min_interval(path, clock):
+    store = SQLiteCoordinationStore(path)
+    assert store.reserve_reply(10, 3600, min_interval=30) == 0
+    clock.now += 5
+    assert store.reserve_reply(10, 3600, min_interval=30) == pytest.approx(25)
+
+
+def test_shared_limiter_wait_time(path, clock):
+    limiter = SharedRateLimiter(SQLiteCoordinationStore(path), max_events=2, period=3600, min_interval=30)
+    other = SharedRateLimiter(SQLiteCoordinationStore(path), max_events=2, period=3600, min_interval=30)
+    start = clock.now
+    assert limiter.wait_time() == 0
+    assert limiter.acquire(timeout=0)
+
+    # Ответ другого воркера: минимальный интервал отсчитывается от него
+    clock.now += 10
+    assert other.wait_time() == pytest.approx(20)
+    assert not other.acquire(timeout=5)
+    clock.now += 90
+    assert other.acquire(timeout=0)
+
+    # Лимит за час: до выхода самого старого ответа из окна
+    clock.now += 1000
+    assert limiter.wait_time() == pytest.approx(start + 3600 - clock.now)
+    assert not limiter.acquire(timeout=60)
+    assert limiter.in_window() == 2
@@ -0,0 +1,63 @@
+from dedupe import CommentIndex
+
+
+def journal(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.split('\t')[0] for line in f]
+
+
+def test_reload_restores_ids_and_last_created(tmp_path):
+    path = str(tmp_path / 'state' / 'processed.log')
+    index = CommentIndex(path, capacity=10)
+    assert index.add('a', 100.0)
+    assert index.add('b', 300.0)
+    assert index.add('c', 200.0)
+    assert not index.add('a', 100.0)
+    index.close()
+
+    restored = CommentIndex(path, capacity=10)
+    assert len(restored) == 3
+    assert 'a' in restored and 'c' in restored and 'z' not in restored
+    assert restored.last_created == 300.0
+    assert not restored.add('b', 300.0)
+    restored.close()
+
+
+def test_capacity_evicts_oldest_on_reload(tmp_path):
+    path = str(tmp_path / 'processed.log')
+    index = CommentIndex(path, capacity=100)
+    for i in range(5):
+        index.add(f"id{i}", float(i))
+    index.close()
+
+    # Журнал длиннее нового лимита: остаются последние id
+    restored = CommentIndex(path, capacity=3)
+    assert [f"id{i}" in restored for i in range(5)] == [False, False, True, True, True]
+    restored.close()
+
+
+def test_compaction_keeps_only_live_ids(tmp_path):
+    path = str(tmp_path / 'processed.log')
+    index = CommentIndex(path, capacity=3)
+    for i in range(6):
+        index.add(f"id{i}", float(i))
+    assert len(journal(path)) == 6
+
+    # Седьмая строка превышает 2 x capacity: журнал переписывается
+    index.add('id6', 6.0)
+    assert journal(path) == ['id4', 'id5', 'id6']
+    index.add('id7', 7.0)
+    assert journal(path) == ['id4', 'id5', 'id6', 'id7']
+    index.close()
+
+    restored = CommentIndex(path, capacity=3)
+    assert len(restored) == 3
+    assert 'id4' not in restored and 'id7' in restored
+    assert restored.last_created == 7.0
+    restored.close()
+
+
+def test_in_memory_index():
+    index = CommentIndex(capacity=2)
+    assert index.add('a') and index.add('b') and index.add('c')
+    assert 'a' not in index and len(index) == 2
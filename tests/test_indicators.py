@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fakes import synthetic_ohlcv
+from indicators import IncrementalIndicators
+from signal_graph import INDICATOR_COLUMNS, SignalGraph, reach
+from strategy import DEFAULT_PARAMS
+
+
+def batch(data):
+    return SignalGraph(data, 1.0, DEFAULT_PARAMS, reuse=False).frame(INDICATOR_COLUMNS)
+
+
+@pytest.mark.parametrize('window', [300, 500, 2000])
+@pytest.mark.parametrize('seed', range(3))
+def test_sliding_window_matches_batch(seed, window):
+    """Окно сдвигается на новые бары (как period='3mo'): все строки, кроме прогрева головы, совпадают с пересчетом"""
+    df = synthetic_ohlcv(window + 900, seed=seed, start_price=2000.0, volatility=0.006)
+    indicators = IncrementalIndicators()
+
+    for start in range(0, 900, 29):
+        data = df.iloc[start:start + window]
+        got = indicators.apply('SYM', data, 1.0, batch=batch, params=DEFAULT_PARAMS)
+        expected = batch(data)
+        assert list(got.columns) == list(expected.columns)
+        pd.testing.assert_frame_equal(got[list(data.columns)], data)
+
+        for col in INDICATOR_COLUMNS:
+            values, reference = got[col].to_numpy(), expected[col].to_numpy()
+            # Голова сдвинутого окна зависит от баров до него: прогрев (NaN / False), как у пересчета
+            # EMA (reach None) поправлены к старту с первого бара окна — совпадают целиком
+            head = (reach(col, DEFAULT_PARAMS) or 0) if start else 0
+            if values.dtype == bool:
+                assert not values[:head].any(), col
+                np.testing.assert_array_equal(values[head:], reference[head:], err_msg=col)
+            else:
+                assert np.isnan(values[:head]).all(), col
+                np.testing.assert_allclose(values[head:], reference[head:], rtol=1e-9, atol=1e-9, err_msg=col)
+
+
+def test_forming_rows_match_batch_after_slide():
+    df = synthetic_ohlcv(1200, seed=7, start_price=2000.0, volatility=0.006)
+    indicators = IncrementalIndicators()
+    for start in range(0, 400, 50):
+        indicators.apply('SYM', df.iloc[start:start + 700], 1.0, batch=batch, params=DEFAULT_PARAMS)
+
+    # Окно df[350:1050]: закрыт бар 1048, формируются 1049 и 1050
+    window = df.iloc[350:1051]
+    last_ts = window.index[-3].value
+    bars = [tuple(row) for row in window[['Open', 'High', 'Low', 'Close', 'Volume']].iloc[-2:].to_numpy()]
+    rows = indicators.forming('SYM', last_ts, bars)
+    assert rows is not None
+
+    expected = batch(window).iloc[-3:]
+    for col in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(
+            [row[col] for row in rows], expected[col].to_numpy(dtype=np.float64), rtol=1e-9, err_msg=col
+        )
@@ -0,0 +1,131 @@
+import time
+
+import pandas as pd
+import pytest
+
+from bar_store import BarStore
+from fakes import FakeYahooServer, FakeYFinance, synthetic_ohlcv
+from strategy import CircuitBreaker, CircuitOpenError, MarketDataClient, MarketDataError, MultiAssetStrategy
+
+
+class FlakyServer(FakeYahooServer):
+    """Первые failures запросов — 503, дальше обычные ответы"""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    def _respond(self, path):
+        if self.calls <= self.failures:
+            return 503, {'chart': {'result': None, 'error': {'code': 'Internal', 'description': 'fake failure'}}}
+        return super()._respond(path)
+
+
+def make_client(server, **kwargs):
+    kwargs.setdefault('backoff', 0.01)
+    return MarketDataClient(base_url=server.url, **kwargs)
+
+
+@pytest.fixture
+def source():
+    # Бары до текущего момента: хранилище не считает историю устаревшей
+    end = pd.Timestamp.utcnow().tz_localize(None).floor('15min')
+    return FakeYFinance(frames={('BTC-USD', '15m'): synthetic_ohlcv(500, end=end, seed=1)})
+
+
+def test_history_parses_chart(source):
+    server = FakeYahooServer(source)
+    data = make_client(server).history('BTC-USD', period='5d')
+    expected = source.frame('BTC-USD')
+    assert list(data.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+    assert len(data) == len(expected)
+    assert data['Close'].tolist() == expected['Close'].round(6).tolist()
+
+
+def test_retries_transient_errors(source):
+    server = FlakyServer(2, source=source)
+    client = make_client(server, retries=3)
+    assert not client.history('BTC-USD').empty
+    assert server.calls == 3
+    assert client.breaker.failures == 0
+
+
+def test_gives_up_after_retries(source):
+    server = FakeYahooServer(source, status=503)
+    client = make_client(server, retries=2)
+    with pytest.raises(MarketDataError):
+        client.history('BTC-USD')
+    assert server.calls == 3
+    assert client.breaker.failures == 1
+
+
+def test_client_error_is_not_retried(source):
+    server = FakeYahooServer(source, status=404)
+    client = make_client(server, retries=3)
+    with pytest.raises(MarketDataError, match='HTTP 404'):
+        client.history('NOPE')
+    assert server.calls == 1
+    assert client.breaker.state == 'closed'
+
+
+def test_circuit_opens_and_recovers(source):
+    server = FakeYahooServer(source, status=503)
+    client = make_client(server, retries=0, breaker=CircuitBreaker(threshold=2, reset_timeout=0.2))
+    for _ in range(2):
+        with pytest.raises(MarketDataError):
+            client.history('BTC-USD')
+    assert client.breaker.state == 'open'
+
+    # Открытая цепь: запрос до сервера не доходит
+    with pytest.raises(CircuitOpenError):
+        client.history('BTC-USD')
+    assert server.calls == 2
+
+    # Half-open: неудачная проба снова открывает цепь
+    time.sleep(0.25)
+    assert client.breaker.state == 'half-open'
+    with pytest.raises(MarketDataError):
+        client.history('BTC-USD')
+    assert client.breaker.state == 'open'
+    assert server.calls == 3
+
+    # Удачная проба закрывает
+    server.status = 200
+    time.sleep(0.25)
+    assert not client.history('BTC-USD').empty
+    assert client.breaker.state == 'closed'
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0.05)
+    breaker.failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # второй вызов ждет исхода пробы
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_falls_back_to_stored_bars(source, tmp_path):
+    server = FakeYahooServer(source)
+    client = make_client(server, retries=0, breaker=CircuitBreaker(threshold=1, reset_timeout=60))
+    store = BarStore(str(tmp_path / 'bars'))
+
+    strategy = MultiAssetStrategy('BTC-USD', 'Bitcoin', store=store, client=client)
+    assert strategy.fetch_data(period='5d')
+    stored = strategy.data
+
+    # Провайдер лежит: ответ из хранилища, цепь открывается
+    server.status = 503
+    strategy = MultiAssetStrategy('BTC-USD', 'Bitcoin', store=store, client=client)
+    assert strategy.fetch_data(period='5d')
+    pd.testing.assert_frame_equal(strategy.data, stored)
+    assert client.breaker.state == 'open'
+
+    # Открытая цепь: хранилище без обращения к серверу
+    calls = server.calls
+    strategy = MultiAssetStrategy('BTC-USD', 'Bitcoin', store=store, client=client)
+    assert strategy.fetch_data(period='5d')
+    assert len(strategy.data) == len(stored)
+    assert server.calls == calls
@@ -0,0 +1,23 @@
+import socket
+import urllib.request
+
+from metrics import Metrics
+
+
+def test_serves_metrics():
+    metrics = Metrics()
+    metrics.inc('replies_total')
+    server = metrics.serve(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5) as response:
+            assert 'replies_total' in response.read().decode()
+    finally:
+        server.shutdown()
+
+
+def test_busy_port_disables_endpoint():
+    # Порт занят (например, другим воркером): бот работает дальше без метрик
+    with socket.socket() as busy:
+        busy.bind(('127.0.0.1', 0))
+        busy.listen()
+        assert Metrics().serve(busy.getsockname()[1]) is None
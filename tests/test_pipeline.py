@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+import pipeline
+from pipeline import CommentPipeline, SlidingWindowRateLimiter
+
+
+class FakeTime:
+    """Часы для лимитера: sleep сдвигает время, а не ждет"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(pipeline, 'time', clock)
+    return clock
+
+
+def test_min_interval_spacing(clock):
+    limiter = SlidingWindowRateLimiter(max_events=10, period=3600, min_interval=30)
+    assert limiter.acquire()
+    assert limiter.wait_time() == 30
+    clock.now += 10
+    assert limiter.acquire()
+    assert clock.sleeps == [20]
+    assert limiter.in_window() == 2
+
+
+def test_hourly_cap(clock):
+    limiter = SlidingWindowRateLimiter(max_events=3, period=3600)
+    start = clock.now
+    for _ in range(3):
+        assert limiter.acquire()
+        clock.now += 60
+    # Четвертый слот — только когда первое событие выйдет из окна
+    assert limiter.wait_time() == start + 3600 - clock.now
+    assert not limiter.acquire(timeout=60)
+    assert limiter.acquire()
+    assert clock.now == start + 3600
+    assert limiter.in_window() == 3
+
+
+class BlockingBot:
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.replies = []
+
+    def build_reply(self, comment, request):
+        self.started.set()
+        self.release.wait(5)
+        return f"reply to {comment}"
+
+    def send_reply(self, comment, response):
+        self.replies.append(response)
+
+
+def test_submit_blocks_when_queue_full():
+    bot = BlockingBot()
+    comments = CommentPipeline(bot, workers=1, queue_size=1)
+    comments.start()
+
+    comments.submit('c1', None)
+    assert bot.started.wait(5)  # воркер занят первым комментарием
+    comments.submit('c2', None)  # последнее место в очереди
+    assert comments.work_queue.full()
+
+    submitted = threading.Event()
+    producer = threading.Thread(target=lambda: (comments.submit('c3', None), submitted.set()), daemon=True)
+    producer.start()
+    assert not submitted.wait(0.2)
+
+    bot.release.set()
+    assert submitted.wait(5)
+    comments.work_queue.join()
+    comments.reply_queue.join()
+    assert bot.replies == ['reply to c1', 'reply to c2', 'reply to c3']
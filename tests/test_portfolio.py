@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import reference
+from fakes import synthetic_ohlcv
+from portfolio import PortfolioBacktest, stack_frames
+
+
+ASSET_TYPES = {'BTC': 'Bitcoin', 'GOLD': 'Gold', 'SILVER': 'Silver', 'ETH': 'Ethereum'}
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_portfolio_matches_single_symbol_backtest(seed):
+    # Разная длина истории: короткие символы выровнены по последнему бару NaN-заглушками сверху
+    frames = {
+        symbol: synthetic_ohlcv(1500 - i * 137, seed=seed * 10 + i, start_price=100.0 * (i + 1), volatility=0.006)
+        for i, symbol in enumerate(ASSET_TYPES)
+    }
+    report = PortfolioBacktest(frames, ASSET_TYPES).run(lookback=800)
+
+    for symbol, df in frames.items():
+        expected = reference(df, ASSET_TYPES[symbol], 800)
+        expected.pop('trades')
+        got = dict(report['symbols'][symbol])
+        got.pop('weight')
+        assert got == expected, symbol
+
+
+def test_portfolio_aligns_mixed_calendars_on_time():
+    # BTC торгуется круглосуточно, у GOLD ночной перерыв, ETH обрывается раньше остальных
+    btc = synthetic_ohlcv(2000, seed=1, start_price=100.0, volatility=0.006)
+    gold = synthetic_ohlcv(2000, seed=2, start_price=200.0, volatility=0.006)
+    gold = gold[(gold.index.hour < 22) & (gold.index.hour >= 1)]
+    eth = synthetic_ohlcv(1700, seed=3, start_price=300.0, volatility=0.006).iloc[:-60]
+    frames = {'BTC': btc, 'GOLD': gold, 'ETH': eth}
+
+    portfolio = PortfolioBacktest(frames, ASSET_TYPES)
+    report = portfolio.run(lookback=800)
+
+    close = portfolio.data['Close']
+    assert close.index.equals(btc.index.union(gold.index).union(eth.index))
+    for symbol, df in frames.items():
+        np.testing.assert_array_equal(close[symbol].reindex(df.index).to_numpy(), df['Close'].to_numpy())
+
+        expected = reference(df, ASSET_TYPES[symbol], 800)
+        expected.pop('trades')
+        got = dict(report['symbols'][symbol])
+        got.pop('weight')
+        assert got == expected, symbol
+
+
+def test_stack_frames_rejects_unsorted_bars():
+    df = synthetic_ohlcv(100, seed=0)
+    with pytest.raises(ValueError, match='GOLD'):
+        stack_frames({'BTC': df, 'GOLD': pd.concat([df, df.iloc[-3:]])})
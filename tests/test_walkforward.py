@@ -0,0 +1,24 @@
+import pytest
+
+from conftest import reference
+from fakes import synthetic_ohlcv
+from walkforward import WalkForwardBacktest
+
+
+@pytest.mark.parametrize('engine', ['legacy', 'vectorized'])
+@pytest.mark.parametrize('chunk', [100000, 333])
+@pytest.mark.parametrize('seed', range(3))
+def test_walkforward_matches_full_backtest(seed, chunk, engine):
+    df = synthetic_ohlcv(3000, seed=seed, start_price=2000.0, volatility=0.006)
+    expected = reference(df, 'Bitcoin', len(df), engine)
+
+    backtest = WalkForwardBacktest('SYM', 'Bitcoin')
+    for start in range(0, len(df), chunk):
+        backtest.feed(df.iloc[start:start + chunk])
+    overall = backtest.finish()['overall']
+
+    assert overall['total_trades'] == expected['total_trades']
+    assert overall['wins'] == expected['wins']
+    assert overall['winrate'] == expected['winrate']
+    assert overall['profit_factor'] == expected['profit_factor']
+    assert overall['return_pct'] == round(sum(t['profit'] for t in expected['trades']), 2)
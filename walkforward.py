@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Walk-forward бэктест на всей истории из локального хранилища
+
+    python walkforward.py --symbol BTC --interval 1h --fetch 2y --window-days 30
+
+История читается кусками; состояние индикаторов и открытая сделка
+переносятся через границы кусков, поэтому память не зависит от длины истории
+"""
+
+import argparse
+import json
+import math
+import statistics
+
+import numpy as np
+import pandas as pd
+
+from bar_store import BarStore
+from config import BAR_STORE_DIR, SYMBOL_MAP
+from indicators import IndicatorState
+from signal_graph import INDICATOR_COLUMNS, SignalGraph
+from strategy import MultiAssetStrategy
+
+
+class _Window:
+    """Статистика сделок одного окна (и всей истории)"""
+
+    def __init__(self, start=None):
+        self.start = start
+        self.trades = 0
+        self.wins = 0
+        self.win_sum = 0.0
+        self.loss_count = 0
+        self.loss_sum = 0.0
+        self.equity = 0.0
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+
+    def add(self, profit):
+        self.trades += 1
+        if profit > 0:
+            self.wins += 1
+            self.win_sum += profit
+        elif profit < 0:
+            self.loss_count += 1
+            self.loss_sum += -profit
+
+        # Просадка по кривой накопленной доходности (% на сделку, без реинвестирования)
+        self.equity += profit
+        self.peak = max(self.peak, self.equity)
+        self.max_drawdown = max(self.max_drawdown, self.peak - self.equity)
+
+    def summary(self):
+        # Те же формулы, что у MultiAssetStrategy._summarize_trades
+        avg_win = self.win_sum / self.wins if self.wins else 0
+        avg_loss = self.loss_sum / self.loss_count if self.loss_count else 0
+        return {
+            'start': self.start.isoformat() if self.start is not None else None,
+            'total_trades': self.trades,
+            'wins': self.wins,
+            'losses': self.trades - self.wins,
+            'winrate': round(self.wins / self.trades * 100, 2) if self.trades else 0,
+            'profit_factor': round(avg_win / avg_loss, 2) if avg_loss > 0 else 0,
+            'return_pct': round(self.equity, 2),
+            'max_drawdown_pct': round(self.max_drawdown, 2),
+        }
+
+
+class WalkForwardBacktest:
+    """
+    Потоковый бэктест: бары подаются кусками через feed(), итог — finish()
+    Правила входа/выхода как у MultiAssetStrategy._backtest_legacy
+    """
+
+    def __init__(self, symbol, asset_type='Gold', params=None, max_hold=100, window_days=30):
+        strategy = MultiAssetStrategy(symbol, asset_type, params=params)
+        self.params = strategy.params
+        self.state = IndicatorState(strategy.volatility_adj, self.params)
+        self.max_hold = max_hold
+        self.window = pd.Timedelta(days=window_days)
+
+        self.bars = 0
+        self.prev = None  # индикаторы и Close последнего бара (DataFrame из одной строки)
+        self.last_close = math.nan
+        self.last_ts = None
+        self.trade = None  # открытая сделка
+        self.next_entry = 0  # первый бар, где разрешен вход
+
+        self.total = _Window()
+        self.current = None
+        self.windows = []
+
+    def feed(self, data):
+        """Обработать очередной кусок баров (по времени, без пересечений)"""
+        if data.empty:
+            return
+        index = data.index
+        opens = data['Open'].to_numpy(dtype=np.float64)
+        highs = data['High'].to_numpy(dtype=np.float64)
+        lows = data['Low'].to_numpy(dtype=np.float64)
+        closes = data['Close'].to_numpy(dtype=np.float64)
+        volumes = data['Volume'].to_numpy(dtype=np.float64)
+
+        rows = [self.state.update(opens[j], highs[j], lows[j], closes[j], volumes[j]) for j in range(len(data))]
+        longs, shorts = self._signals(rows, closes)
+
+        for j in range(len(data)):
+            i = self.bars
+            high, low, close = highs[j], lows[j], closes[j]
+
+            if self.trade is not None:
+                self._check_exit(i, high, low, close)
+
+            if self.trade is None and i >= self.next_entry:
+                direction = 'LONG' if longs[j] else 'SHORT' if shorts[j] else None
+                if direction:
+                    self._open(i, index[j], direction, close, rows[j]['ATR'])
+
+            self.last_close = close
+            self.last_ts = index[j]
+            self.bars += 1
+
+    def _signals(self, rows, closes):
+        """
+        Long_Signal / Short_Signal куска: узлы signal_graph поверх потоковых индикаторов
+        Первой строкой идет последний бар прошлого куска — сигналам нужен shift(1)
+        """
+        frame = pd.DataFrame(rows, columns=INDICATOR_COLUMNS)
+        frame['Close'] = closes
+        if self.prev is not None:
+            frame = pd.concat([self.prev, frame], ignore_index=True)
+        self.prev = frame.iloc[-1:]
+
+        long_signal, short_signal = SignalGraph(frame, params=self.params).signals()
+        skip = len(frame) - len(rows)
+        return long_signal.to_numpy()[skip:], short_signal.to_numpy()[skip:]
+
+    def _open(self, i, ts, direction, close, atr):
+        if atr != atr or atr == 0:
+            return
+        stop, take = self.params['stop_atr_mult'], self.params['tp_atr_mult']
+        if direction == 'LONG':
+            sl, tp = close - atr * stop, close + atr * take
+        else:
+            sl, tp = close + atr * stop, close - atr * take
+        self.trade = {'direction': direction, 'entry': close, 'sl': sl, 'tp': tp, 'entry_idx': i, 'entry_ts': ts}
+
+    def _check_exit(self, i, high, low, close):
+        trade = self.trade
+        entry, sl, tp = trade['entry'], trade['sl'], trade['tp']
+        if trade['direction'] == 'LONG':
+            if low <= sl:
+                return self._close(i, (sl - entry) / entry * 100)
+            if high >= tp:
+                return self._close(i, (tp - entry) / entry * 100)
+        else:
+            if high >= sl:
+                return self._close(i, (entry - sl) / entry * 100)
+            if low <= tp:
+                return self._close(i, (entry - tp) / entry * 100)
+        if i >= trade['entry_idx'] + self.max_hold - 1:
+            self._close(i, 0)
+
+    def _close(self, i, profit):
+        ts = self.trade['entry_ts']
+        if self.current is None or ts >= self.current.start + self.window:
+            self._roll_window(ts)
+        self.current.add(profit)
+        self.total.add(profit)
+        self.trade = None
+        self.next_entry = i + 1
+
+    def _roll_window(self, ts):
+        if self.current is not None:
+            self.windows.append(self.current.summary())
+            start = self.current.start + self.window
+            # Окна фиксированной длины; пустые промежутки пропускаются
+            while ts >= start + self.window:
+                start += self.window
+        else:
+            start = ts.floor('D')
+        self.current = _Window(start)
+
+    def finish(self):
+        """Закрыть открытую сделку по таймауту на последнем баре и вернуть отчет"""
+        if self.trade is not None and self.trade['entry_idx'] < self.bars - 1:
+            self._close(self.bars - 1, 0)
+        self.trade = None
+        if self.current is not None:
+            self.windows.append(self.current.summary())
+            self.current = None
+
+        winrates = [w['winrate'] for w in self.windows if w['total_trades']]
+        return {
+            'bars': self.bars,
+            'last_bar': self.last_ts.isoformat() if self.last_ts is not None else None,
+            'overall': self.total.summary(),
+            'stability': {
+                'windows': len(self.windows),
+                'winrate_mean': round(statistics.fmean(winrates), 2) if winrates else 0,
+                'winrate_std': round(statistics.pstdev(winrates), 2) if winrates else 0,
+                'winrate_min': min(winrates, default=0),
+                'winrate_max': max(winrates, default=0),
+            },
+            'windows': self.windows,
+        }
+
+
+def run_walkforward(store, symbol_yf, interval, asset_type='Gold', params=None,
+                    window_days=30, chunk_rows=50000, since=None):
+    backtest = WalkForwardBacktest(symbol_yf, asset_type, params=params, window_days=window_days)
+    for chunk in store.iter_chunks(symbol_yf, interval, chunk_rows=chunk_rows, since=since):
+        backtest.feed(chunk)
+    return backtest.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest over stored history")
+    parser.add_argument('--symbol', default='BTC')
+    parser.add_argument('--interval', default='1h')
+    parser.add_argument('--fetch', default=None, help="download/extend history first, e.g. 2y")
+    parser.add_argument('--since', default=None, help="start date, e.g. 2023-01-01")
+    parser.add_argument('--window-days', type=int, default=30)
+    parser.add_argument('--chunk-rows', type=int, default=50000)
+    parser.add_argument('--out', default=None, help="save the JSON report")
+    args = parser.parse_args()
+
+    from main import detect_asset_type
+
+    if not BAR_STORE_DIR:
+        print("❌ BAR_STORE_DIR is empty: walk-forward reads history from the local store")
+        return
+    store = BarStore(BAR_STORE_DIR)
+    symbol_yf = SYMBOL_MAP.get(args.symbol, args.symbol)
+
+    if args.fetch:
+        if not MultiAssetStrategy(symbol_yf, store=store).fetch_data(period=args.fetch, interval=args.interval):
+            return
+
+    since = pd.Timestamp(args.since, tz='UTC') if args.since else None
+    report = run_walkforward(
+        store, symbol_yf, args.interval, detect_asset_type(args.symbol),
+        window_days=args.window_days, chunk_rows=args.chunk_rows, since=since
+    )
+    if not report['bars']:
+        print(f"❌ No stored bars for {symbol_yf} {args.interval}")
+        return
+
+    overall, stability = report['overall'], report['stability']
+    print(f"\n📜 {args.symbol} {args.interval}: {report['bars']} bars, {overall['total_trades']} trades")
+    print(f"   WR {overall['winrate']}% | PF {overall['profit_factor']} | "
+          f"return {overall['return_pct']}% | max DD {overall['max_drawdown_pct']}%")
+    print(f"   Winrate over {stability['windows']} x {args.window_days}d windows: "
+          f"{stability['winrate_mean']}% ± {stability['winrate_std']} "
+          f"(min {stability['winrate_min']}%, max {stability['winrate_max']}%)")
+    for window in report['windows']:
+        print(f"   {window['start'][:10]}  {window['total_trades']:>4} trades  WR {window['winrate']:>6}%  "
+              f"PF {window['profit_factor']:>5}  DD {window['max_drawdown_pct']:>6}%")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()